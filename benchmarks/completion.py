@@ -0,0 +1,81 @@
+"""
+Measures the latency of the shell completion of --name and --id.
+
+A database is generated with benchmarks.dataset, its name index is built once. Cached lookups are timed in-process
+(loading the index and matching the prefix, as done on every TAB press), whole completions are timed in a fresh interpreter.
+
+Usage: python -m benchmarks.completion [--habits 50000] [--runs 50] [--json results.json]
+"""
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Optional, Dict
+
+import click
+
+from benchmarks.dataset import DatasetSize, generate_dataset, create_session_maker
+from classes.helpers.name_index import NameIndex
+from helpers.cli_helper import COMPLETION_LIMIT
+from tracker import COMPLETE_VAR
+
+TRACKER_PATH = Path(__file__).resolve().parent.parent / 'tracker.py'
+
+# Generated Habits are named "Habit <ID>", "habit 1" matches about a fifth of them
+PREFIXES = ['habit 1', 'HABIT 4999', 'missing']
+
+
+@click.command()
+@click.option('--habits', default=50000, help='Number of generated Habits.', type=click.IntRange(min=1))
+@click.option('-r', '--runs', default=50, help='Number of runs per prefix.', type=click.IntRange(min=1))
+@click.option('-j', '--json', 'json_path', default=None, help='Write the results as JSON to the given file.', type=click.Path(dir_okay=False))
+def completion(habits: int, runs: int, json_path: Optional[str]) -> None:
+    """\b
+    Measures the latency of completing Habit Names from the name index, in-process and in a fresh interpreter.
+    """
+    results: Dict[str, Dict] = {}
+
+    with tempfile.TemporaryDirectory() as directory:
+        database_path = str(Path(directory) / 'habits.sqlite')
+        with create_session_maker(path=Path(database_path))() as session:
+            generate_dataset(session=session, size=DatasetSize(habits=habits, days=1))
+            session.commit()
+
+        start = time.perf_counter()
+        NameIndex.load(database_path=database_path)
+        build_ms = (time.perf_counter() - start) * 1000
+        click.echo(f'{"build":<12} {build_ms:8.1f} ms   index {os.path.getsize(database_path + ".names") / 2 ** 20:.1f} MiB')
+        results['build'] = {'ms': build_ms}
+
+        for prefix in PREFIXES:
+            timings = []
+            for _ in range(runs):
+                start = time.perf_counter()
+                matches = NameIndex.load(database_path=database_path).complete_names(prefix=prefix, limit=COMPLETION_LIMIT)
+                timings.append(time.perf_counter() - start)
+
+            results[prefix] = {'matches': len(matches), 'median_ms': statistics.median(timings) * 1000, 'max_ms': max(timings) * 1000}
+            click.echo(f'{prefix:<12} median {results[prefix]["median_ms"]:8.1f} ms   max {results[prefix]["max_ms"]:8.1f} ms   {len(matches)} match(es)')
+
+        # Includes the interpreter startup and the import of click, which the index cannot avoid
+        environment = {**os.environ, COMPLETE_VAR: 'bash_complete', 'COMP_WORDS': f'tracker.py habit complete --name {PREFIXES[0]}', 'COMP_CWORD': '4',
+                       'TRACKER_DATABASE': database_path}
+        timings = []
+        for _ in range(max(runs // 5, 1)):
+            start = time.perf_counter()
+            subprocess.run([sys.executable, str(TRACKER_PATH)], cwd=directory, env=environment, capture_output=True, check=True)
+            timings.append(time.perf_counter() - start)
+
+        results['process'] = {'median_ms': statistics.median(timings) * 1000, 'min_ms': min(timings) * 1000}
+        click.echo(f'{"process":<12} median {results["process"]["median_ms"]:8.1f} ms   min {results["process"]["min_ms"]:8.1f} ms')
+
+    if json_path is not None:
+        Path(json_path).write_text(json.dumps(results, indent=2))
+
+
+if __name__ == '__main__':
+    completion()
@@ -0,0 +1,165 @@
+"""
+Generates a synthetic tracker database with realistic completion histories.
+
+The generated data only depends on the parameters: the same seed, sizes and end date always produce the same database.
+Every Habit alternates between active phases, in which each period is completed with a Habit specific probability,
+and gaps of several periods without any completion. Some Habits are abandoned before the end date.
+
+Usage: python -m benchmarks.dataset OUTPUT [--habits 1000] [--days 365] [--seed 0] [--end-date 2025-01-31]
+"""
+import random
+from dataclasses import dataclass
+from datetime import date, datetime, time, timedelta
+from pathlib import Path
+from typing import Iterator, List, Optional, Tuple
+
+import click
+from sqlalchemy import insert
+from sqlalchemy.orm import Session
+
+from classes.helpers.lazy_session_maker import LazySessionMaker
+from classes.orm.habit import Habit
+from classes.periodicity import Periodicity
+from helpers.aggregates import rebuild_aggregates
+from helpers.database import DEFAULT_PROFILE
+from helpers.streaks import rebuild_streaks
+
+INSERT_CHUNK_SIZE = 10000
+
+
+@dataclass(frozen=True)
+class DatasetSize:
+    """
+    Size of a generated dataset.
+    """
+    habits: int
+    days: int
+
+    def __str__(self) -> str:
+        return f'{self.habits}x{self.days}'
+
+
+def generate_dataset(session: Session, size: DatasetSize, seed: int = 0, end_date: Optional[date] = None, chunk_size: int = INSERT_CHUNK_SIZE) -> Tuple[int, int]:
+    """
+    Fills an empty database with generated Habits and their completion histories.
+    Rows are written with bulk inserts, streaks and aggregates are rebuilt from the generated history afterwards.
+
+    Changes are flushed, committing is up to the caller.
+
+    :param session: The SQLAlchemy session object. The database must not contain any Habits.
+    :param size: Number of Habits and length of the history in days.
+    :param seed: Seed of the random number generator.
+    :param end_date: Last day of the history. Defaults to yesterday, so that every Habit can be completed today.
+    :param chunk_size: Number of rows inserted per round-trip.
+
+    :returns int: Number of generated Habits
+    :returns int: Number of generated completions
+    """
+    if end_date is None:
+        end_date = date.today() - timedelta(days=1)
+
+    rng = random.Random(seed)
+    habits: List[dict] = []
+    entries: List[Tuple[int, str, int]] = []
+    entry_count = 0
+
+    def flush() -> None:
+        if len(habits) > 0:
+            session.execute(insert(Habit.__table__), habits)
+            habits.clear()
+        if len(entries) > 0:
+            # Passed to the driver directly like the import does, dates are stored in the format of the SQLAlchemy DateTime type
+            session.connection().exec_driver_sql('INSERT INTO habit_entry (habit_id, completion_date, period_key) VALUES (?, ?, ?)', entries)
+            entries.clear()
+
+    for habit_id in range(1, size.habits + 1):
+        periodicity = Periodicity.Weekly if rng.random() < 0.25 else Periodicity.Daily
+        creation_date = datetime.combine(end_date - timedelta(days=rng.randrange(size.days)), time(hour=rng.randrange(6, 23), minute=rng.randrange(60)))
+        habits.append({'id': habit_id, 'name': f'Habit {habit_id}', 'periodicity': periodicity, 'streak': 0, 'highest_streak': 0, 'creation_date': creation_date})
+
+        for completion_date in generate_history(rng=rng, periodicity=periodicity, first_date=creation_date.date(), end_date=end_date):
+            entries.append((habit_id, completion_date.isoformat(sep=' ', timespec='microseconds'), periodicity.period_index(value=completion_date.date())))
+            entry_count += 1
+
+        if len(habits) + len(entries) >= chunk_size:
+            flush()
+    flush()
+
+    rebuild_streaks(session=session)
+    rebuild_aggregates(session=session)
+
+    return size.habits, entry_count
+
+
+@click.command()
+@click.argument('output', type=click.Path(dir_okay=False))
+@click.option('-h', '--habits', default=1000, help='Number of generated Habits.', type=click.IntRange(min=1))
+@click.option('-d', '--days', default=365, help='Length of the completion history in days.', type=click.IntRange(min=1))
+@click.option('-s', '--seed', default=0, help='Seed of the random number generator.', type=int)
+@click.option('-e', '--end-date', default=None, help='Last day of the history (YYYY-MM-DD). Defaults to yesterday.', type=click.DateTime(formats=['%Y-%m-%d']))
+def dataset(output: str, habits: int, days: int, seed: int, end_date: Optional[datetime]) -> None:
+    """\b
+    Generates a tracker database with synthetic Habits and completion histories.
+    """
+    path = Path(output)
+    if path.exists():
+        raise click.BadParameter(message=f'{output} already exists!', param_hint='OUTPUT')
+
+    session_maker = create_session_maker(path=path)
+    with session_maker() as session:
+        habit_count, entry_count = generate_dataset(session=session, size=DatasetSize(habits=habits, days=days), seed=seed,
+                                                    end_date=end_date.date() if end_date is not None else None)
+        session.commit()
+
+    click.echo(f'Generated {habit_count} Habit(s) with {entry_count} completion(s) in {output}')
+
+
+# region Helpers
+
+def generate_history(rng: random.Random, periodicity: Periodicity, first_date: date, end_date: date) -> Iterator[datetime]:
+    """
+    Generates the completion dates of a single Habit, at most one per period.
+
+    :param rng: Random number generator.
+    :param periodicity: Periodicity of the Habit.
+    :param first_date: First day the Habit can be completed on.
+    :param end_date: Last day the Habit can be completed on.
+
+    :returns Iterator[datetime]: Completion dates in ascending order
+    """
+    adherence = rng.uniform(0.5, 0.97)
+    lapse_chance = rng.uniform(0.01, 0.1)
+    abandon_period = periodicity.period_index(value=end_date) - rng.randrange(60) if rng.random() < 0.1 else None
+
+    period_length = 1 if periodicity is Periodicity.Daily else 7
+    period = periodicity.period_index(value=first_date)
+    last_period = periodicity.period_index(value=end_date) if abandon_period is None else abandon_period
+
+    while period <= last_period:
+        if rng.random() < lapse_chance:
+            # Gaps of a few periods up to several weeks, e.g. holidays or illness
+            period += rng.randint(2, 21 if periodicity is Periodicity.Daily else 6)
+            continue
+
+        if rng.random() < adherence:
+            completion_date = periodicity.period_start(period_index=period) + timedelta(days=rng.randrange(period_length))
+            if first_date <= completion_date <= end_date:
+                yield datetime.combine(completion_date, time(hour=rng.randrange(6, 23), minute=rng.randrange(60), second=rng.randrange(60)))
+        period += 1
+
+
+def create_session_maker(path: Path) -> LazySessionMaker:
+    """
+    Creates a session factory for the database at the given path, the schema is created on first use.
+
+    :param path: Path of the database file.
+
+    :returns LazySessionMaker: Session factory
+    """
+    return LazySessionMaker(url=f'sqlite:///{path}', profile=DEFAULT_PROFILE)
+
+# endregion
+
+
+if __name__ == '__main__':
+    dataset()
@@ -0,0 +1,146 @@
+"""
+Compares the ORM code paths of the hot CLI commands with the Core based HabitRepository.
+
+Every operation is timed in a fresh session against a temporary database, once without and once with tracemalloc,
+so that the peak memory allocated per operation does not distort the timings.
+
+Usage: python -m benchmarks.repository [--habits 1000] [--runs 200] [--profile durable] [--json results.json]
+"""
+import json
+import statistics
+import tempfile
+import time
+import tracemalloc
+from itertools import count
+from pathlib import Path
+from typing import Callable, Dict, Iterator, Optional
+
+import click
+from sqlalchemy import insert
+from sqlalchemy.orm import Session, sessionmaker
+
+from classes.habit_repository import HabitRepository
+from classes.helpers.lazy_session_maker import LazySessionMaker
+from classes.orm.habit import Habit
+from classes.periodicity import Periodicity
+from helpers.database import PRAGMA_PROFILES
+
+Operation = Callable[[Session], None]
+
+
+def orm_operations(habit_ids: Iterator[int], names: Iterator[str]) -> Dict[str, Operation]:
+    """
+    Returns the operations as they were implemented on top of the ORM.
+
+    :param habit_ids: IDs of Habits that have not been completed yet, one is used per completion.
+    :param names: Unused Habit names, one is used per creation.
+    """
+    def create(session: Session) -> None:
+        habit_name = next(names)
+        if not Habit.exists(session=session, habit_name=habit_name):
+            Habit.create(session=session, habit_name=habit_name, periodicity=Periodicity.Daily)
+
+    def list_(session: Session) -> None:
+        session.query(Habit).all()
+
+    def complete(session: Session) -> None:
+        target_habit = Habit.get(session=session, habit_id=next(habit_ids))
+        target_habit.complete(session=session)
+        # The command prints the new streak, which reloads the expired object
+        assert target_habit.streak >= 1
+
+    return {'create': create, 'list': list_, 'complete': complete}
+
+
+def repository_operations(habit_ids: Iterator[int], names: Iterator[str]) -> Dict[str, Operation]:
+    """
+    Returns the operations as implemented by HabitRepository.
+
+    :param habit_ids: IDs of Habits that have not been completed yet, one is used per completion.
+    :param names: Unused Habit names, one is used per creation.
+    """
+    def create(session: Session) -> None:
+        HabitRepository(session=session).create(habit_name=next(names), periodicity=Periodicity.Daily)
+        session.commit()
+
+    def list_(session: Session) -> None:
+        HabitRepository(session=session).list()
+
+    def complete(session: Session) -> None:
+        repository = HabitRepository(session=session)
+        assert repository.complete(habit=repository.get(habit_id=next(habit_ids)))[0] >= 1
+
+    return {'create': create, 'list': list_, 'complete': complete}
+
+
+def measure(session_maker: sessionmaker, operation: Operation, runs: int, trace: bool) -> Dict[str, float]:
+    """
+    Runs the operation in a fresh session per run.
+
+    :param session_maker: sessionmaker of the benchmark database.
+    :param operation: Operation to be measured.
+    :param runs: Number of runs.
+    :param trace: Whether the peak allocated memory should be traced instead of the wall time.
+
+    :returns Dict[str, float]: Median and minimum wall time in microseconds, or median peak memory in KiB
+    """
+    results = []
+    for _ in range(runs):
+        with session_maker() as session:
+            if trace:
+                tracemalloc.start()
+                operation(session)
+                results.append(tracemalloc.get_traced_memory()[1] / 1024)
+                tracemalloc.stop()
+            else:
+                start = time.perf_counter()
+                operation(session)
+                results.append((time.perf_counter() - start) * 1_000_000)
+
+    if trace:
+        return {'peak_kib': statistics.median(results)}
+    return {'median_us': statistics.median(results), 'min_us': min(results)}
+
+
+@click.command()
+@click.option('-h', '--habits', 'habit_count', default=1000, help='Number of Habits in the database (the list size).', type=click.IntRange(min=1))
+@click.option('-r', '--runs', default=200, help='Number of runs per operation and variant.', type=click.IntRange(min=1))
+@click.option('-p', '--profile', default='durable', help='Pragma profile of the database.', type=click.Choice(list(PRAGMA_PROFILES)))
+@click.option('-j', '--json', 'json_path', default=None, help='Write the results as JSON to the given file.', type=click.Path(dir_okay=False))
+def repository(habit_count: int, runs: int, profile: str, json_path: Optional[str]) -> None:
+    """\b
+    Compares latency and peak memory of the ORM and Core (HabitRepository) code paths.
+    """
+    results: Dict[str, Dict[str, Dict[str, float]]] = {}
+
+    with tempfile.TemporaryDirectory() as directory:
+        session_maker = LazySessionMaker(url=f'sqlite:///{Path(directory) / "habits.sqlite"}', profile=profile)
+
+        # Every variant completes separate Habits in both passes, a Habit can only be completed once per day
+        with session_maker() as session:
+            session.execute(insert(Habit), [{'name': f'Habit {index}', 'periodicity': Periodicity.Daily} for index in range(max(habit_count, 4 * runs))])
+            session.commit()
+
+        habit_ids = iter(range(1, max(habit_count, 4 * runs) + 1))
+        names = (f'Created Habit {index}' for index in count())
+        variants = {'orm': orm_operations(habit_ids=habit_ids, names=names), 'repository': repository_operations(habit_ids=habit_ids, names=names)}
+
+        for operation_name in variants['orm']:
+            results[operation_name] = {}
+            for variant, operations in variants.items():
+                results[operation_name][variant] = {
+                    **measure(session_maker=session_maker, operation=operations[operation_name], runs=runs, trace=False),
+                    **measure(session_maker=session_maker, operation=operations[operation_name], runs=runs, trace=True),
+                }
+
+            orm, core = results[operation_name]['orm'], results[operation_name]['repository']
+            click.echo(f'{operation_name:<10} orm {orm["median_us"]:9.1f} us {orm["peak_kib"]:9.1f} KiB   '
+                       f'repository {core["median_us"]:9.1f} us {core["peak_kib"]:9.1f} KiB   '
+                       f'speedup {orm["median_us"] / core["median_us"]:5.2f}x')
+
+    if json_path is not None:
+        Path(json_path).write_text(json.dumps(results, indent=2))
+
+
+if __name__ == '__main__':
+    repository()
@@ -0,0 +1,181 @@
+"""
+Compares the per-request latency of the server of tracker.py serve with the one-shot CLI.
+
+A database is generated with benchmarks.dataset and served by tracker.py serve in a separate process. Every command is timed
+    - one-shot: tracker.py <command> in a fresh interpreter, like without a server
+    - remote:   tracker.py --remote <command> in a fresh interpreter, which forwards the command to the server
+    - request:  a single request to the server from this process, the latency without any interpreter startup
+
+Usage: python -m benchmarks.server [--habits 1000] [--days 365] [--runs 50] [--json results.json]
+"""
+import json
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from itertools import count
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+import click
+from tabulate import tabulate
+
+from benchmarks.dataset import DatasetSize, generate_dataset, create_session_maker
+from benchmarks.suite import TRACKER_PATH, run_tracker, get_environment
+from helpers.remote import SERVER_HOST, HEALTH_PATH, send_command
+
+MODES = ['one-shot', 'remote', 'request']
+STARTUP_TIMEOUT = 30
+
+
+@click.command()
+@click.option('--habits', default=1000, help='Number of generated Habits.', type=click.IntRange(min=1))
+@click.option('--days', default=365, help='Number of days of generated completion history.', type=click.IntRange(min=1))
+@click.option('-r', '--runs', default=50, help='Number of timed runs per command and mode.', type=click.IntRange(min=2))
+@click.option('--seed', default=0, help='Seed of the dataset generator.', type=int)
+@click.option('-j', '--json', 'json_path', default=None, help='Write the results as JSON to the given file.', type=click.Path(dir_okay=False))
+def main(habits: int, days: int, runs: int, seed: int, json_path: Optional[str]) -> None:
+    """\b
+    Times every command per mode and prints the p50 and p99 latencies.
+    """
+    # Every completion needs a Habit that has not been completed today
+    if habits < runs * len(MODES):
+        raise click.BadParameter(message=f'At least {runs * len(MODES)} Habits are required for {runs} runs.', param_hint='--habits')
+
+    results: Dict[str, Dict[str, Dict[str, float]]] = {}
+    with tempfile.TemporaryDirectory() as directory:
+        database_path = Path(directory) / 'habits.sqlite'
+        session_maker = create_session_maker(path=database_path)
+        with session_maker() as session:
+            generate_dataset(session=session, size=DatasetSize(habits=habits, days=days), seed=seed)
+            session.commit()
+        session_maker.engine.dispose()
+
+        address = f'{SERVER_HOST}:{get_free_port()}'
+        server = subprocess.Popen([sys.executable, str(TRACKER_PATH), 'serve', '--port', address.split(':')[1]], cwd=directory,
+                                  stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, env={**os.environ, 'TRACKER_DATABASE': str(database_path)})
+        try:
+            wait_for_server(address=address, server=server)
+
+            habit_ids = count(start=1)
+            for name, args in get_commands(habit_ids=habit_ids).items():
+                results[name] = {}
+                for mode in MODES:
+                    results[name][mode] = measure(operation=lambda: run_command(mode=mode, args=args(), address=address, database_path=database_path), runs=runs)
+                    click.echo(f'{name:<45} {mode:<10} p50 {results[name][mode]["p50_ms"]:9.2f} ms   p99 {results[name][mode]["p99_ms"]:9.2f} ms')
+        finally:
+            server.terminate()
+            server.wait()
+
+    table = [[name, mode, timings['p50_ms'], timings['p99_ms'], f'{results[name]["one-shot"]["p50_ms"] / timings["p50_ms"]:.1f}x']
+             for name, modes in results.items() for mode, timings in modes.items()]
+    click.echo()
+    click.echo(tabulate(tabular_data=table, headers=['Command', 'Mode', 'p50 (ms)', 'p99 (ms)', 'Speedup (p50)'], floatfmt='.2f'))
+
+    if json_path is not None:
+        environment = {**get_environment(seed=seed, runs=runs), 'habits': habits, 'days': days}
+        Path(json_path).write_text(json.dumps({'environment': environment, 'results': results}, indent=2))
+
+
+# region Helpers
+
+def get_commands(habit_ids: count) -> Dict[str, Callable[[], List[str]]]:
+    """
+    Returns the timed commands. Their arguments are created per run.
+
+    :param habit_ids: Provides the IDs of Habits that have not been completed yet.
+    """
+    return {
+        'habit --format jsonl': lambda: ['habit', '--format', 'jsonl'],
+        'analytics list -s TotalCompletions --limit 20': lambda: ['analytics', 'list', '-s', 'TotalCompletions', '--limit', '20'],
+        'analytics streak': lambda: ['analytics', 'streak'],
+        'analytics streaks -m 30': lambda: ['analytics', 'streaks', '-m', '30'],
+        'habit complete': lambda: ['habit', 'complete', '-i', str(next(habit_ids))],
+    }
+
+
+def run_command(mode: str, args: List[str], address: str, database_path: Path) -> None:
+    """
+    Runs a command in the given mode.
+
+    :param mode: One of MODES.
+    :param args: Arguments of the command.
+    :param address: Address of the server.
+    :param database_path: Path of the database, used by the one-shot CLI.
+
+    :raises RuntimeError: The command failed
+    """
+    if mode == 'one-shot':
+        run_tracker(args=args, database_path=database_path)
+    elif mode == 'remote':
+        run_tracker(args=['--remote', '--remote-address', address, *args], database_path=database_path)
+    else:
+        result = send_command(address=address, args=args)
+        if result['exit_code'] != 0:
+            raise RuntimeError(f'Command {" ".join(args)} failed:\n{result["stderr"]}')
+
+
+def measure(operation: Callable[[], None], runs: int) -> Dict[str, float]:
+    """
+    Times the given operation.
+
+    :param operation: Operation to be timed.
+    :param runs: Number of runs.
+
+    :returns Dict[str, float]: 50th and 99th percentile, mean and maximum wall time in milliseconds as well as the number of runs
+    """
+    timings = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        operation()
+        timings.append((time.perf_counter() - start) * 1000)
+
+    percentiles = statistics.quantiles(timings, n=100, method='inclusive')
+    return {'p50_ms': percentiles[49], 'p99_ms': percentiles[98], 'mean_ms': statistics.mean(timings), 'max_ms': max(timings), 'runs': runs}
+
+
+def get_free_port() -> int:
+    """
+    Returns a port on the loopback interface that is currently not in use.
+    """
+    with socket.socket() as probe:
+        probe.bind((SERVER_HOST, 0))
+        return probe.getsockname()[1]
+
+
+def wait_for_server(address: str, server: subprocess.Popen) -> None:
+    """
+    Waits until the server answers its health check.
+
+    :param address: Address of the server.
+    :param server: Process of the server.
+
+    :raises RuntimeError: The server exited or did not start in time
+    """
+    from http.client import HTTPConnection
+
+    host, port = address.split(':')
+    deadline = time.monotonic() + STARTUP_TIMEOUT
+    while time.monotonic() < deadline:
+        if server.poll() is not None:
+            raise RuntimeError(f'Server exited with code {server.returncode}:\n{server.stderr.read().decode()}')
+        connection = HTTPConnection(host=host, port=int(port), timeout=1)
+        try:
+            connection.request(method='GET', url=HEALTH_PATH)
+            if connection.getresponse().status == 200:
+                return
+        except OSError:
+            time.sleep(0.05)
+        finally:
+            connection.close()
+
+    raise RuntimeError(f'Server did not start within {STARTUP_TIMEOUT} s!')
+
+# endregion
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,114 @@
+"""
+Measures the cold-start cost of tracker.py per subcommand.
+
+Every command is run in a fresh interpreter, once for the wall time and once with -X importtime,
+so that the slowest imports of each command are visible.
+
+Usage: python -m benchmarks.startup [--runs 10] [--top 5] [--json results.json]
+"""
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import List, Dict, Tuple, Optional
+
+import click
+
+TRACKER_PATH = Path(__file__).resolve().parent.parent / 'tracker.py'
+
+COMMANDS: List[List[str]] = [
+    ['--help'],
+    ['habit', '--help'],
+    ['analytics', '--help'],
+    ['habit'],
+    ['analytics', 'list'],
+    ['analytics', 'streak'],
+]
+
+
+def run_tracker(args: List[str], cwd: str, extra_flags: Optional[List[str]] = None) -> Tuple[float, str]:
+    """
+    Runs tracker.py in a fresh interpreter.
+
+    :param args: Arguments passed to tracker.py
+    :param cwd: Working directory, contains the habits.sqlite database
+    :param extra_flags: Additional interpreter flags
+
+    :returns float: Wall time in seconds
+    :returns str: Captured stderr
+    """
+    command = [sys.executable, *(extra_flags or []), str(TRACKER_PATH), *args]
+
+    start = time.perf_counter()
+    result = subprocess.run(command, cwd=cwd, capture_output=True, text=True, env={**os.environ, 'PYTHONDONTWRITEBYTECODE': '1'})
+    elapsed = time.perf_counter() - start
+
+    if result.returncode != 0:
+        raise RuntimeError(f'Command {" ".join(args)} failed:\n{result.stderr}')
+    return elapsed, result.stderr
+
+
+def parse_importtime(output: str, top: int) -> Tuple[int, List[Tuple[str, int]]]:
+    """
+    Parses the output of -X importtime.
+
+    :param output: stderr of an interpreter run with -X importtime
+    :param top: Number of top-level imports to return
+
+    :returns int: Total import time in microseconds
+    :returns List[Tuple[str, int]]: Slowest top-level imports and their cumulative time in microseconds
+    """
+    top_level: List[Tuple[str, int]] = []
+    for line in output.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+
+        _, cumulative, name = line[len('import time:'):].split('|')
+        # Nested imports are indented, only top-level imports add up to the total
+        if not name.startswith('  '):
+            top_level.append((name.strip(), int(cumulative)))
+
+    total = sum(cumulative for _, cumulative in top_level)
+    return total, sorted(top_level, key=lambda item: item[1], reverse=True)[:top]
+
+
+@click.command()
+@click.option('-r', '--runs', default=10, help='Number of runs per command.', type=int)
+@click.option('-t', '--top', default=5, help='Number of slowest imports to show per command.', type=int)
+@click.option('-j', '--json', 'json_path', default=None, help='Write the results as JSON to the given file.', type=click.Path(dir_okay=False))
+def startup(runs: int, top: int, json_path: Optional[str]) -> None:
+    """\b
+    Measures the cold-start wall time and import time of tracker.py per subcommand.
+    """
+    results: Dict[str, Dict] = {}
+
+    with tempfile.TemporaryDirectory() as cwd:
+        # Create the database upfront, so that the first measured command does not pay for the schema creation
+        run_tracker(args=['habit', 'create', '--name', 'Benchmark Habit', '--period', 'daily'], cwd=cwd)
+
+        for args in COMMANDS:
+            label = ' '.join(args)
+            timings = [run_tracker(args=args, cwd=cwd)[0] for _ in range(runs)]
+            total_import, slowest_imports = parse_importtime(output=run_tracker(args=args, cwd=cwd, extra_flags=['-X', 'importtime'])[1], top=top)
+
+            results[label] = {
+                'median_ms': statistics.median(timings) * 1000,
+                'min_ms': min(timings) * 1000,
+                'import_ms': total_import / 1000,
+                'slowest_imports': [{'module': name, 'ms': cumulative / 1000} for name, cumulative in slowest_imports],
+            }
+
+            click.echo(f'{label:<20} median {results[label]["median_ms"]:8.1f} ms   min {results[label]["min_ms"]:8.1f} ms   imports {results[label]["import_ms"]:8.1f} ms')
+            for name, cumulative in slowest_imports:
+                click.echo(f'    {name:<40} {cumulative / 1000:8.1f} ms')
+
+    if json_path is not None:
+        Path(json_path).write_text(json.dumps(results, indent=2))
+
+
+if __name__ == '__main__':
+    startup()
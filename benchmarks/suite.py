@@ -0,0 +1,377 @@
+"""
+Times CLI commands and library calls against generated databases of several sizes.
+
+For every size a database is generated with benchmarks.dataset. CLI commands run in a fresh interpreter like a user would start them,
+library calls run in-process with a fresh session per run. Results can be written as JSON and compared against a stored baseline,
+the comparison fails (exit code 1) if any case got slower than the threshold allows.
+
+Usage:
+    python -m benchmarks.suite run [--sizes 100x90,1000x365] [--runs 10] [--json results.json] [--baseline baseline.json] [--threshold 0.2]
+    python -m benchmarks.suite compare baseline.json results.json [--threshold 0.2]
+"""
+import json
+import os
+import platform
+import sqlite3
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import date, datetime
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
+
+import click
+from sqlalchemy import delete, select
+from tabulate import tabulate
+
+from benchmarks.dataset import DatasetSize, generate_dataset, create_session_maker
+from classes.helpers.lazy_session_maker import LazySessionMaker
+from classes.orm.habit import Habit
+from classes.orm.habit_entry import HabitEntry
+from helpers.aggregates import rebuild_aggregates
+from helpers.completion_matrix import load_completion_matrix, completion_statistics, rate_window_start
+from helpers.streaks import rebuild_streaks, streak_runs_statement
+
+TRACKER_PATH = Path(__file__).resolve().parent.parent / 'tracker.py'
+
+DEFAULT_SIZES = '100x90,1000x365'
+DEFAULT_THRESHOLD = 0.2
+COMPLETE_MANY_BATCH_SIZE = 20
+RATE_PERIODS = 30
+
+# A case is prepared before every run (untimed) and returns the operation that is timed
+Case = Callable[[], Callable[[], None]]
+Results = Dict[str, Dict[str, Dict[str, float]]]
+
+
+class CompletionPool:
+    """
+    Hands out IDs of Habits that have not been completed today.
+    Once all Habits are used up, today's completions are deleted and the streaks and aggregates of the Habits are rebuilt.
+    """
+
+    def __init__(self, session_maker: LazySessionMaker, habit_count: int) -> None:
+        """
+        :param session_maker: Session factory of the benchmark database.
+        :param habit_count: Number of Habits in the database, their IDs are 1 to habit_count.
+        """
+        self.session_maker = session_maker
+        self.habit_count = habit_count
+        self.next_id = 1
+
+    def take(self, count: int) -> List[int]:
+        """
+        Returns the IDs of count Habits that have not been completed today.
+
+        :param count: Number of IDs. Must not exceed the number of Habits.
+
+        :returns List[int]: Habit IDs
+        """
+        if self.next_id + count - 1 > self.habit_count:
+            self.reset()
+
+        habit_ids = list(range(self.next_id, self.next_id + count))
+        self.next_id += count
+        return habit_ids
+
+    def reset(self) -> None:
+        """
+        Reverts all completions made today.
+        """
+        completed_ids = list(range(1, self.next_id))
+        with self.session_maker() as session:
+            session.execute(delete(HabitEntry).where(HabitEntry.completion_date >= datetime.combine(date.today(), datetime.min.time())))
+            rebuild_streaks(session=session, habit_ids=completed_ids)
+            rebuild_aggregates(session=session, habit_ids=completed_ids)
+            session.commit()
+        self.next_id = 1
+
+
+def cli_cases(database_path: Path, pool: CompletionPool) -> Dict[str, Case]:
+    """
+    Returns the CLI commands to be timed, each run in a fresh interpreter.
+
+    :param database_path: Path of the benchmark database.
+    :param pool: Provides Habits that can be completed.
+    """
+    def command(*args: str) -> Case:
+        return lambda: lambda: run_tracker(args=list(args), database_path=database_path)
+
+    def complete() -> Callable[[], None]:
+        habit_id = pool.take(count=1)[0]
+        return lambda: run_tracker(args=['habit', 'complete', '-i', str(habit_id)], database_path=database_path)
+
+    return {
+        'cli: habit': command('habit'),
+        'cli: habit --format jsonl': command('habit', '--format', 'jsonl'),
+        'cli: analytics list': command('analytics', 'list'),
+        'cli: analytics list -s TotalCompletions --limit 20': command('analytics', 'list', '-s', 'TotalCompletions', '--limit', '20'),
+        'cli: analytics streak': command('analytics', 'streak'),
+        'cli: analytics streak -a': command('analytics', 'streak', '-a'),
+        'cli: analytics streaks -m 30': command('analytics', 'streaks', '-m', '30'),
+        'cli: analytics rate': command('analytics', 'rate'),
+        'cli: analytics heatmap -d 365 --format json': command('analytics', 'heatmap', '-d', '365', '--format', 'json'),
+        'cli: habit complete': complete,
+    }
+
+
+def library_cases(session_maker: LazySessionMaker, pool: CompletionPool, habit_count: int) -> Dict[str, Case]:
+    """
+    Returns the library calls to be timed, each run in a fresh session.
+
+    :param session_maker: Session factory of the benchmark database.
+    :param pool: Provides Habits that can be completed.
+    :param habit_count: Number of Habits in the database.
+    """
+    def complete() -> Callable[[], None]:
+        habit_id = pool.take(count=1)[0]
+
+        def operation() -> None:
+            with session_maker() as session:
+                Habit.get(session=session, habit_id=habit_id).complete(session=session)
+        return operation
+
+    def complete_many() -> Callable[[], None]:
+        habit_ids = pool.take(count=min(COMPLETE_MANY_BATCH_SIZE, habit_count))
+
+        def operation() -> None:
+            with session_maker() as session:
+                Habit.complete_many(session=session, habits=Habit.get_many(session=session, habit_ids=habit_ids))
+        return operation
+
+    def get_by_name() -> None:
+        with session_maker() as session:
+            Habit.get(session=session, habit_name=f'Habit {habit_count // 2 + 1}')
+
+    def longest_streak() -> None:
+        with session_maker() as session:
+            session.scalars(select(Habit).order_by(Habit.highest_streak.desc()).limit(1)).first()
+
+    def streak_runs() -> None:
+        with session_maker() as session:
+            session.execute(streak_runs_statement(min_length=30)).all()
+
+    def rates() -> None:
+        since = rate_window_start(until=date.today(), last=RATE_PERIODS)
+        with session_maker() as session:
+            habits, counts = load_completion_matrix(session=session, since=since, until=date.today())
+        completion_statistics(habits=habits, counts=counts, since=since, last=RATE_PERIODS)
+
+    def rebuild_all_streaks() -> None:
+        # Not committed, the session rolls back on close
+        with session_maker() as session:
+            rebuild_streaks(session=session)
+
+    return {
+        'lib: Habit.complete': complete,
+        f'lib: Habit.complete_many ({COMPLETE_MANY_BATCH_SIZE})': complete_many,
+        'lib: Habit.get (name)': lambda: get_by_name,
+        'lib: longest streak': lambda: longest_streak,
+        'lib: streak_runs_statement': lambda: streak_runs,
+        f'lib: completion_statistics ({RATE_PERIODS})': lambda: rates,
+        'lib: rebuild_streaks (all)': lambda: rebuild_all_streaks,
+    }
+
+
+@click.group()
+def suite() -> None:
+    """\b
+    Benchmark suite for CLI commands and library calls.
+    """
+    pass
+
+
+@suite.command(name='run')
+@click.option('-s', '--sizes', default=DEFAULT_SIZES, help='Comma separated dataset sizes as <Habits>x<Days>.', type=str)
+@click.option('-r', '--runs', default=10, help='Number of timed runs per case and size.', type=click.IntRange(min=1))
+@click.option('--seed', default=0, help='Seed of the dataset generator.', type=int)
+@click.option('--cli/--no-cli', 'include_cli', default=True, help='Whether CLI commands should be timed. Each run starts a new interpreter.')
+@click.option('-j', '--json', 'json_path', default=None, help='Write the results as JSON to the given file.', type=click.Path(dir_okay=False))
+@click.option('-b', '--baseline', default=None, help='Compare the results against a baseline written by --json.', type=click.Path(exists=True, dir_okay=False))
+@click.option('-t', '--threshold', default=DEFAULT_THRESHOLD, help='Relative slowdown of the median that counts as a regression.', type=click.FloatRange(min=0))
+def run(sizes: str, runs: int, seed: int, include_cli: bool, json_path: Optional[str], baseline: Optional[str], threshold: float) -> None:
+    """\b
+    Generates a database per size and times every case on it.
+    """
+    try:
+        dataset_sizes = parse_sizes(value=sizes)
+    except ValueError as error:
+        raise click.BadParameter(message=str(error), param_hint='--sizes')
+
+    results: Results = {}
+    with tempfile.TemporaryDirectory() as directory:
+        for size in dataset_sizes:
+            database_path = Path(directory) / f'habits_{size}.sqlite'
+            session_maker = create_session_maker(path=database_path)
+
+            start = time.perf_counter()
+            with session_maker() as session:
+                _, entry_count = generate_dataset(session=session, size=size, seed=seed)
+                session.commit()
+            click.echo(f'Generated {size.habits} Habit(s) with {entry_count} completion(s) over {size.days} day(s) in {time.perf_counter() - start:.1f} s')
+
+            pool = CompletionPool(session_maker=session_maker, habit_count=size.habits)
+            cases = library_cases(session_maker=session_maker, pool=pool, habit_count=size.habits)
+            if include_cli:
+                cases.update(cli_cases(database_path=database_path, pool=pool))
+
+            results[str(size)] = {}
+            for name, case in cases.items():
+                results[str(size)][name] = measure(case=case, runs=runs)
+                click.echo(f'{str(size):<12} {name:<55} {results[str(size)][name]["median_ms"]:10.2f} ms')
+
+            session_maker.engine.dispose()
+
+    document = {'environment': get_environment(seed=seed, runs=runs), 'results': results}
+    if json_path is not None:
+        Path(json_path).write_text(json.dumps(document, indent=2))
+
+    if baseline is not None:
+        regressions = print_comparison(baseline=json.loads(Path(baseline).read_text()), current=document, threshold=threshold)
+        if regressions > 0:
+            sys.exit(1)
+
+
+@suite.command(name='compare')
+@click.argument('baseline', type=click.Path(exists=True, dir_okay=False))
+@click.argument('current', type=click.Path(exists=True, dir_okay=False))
+@click.option('-t', '--threshold', default=DEFAULT_THRESHOLD, help='Relative slowdown of the median that counts as a regression.', type=click.FloatRange(min=0))
+def compare(baseline: str, current: str, threshold: float) -> None:
+    """\b
+    Compares two result files written by run --json. Exits with code 1 if any case regressed.
+    """
+    regressions = print_comparison(baseline=json.loads(Path(baseline).read_text()), current=json.loads(Path(current).read_text()), threshold=threshold)
+    if regressions > 0:
+        sys.exit(1)
+
+
+# region Helpers
+
+def parse_sizes(value: str) -> List[DatasetSize]:
+    """
+    Parses a comma separated list of dataset sizes.
+
+    :param value: Sizes as <Habits>x<Days>, e.g. "100x90,1000x365"
+
+    :returns List[DatasetSize]: Parsed sizes
+    :raises ValueError: A size is malformed
+    """
+    sizes = []
+    for part in value.split(','):
+        habits, _, days = part.strip().partition('x')
+        if not habits.isdigit() or not days.isdigit() or int(habits) < 1 or int(days) < 1:
+            raise ValueError(f'Invalid size "{part}", expected <Habits>x<Days>!')
+        sizes.append(DatasetSize(habits=int(habits), days=int(days)))
+    return sizes
+
+
+def measure(case: Case, runs: int) -> Dict[str, float]:
+    """
+    Times the operation of a case. Preparing the operation is not timed.
+
+    :param case: Case to be measured.
+    :param runs: Number of runs.
+
+    :returns Dict[str, float]: Median, minimum and maximum wall time in milliseconds as well as the number of runs
+    """
+    timings = []
+    for _ in range(runs):
+        operation = case()
+        start = time.perf_counter()
+        operation()
+        timings.append((time.perf_counter() - start) * 1000)
+
+    return {'median_ms': statistics.median(timings), 'min_ms': min(timings), 'max_ms': max(timings), 'runs': runs}
+
+
+def run_tracker(args: List[str], database_path: Path) -> None:
+    """
+    Runs tracker.py in a fresh interpreter against the given database.
+
+    :param args: Arguments passed to tracker.py
+    :param database_path: Path of the database.
+
+    :raises RuntimeError: The command failed
+    """
+    # Without input, as tracker.py --remote forwards everything piped into it
+    result = subprocess.run([sys.executable, str(TRACKER_PATH), *args], cwd=database_path.parent, capture_output=True, text=True,
+                            stdin=subprocess.DEVNULL, env={**os.environ, 'TRACKER_DATABASE': str(database_path)})
+    if result.returncode != 0:
+        raise RuntimeError(f'Command {" ".join(args)} failed:\n{result.stderr}')
+
+
+def get_environment(seed: int, runs: int) -> Dict[str, str | int]:
+    """
+    Describes the environment the results were measured in, results of different machines are not comparable.
+
+    :param seed: Seed of the dataset generator.
+    :param runs: Number of runs per case.
+    """
+    return {
+        'python': platform.python_version(),
+        'sqlite': sqlite3.sqlite_version,
+        'platform': platform.platform(),
+        'machine': platform.machine(),
+        'seed': seed,
+        'runs': runs,
+    }
+
+
+def compare_results(baseline: Results, current: Results, threshold: float) -> List[Tuple[str, str, Optional[float], Optional[float], str]]:
+    """
+    Compares the median timings of two result sets.
+
+    :param baseline: Results of the baseline.
+    :param current: Results to be checked.
+    :param threshold: Relative slowdown of the median that counts as a regression, e.g. 0.2 for 20%.
+
+    :returns List[Tuple]: Size, Case, baseline and current median and the verdict (ok, faster, REGRESSION, new, missing) per case
+    """
+    rows = []
+    for size in dict.fromkeys([*baseline, *current]):
+        for name in dict.fromkeys([*baseline.get(size, {}), *current.get(size, {})]):
+            before = baseline.get(size, {}).get(name, {}).get('median_ms')
+            after = current.get(size, {}).get(name, {}).get('median_ms')
+
+            if before is None:
+                verdict = 'new'
+            elif after is None:
+                verdict = 'missing'
+            elif after > before * (1 + threshold):
+                verdict = 'REGRESSION'
+            elif after < before * (1 - threshold):
+                verdict = 'faster'
+            else:
+                verdict = 'ok'
+            rows.append((size, name, before, after, verdict))
+    return rows
+
+
+def print_comparison(baseline: dict, current: dict, threshold: float) -> int:
+    """
+    Prints the comparison of two result documents.
+
+    :param baseline: Document of the baseline.
+    :param current: Document to be checked.
+    :param threshold: Relative slowdown of the median that counts as a regression.
+
+    :returns int: Number of regressions
+    """
+    if baseline['environment'].get('platform') != current['environment'].get('platform'):
+        click.echo('Warning: The baseline was measured on a different platform, timings might not be comparable.', err=True)
+
+    rows = compare_results(baseline=baseline['results'], current=current['results'], threshold=threshold)
+    table = [[size, name, before, after, f'{after / before - 1:+.1%}' if before and after else '', verdict] for size, name, before, after, verdict in rows]
+    click.echo(tabulate(tabular_data=table, headers=['Size', 'Case', 'Baseline (ms)', 'Current (ms)', 'Change', 'Verdict'], floatfmt='.2f'))
+
+    regressions = sum(1 for row in rows if row[-1] == 'REGRESSION')
+    click.echo(f'{regressions} regression(s) beyond {threshold:.0%}')
+    return regressions
+
+# endregion
+
+
+if __name__ == '__main__':
+    suite()
@@ -0,0 +1,113 @@
+"""
+Compares the memory held by HabitTimelines with the memory held by hydrated HabitEntry objects for the same completion history.
+
+A database is generated with benchmarks.dataset (or an existing one is used with --database). All timelines are loaded at once,
+HabitEntry objects are loaded for a sample of the completions only and extrapolated to the whole history,
+hydrating millions of ORM objects would need several GiB. Memory is measured with tracemalloc, which also traces the buffers of NumPy.
+
+Usage: python -m benchmarks.timeline [--habits 1000] [--days 365] [--orm-sample 100000] [--database habits.sqlite] [--json results.json]
+About 10 million completions are generated with --habits 75000 --days 730.
+"""
+import json
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+from typing import Callable, Optional, Tuple, TypeVar
+
+import click
+from sqlalchemy import func, select
+from tabulate import tabulate
+
+from benchmarks.dataset import DatasetSize, generate_dataset, create_session_maker
+from classes.habit_timeline import HabitTimeline
+from classes.orm.habit_entry import HabitEntry
+
+T = TypeVar('T')
+
+
+@click.command()
+@click.option('--habits', default=1000, help='Number of generated Habits.', type=click.IntRange(min=1))
+@click.option('--days', default=365, help='Number of days of generated completion history.', type=click.IntRange(min=1))
+@click.option('--seed', default=0, help='Seed of the dataset generator.', type=int)
+@click.option('--orm-sample', default=100000, help='Number of HabitEntry objects loaded to measure the ORM.', type=click.IntRange(min=1))
+@click.option('-d', '--database', 'database_path', default=None, help='Use an existing database instead of generating one.',
+              type=click.Path(exists=True, dir_okay=False))
+@click.option('-j', '--json', 'json_path', default=None, help='Write the results as JSON to the given file.', type=click.Path(dir_okay=False))
+def main(habits: int, days: int, seed: int, orm_sample: int, database_path: Optional[str], json_path: Optional[str]) -> None:
+    """\b
+    Measures memory per completion and load time of HabitTimelines and HabitEntry objects.
+    """
+    with tempfile.TemporaryDirectory() as directory:
+        if database_path is None:
+            database_path = str(Path(directory) / 'habits.sqlite')
+            click.echo(f'Generating {habits} Habit(s) with {days} day(s) of history...')
+            with create_session_maker(path=Path(database_path))() as session:
+                generate_dataset(session=session, size=DatasetSize(habits=habits, days=days), seed=seed)
+                session.commit()
+
+        session_maker = create_session_maker(path=Path(database_path))
+        with session_maker() as session:
+            entry_count = session.scalar(select(func.count()).select_from(HabitEntry))
+
+        with session_maker() as session:
+            timelines, timeline_ms, timeline_bytes, timeline_peak = measure(operation=lambda: HabitTimeline.load(session=session))
+            periods = sum(len(timeline) for timeline in timelines.values())
+            start = time.perf_counter()
+            highest_streaks = [timeline.highest_streak for timeline in timelines.values()]
+            streaks_ms = (time.perf_counter() - start) * 1000
+            del timelines, highest_streaks
+
+        with session_maker() as session:
+            sample_statement = select(HabitEntry).order_by(HabitEntry.habit_entry_id).limit(orm_sample)
+            entries, orm_ms, orm_bytes, orm_peak = measure(operation=lambda: session.scalars(sample_statement).all())
+            sample_size = len(entries)
+            del entries
+        session_maker.engine.dispose()
+
+    results = {
+        'completions': entry_count,
+        'timeline': {'bytes_per_completion': timeline_bytes / max(entry_count, 1), 'retained_mib': timeline_bytes / 2 ** 20,
+                     'peak_mib': timeline_peak / 2 ** 20, 'load_ms': timeline_ms, 'periods': periods, 'highest_streaks_ms': streaks_ms},
+        'orm': {'bytes_per_completion': orm_bytes / max(sample_size, 1), 'retained_mib': orm_bytes / max(sample_size, 1) * entry_count / 2 ** 20,
+                'peak_mib': orm_peak / max(sample_size, 1) * entry_count / 2 ** 20, 'load_ms': orm_ms / max(sample_size, 1) * entry_count,
+                'sample': sample_size},
+    }
+
+    table = [[variant, values['bytes_per_completion'], values['retained_mib'], values['peak_mib'], values['load_ms']]
+             for variant, values in [('HabitTimeline', results['timeline']), ('HabitEntry (extrapolated)', results['orm'])]]
+    click.echo(f'{entry_count} completion(s), {periods} completed period(s), highest streak of every Habit in {streaks_ms:.1f} ms')
+    click.echo(tabulate(tabular_data=table, headers=['Variant', 'Bytes / Completion', 'Retained (MiB)', 'Peak (MiB)', 'Load (ms)'], floatfmt='.1f'))
+
+    if json_path is not None:
+        Path(json_path).write_text(json.dumps(results, indent=2))
+
+
+# region Helpers
+
+def measure(operation: Callable[[], T]) -> Tuple[T, float, int, int]:
+    """
+    Runs the operation twice, once timed and once traced by tracemalloc. The result of the traced run is kept alive while measuring.
+
+    :param operation: Operation to be measured.
+
+    :returns T: Result of the traced run
+    :returns float: Wall time of the untraced run in milliseconds
+    :returns int: Bytes still allocated after the operation, i.e. held by its result
+    :returns int: Peak of the allocated bytes during the operation
+    """
+    start = time.perf_counter()
+    operation()
+    duration_ms = (time.perf_counter() - start) * 1000
+
+    tracemalloc.start()
+    result = operation()
+    retained, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, duration_ms, retained, peak
+
+# endregion
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,255 @@
+from contextlib import asynccontextmanager
+from datetime import date
+from typing import Optional, Iterable, AsyncIterator, List, Dict, Callable, TypeVar
+
+from sqlalchemy import Row, inspect
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+from sqlalchemy.orm import Session
+
+from classes.habit_service import HabitService
+from classes.orm.habit import Habit
+from classes.orm.habit_entry import HabitEntry
+from classes.orm.migrations import migrate_connection
+from classes.periodicity import Periodicity
+from helpers.database import (DEFER_COMMIT, DEFAULT_PROFILE, DEFAULT_BUSY_RETRIES, DEFAULT_BUSY_BACKOFF, commits_deferred,
+                              create_async_database_engine, retry_on_busy_async)
+
+T = TypeVar('T')
+
+
+async def create_async_session_maker(url: str, profile: str = DEFAULT_PROFILE, busy_retries: int = DEFAULT_BUSY_RETRIES,
+                                     busy_backoff: float = DEFAULT_BUSY_BACKOFF) -> async_sessionmaker:
+    """
+    Creates an AsyncEngine for the given database, migrates its schema and returns a factory for AsyncSessions bound to it.
+    Objects are not expired on commit, their attributes could not be loaded lazily outside of AsyncSession.run_sync.
+
+    :param url: SQLAlchemy URL of the database, using the aiosqlite driver (sqlite+aiosqlite:///habits.sqlite).
+    :param profile: Name of the pragma profile applied to every connection.
+    :param busy_retries: Number of retries of write transactions if the database is locked.
+    :param busy_backoff: Seconds before the first retry, doubled for every further one.
+
+    :returns async_sessionmaker: Factory for AsyncSessions
+    :raises ValueError: Unknown profile was passed
+    """
+    engine = create_async_database_engine(url=url, profile=profile)
+    async with engine.connect() as connection:
+        await connection.run_sync(lambda sync_connection: migrate_connection(connection=sync_connection))
+
+    # Sessions inherit the info dictionary, see helpers.database.retry_on_busy_async
+    return async_sessionmaker(bind=engine, expire_on_commit=False, info={'busy_retries': busy_retries, 'busy_backoff': busy_backoff})
+
+
+class AsyncHabitService:
+    """
+    Asyncio counterpart of HabitService for an AsyncSession using the aiosqlite driver.
+
+    Every operation runs the synchronous HabitService within AsyncSession.run_sync, so streaks, aggregates and transactions
+    are handled exactly like by the CLI. Statements are executed in the thread of the aiosqlite connection and never block the event loop,
+    neither do retries of write transactions while the database is locked.
+
+    Returned Habits have all their attributes loaded and can be read without any further I/O.
+    Concurrent operations need a service (and session) each, an AsyncSession must not be shared between concurrent tasks.
+    """
+
+    def __init__(self, session: AsyncSession) -> None:
+        """
+        :param session: The SQLAlchemy AsyncSession object all operations are run in.
+        """
+        self.session = session
+
+    @asynccontextmanager
+    async def batch(self) -> AsyncIterator['AsyncHabitService']:
+        """
+        Groups all operations within the block into a single transaction, see HabitService.batch.
+
+        :returns AsyncHabitService: This service
+        """
+        sync_session = self.session.sync_session
+        if commits_deferred(session=sync_session):
+            yield self
+            return
+
+        sync_session.info[DEFER_COMMIT] = True
+        try:
+            yield self
+            await self.session.commit()
+        except BaseException:
+            await self.session.rollback()
+            raise
+        finally:
+            del sync_session.info[DEFER_COMMIT]
+
+    async def create(self, habit_name: str, periodicity: Periodicity) -> Habit:
+        """
+        Creates a new Habit.
+
+        :param habit_name: Desired name for the new habit.
+        :param periodicity: Desired periodicity for the new habit.
+
+        :returns Habit: Created Habit
+        """
+        def operation(service: HabitService) -> Habit:
+            new_habit = service.create(habit_name=habit_name, periodicity=periodicity)
+            load_habits(session=service.session, habits=[new_habit])
+            return new_habit
+
+        return await self.__write(operation=operation)
+
+    async def get(self, habit_id: Optional[int] = None, habit_name: Optional[str] = None) -> Optional[Habit]:
+        """
+        Retrieves a Habit based on the given ID / Name.
+
+        :param habit_id: ID of the habit to retrieve. Takes precedence over habit_name.
+        :param habit_name: Name of the habit to retrieve.
+
+        :returns Habit: Retrieved Habit. None if no Habit was found.
+        """
+        return await self.__read(operation=lambda service: service.get(habit_id=habit_id, habit_name=habit_name))
+
+    async def get_many(self, habit_ids: Iterable[int] = (), habit_names: Iterable[str] = ()) -> List[Habit]:
+        """
+        Retrieves all Habits matching any of the given IDs / Names.
+
+        :param habit_ids: IDs of the habits to retrieve.
+        :param habit_names: Names of the habits to retrieve.
+
+        :returns List[Habit]: Retrieved Habits
+        """
+        return await self.__read(operation=lambda service: service.get_many(habit_ids=habit_ids, habit_names=habit_names))
+
+    async def update(self, habit: Habit, new_name: Optional[str] = None, new_periodicity: Optional[Periodicity] = None) -> bool:
+        """
+        Updates the name and/or periodicity of a Habit.
+
+        :param habit: Habit to be updated.
+        :param new_name: New name for the habit.
+        :param new_periodicity: New periodicity for the habit.
+
+        :returns bool: True if changes were made, False otherwise.
+        """
+        def operation(service: HabitService) -> bool:
+            changes_made = service.update(habit=habit, new_name=new_name, new_periodicity=new_periodicity)
+            load_habits(session=service.session, habits=[habit])
+            return changes_made
+
+        return await self.__write(operation=operation)
+
+    async def delete(self, habit: Habit) -> None:
+        """
+        Deletes a Habit and its completion history.
+
+        :param habit: Habit to be deleted.
+        """
+        await self.__write(operation=lambda service: service.delete(habit=habit))
+
+    async def delete_many(self, habit_ids: Iterable[int] = (), habit_names: Iterable[str] = (), periodicity: Optional[Periodicity] = None) -> int:
+        """
+        Deletes all Habits matching any of the given IDs / Names, restricted to the given Periodicity, and their completion history.
+
+        :param habit_ids: IDs of the habits to delete.
+        :param habit_names: Names of the habits to delete.
+        :param periodicity: Only delete Habits with this Periodicity. Deletes all Habits with it if neither IDs nor Names are given.
+
+        :returns int: Number of deleted Habits
+        """
+        return await self.__write(operation=lambda service: service.delete_many(habit_ids=habit_ids, habit_names=habit_names, periodicity=periodicity))
+
+    async def complete(self, habit: Habit) -> Optional[tuple[HabitEntry, bool]]:
+        """
+        Completes a Habit.
+
+        :param habit: Habit to be completed.
+
+        :returns: Created HabitEntry and whether the streak has been broken. None if the Habit was already completed in the current period.
+        """
+        return (await self.complete_many(habits=[habit]))[habit.habit_id]
+
+    async def complete_many(self, habits: Iterable[Habit]) -> Dict[int, Optional[tuple[HabitEntry, bool]]]:
+        """
+        Completes multiple Habits.
+
+        :param habits: Habits to be completed. Duplicates are only completed once.
+
+        :returns Dict[int, Optional[tuple[HabitEntry, bool]]]: Result of complete per Habit ID.
+        """
+        habits = list(habits)
+
+        def operation(service: HabitService) -> Dict[int, Optional[tuple[HabitEntry, bool]]]:
+            results = service.complete_many(habits=habits)
+            # Streaks and aggregates are updated in SQL, which expires them on the Habit objects
+            load_habits(session=service.session, habits=habits)
+            return results
+
+        return await self.__write(operation=operation)
+
+    async def list(self) -> List[Row]:
+        """
+        Retrieves all Habits, ordered by their ID.
+
+        :returns List[Row]: ID, Name, Current Streak, Longest Streak and Periodicity per Habit
+        """
+        return await self.__read(operation=lambda service: service.list())
+
+    async def longest_streak(self, periodicity: Optional[Periodicity] = None, active: bool = False) -> Optional[Habit]:
+        """
+        Retrieves the Habit with the longest streak, like the analytics streak command.
+
+        :param periodicity: Only consider Habits with this Periodicity.
+        :param active: Compare the currently active streaks instead of the longest streaks.
+
+        :returns Habit: Habit with the longest streak. None if no Habit was found.
+        """
+        return await self.__read(operation=lambda service: service.longest_streak(periodicity=periodicity, active=active))
+
+    async def streaks(self, since: Optional[date] = None, until: Optional[date] = None, min_length: int = 1, habit_id: Optional[int] = None,
+                      habit_name: Optional[str] = None, periodicity: Optional[Periodicity] = None) -> List[Row]:
+        """
+        Retrieves all streaks found in the completion history, longest first, like the analytics streaks command.
+        See helpers.streaks.streak_runs_statement for the parameters.
+
+        :returns List[Row]: Habit ID, Name, Periodicity, first period, last period and length per streak
+        """
+        return await self.__read(operation=lambda service: service.streaks(since=since, until=until, min_length=min_length, habit_id=habit_id,
+                                                                           habit_name=habit_name, periodicity=periodicity))
+
+# region Helpers
+
+    async def __read(self, operation: Callable[[HabitService], T]) -> T:
+        """
+        Runs a read operation on a HabitService bound to the synchronous session.
+
+        :param operation: Operation to be run.
+
+        :returns T: Result of the operation
+        """
+        return await self.session.run_sync(lambda session: operation(HabitService(session=session)))
+
+    async def __write(self, operation: Callable[[HabitService], T]) -> T:
+        """
+        Runs a write operation on a HabitService bound to the synchronous session.
+        The operation is run again if the database was locked, see helpers.database.retry_on_busy_async.
+
+        :param operation: Operation to be run. Has to start its own transaction.
+
+        :returns T: Result of the operation
+        """
+        return await retry_on_busy_async(session=self.session, operation=lambda session: operation(HabitService(session=session)))
+
+# endregion
+
+
+def load_habits(session: Session, habits: Iterable[Habit]) -> None:
+    """
+    Loads all expired or unloaded attributes of the given Habits with a single query.
+
+    :param session: The SQLAlchemy session object the Habits belong to.
+    :param habits: Habits to be loaded. Deleted or detached Habits are skipped.
+    """
+    habit_ids = []
+    for target_habit in habits:
+        state = inspect(target_habit)
+        if state.persistent and len(state.unloaded) > 0:
+            habit_ids.append(state.identity[0])
+
+    if len(habit_ids) > 0:
+        Habit.get_many(session=session, habit_ids=habit_ids)
@@ -0,0 +1,136 @@
+from datetime import datetime, date
+from typing import Optional, List, Tuple, Iterator
+
+from sqlalchemy import select, bindparam, Row, Connection
+from sqlalchemy.dialects.sqlite import insert
+from sqlalchemy.orm import Session
+
+from classes.orm.habit import Habit
+from classes.periodicity import Periodicity
+from helpers.database import begin_immediate, commit, retry_on_busy
+
+HABIT_TABLE = Habit.__table__
+
+# Statements are built once, their compiled form is reused from the compiled cache of the engine on every execution
+LIST_STATEMENT = (select(HABIT_TABLE.c.id, HABIT_TABLE.c.name, HABIT_TABLE.c.streak, HABIT_TABLE.c.highest_streak, HABIT_TABLE.c.periodicity)
+                  .order_by(HABIT_TABLE.c.id))
+GET_COLUMNS = (HABIT_TABLE.c.id, HABIT_TABLE.c.name, HABIT_TABLE.c.periodicity, HABIT_TABLE.c.streak, HABIT_TABLE.c.last_completion)
+GET_BY_ID_STATEMENT = select(*GET_COLUMNS).where(HABIT_TABLE.c.id == bindparam('habit_id'))
+GET_BY_NAME_STATEMENT = select(*GET_COLUMNS).where(HABIT_TABLE.c.name == bindparam('habit_name'))
+CREATE_STATEMENT = (insert(HABIT_TABLE)
+                    .values(name=bindparam('habit_name'), periodicity=bindparam('periodicity'))
+                    .on_conflict_do_nothing(index_elements=[HABIT_TABLE.c.name])
+                    .returning(HABIT_TABLE.c.id))
+INSERT_ENTRY_STATEMENT = Habit.insert_entries_statement()
+
+
+class HabitRepository:
+    """
+    Data access for the frequently used CLI commands, built on SQLAlchemy Core.
+    Results are plain rows, nothing is loaded into ORM objects or tracked by the identity map of the session.
+
+    Changes are part of the transaction of the session, committing is up to the caller (except for complete, see helpers.database.commit).
+    """
+
+    def __init__(self, session: Session) -> None:
+        """
+        :param session: The SQLAlchemy session object.
+        """
+        self.session = session
+
+    @property
+    def connection(self) -> Connection:
+        """
+        Connection of the current transaction of the session.
+        """
+        return self.session.connection()
+
+    def list(self) -> List[Row]:
+        """
+        Retrieves all Habits, ordered by their ID.
+
+        :returns List[Row]: ID, Name, Current Streak, Longest Streak and Periodicity per Habit
+        """
+        return self.connection.execute(LIST_STATEMENT).all()
+
+    def stream(self, chunk_size: int) -> Iterator[Row]:
+        """
+        Streams all Habits, ordered by their ID. Only chunk_size rows are fetched from the database at once.
+        The result has to be consumed before the session is closed.
+
+        :param chunk_size: Number of rows fetched at once.
+
+        :returns Iterator[Row]: ID, Name, Current Streak, Longest Streak and Periodicity per Habit
+        """
+        return self.connection.execute(LIST_STATEMENT.execution_options(yield_per=chunk_size))
+
+    def get(self, habit_id: Optional[int] = None, habit_name: Optional[str] = None) -> Optional[Row]:
+        """
+        Retrieves a Habit based on the given ID / Name.
+
+        :param habit_id: ID of the habit to retrieve. Takes precedence over habit_name.
+        :param habit_name: Name of the habit to retrieve.
+
+        :returns Row: ID, Name, Periodicity, Current Streak and Last Completion of the Habit. None if no Habit was found.
+        """
+        if habit_id is not None:
+            return self.connection.execute(GET_BY_ID_STATEMENT, {'habit_id': habit_id}).first()
+        if habit_name is not None:
+            return self.connection.execute(GET_BY_NAME_STATEMENT, {'habit_name': habit_name}).first()
+
+        return None
+
+    def create(self, habit_name: str, periodicity: Periodicity) -> Optional[int]:
+        """
+        Creates a new Habit with a single statement, unless a Habit with the same name already exists.
+
+        :param habit_name: Desired name for the new habit.
+        :param periodicity: Desired periodicity for the new habit.
+
+        :returns int: ID of the created Habit. None if a Habit with the given name already exists.
+        """
+        return self.connection.execute(CREATE_STATEMENT, {'habit_name': habit_name, 'periodicity': periodicity}).scalar()
+
+    def complete(self, habit: Row) -> Optional[Tuple[int, bool]]:
+        """
+        Completes a Habit retrieved by get and commits the transaction.
+        Uses the same statements as Habit.complete_many, see there for the handling of concurrent completions.
+
+        :param habit: Habit as returned by get.
+
+        :returns Tuple[int, bool]: New streak and whether the previous streak has been broken. None if the Habit was already completed in the current period.
+        """
+        habit_id, _, periodicity, _, last_completion = habit
+
+        # Habits that are known to be completed in the current period are skipped without taking the write lock
+        if last_completion is not None and periodicity.period_index(value=last_completion.date()) >= periodicity.period_index(value=date.today()):
+            return None
+
+        return retry_on_busy(session=self.session, operation=lambda: self.__insert_completion(habit_id=habit_id, periodicity=periodicity))
+
+# region Helpers
+
+    def __insert_completion(self, habit_id: int, periodicity: Periodicity) -> Optional[Tuple[int, bool]]:
+        """
+        Completes a Habit within a single write transaction and commits it.
+
+        :param habit_id: ID of the Habit.
+        :param periodicity: Periodicity of the Habit.
+
+        :returns Tuple[int, bool]: New streak and whether the previous streak has been broken. None if the Habit was already completed in the current period.
+        """
+        begin_immediate(session=self.session)
+
+        completion_date = datetime.now()
+        result = self.connection.execute(INSERT_ENTRY_STATEMENT, Habit.entry_values(habit_id=habit_id, periodicity=periodicity, completion_date=completion_date))
+        if result.rowcount == 0:
+            commit(session=self.session)
+            return None
+
+        _, streak, total_completions = self.connection.execute(Habit.update_completed_statement(habit_ids=[habit_id], completion_date=completion_date)).one()
+        commit(session=self.session)
+
+        # A new streak after earlier completions means the previous streak has been broken
+        return streak, streak == 1 and total_completions > 1
+
+# endregion
@@ -0,0 +1,172 @@
+from contextlib import contextmanager
+from datetime import date
+from typing import Optional, Iterable, Iterator, List, Dict
+
+from sqlalchemy import Row, select
+from sqlalchemy.orm import Session
+
+from classes.habit_repository import HabitRepository
+from classes.orm.habit import Habit
+from classes.orm.habit_entry import HabitEntry
+from classes.periodicity import Periodicity
+from helpers.database import DEFER_COMMIT, commits_deferred
+
+
+class HabitService:
+    """
+    Transactional API for using the tracker as a library.
+
+    Outside a batch every operation commits on its own, like the CLI commands do.
+    Within a batch operations only flush their changes, the whole batch is committed once it ends or rolled back on an exception.
+    """
+
+    def __init__(self, session: Session) -> None:
+        """
+        :param session: The SQLAlchemy session object all operations are run in.
+        """
+        self.session = session
+
+    @contextmanager
+    def batch(self) -> Iterator['HabitService']:
+        """
+        Groups all operations within the block into a single transaction.
+        Nested batches are part of the outermost one.
+
+        :returns HabitService: This service
+        """
+        if commits_deferred(session=self.session):
+            yield self
+            return
+
+        self.session.info[DEFER_COMMIT] = True
+        try:
+            yield self
+            self.session.commit()
+        except BaseException:
+            self.session.rollback()
+            raise
+        finally:
+            del self.session.info[DEFER_COMMIT]
+
+    def create(self, habit_name: str, periodicity: Periodicity) -> Habit:
+        """
+        Creates a new Habit.
+
+        :param habit_name: Desired name for the new habit.
+        :param periodicity: Desired periodicity for the new habit.
+
+        :returns Habit: Created Habit
+        """
+        return Habit.create(session=self.session, habit_name=habit_name, periodicity=periodicity)
+
+    def get(self, habit_id: Optional[int] = None, habit_name: Optional[str] = None) -> Optional[Habit]:
+        """
+        Retrieves a Habit based on the given ID / Name.
+
+        :param habit_id: ID of the habit to retrieve. Takes precedence over habit_name.
+        :param habit_name: Name of the habit to retrieve.
+
+        :returns Habit: Retrieved Habit. None if no Habit was found.
+        """
+        return Habit.get(session=self.session, habit_id=habit_id, habit_name=habit_name)
+
+    def get_many(self, habit_ids: Iterable[int] = (), habit_names: Iterable[str] = ()) -> List[Habit]:
+        """
+        Retrieves all Habits matching any of the given IDs / Names.
+
+        :param habit_ids: IDs of the habits to retrieve.
+        :param habit_names: Names of the habits to retrieve.
+
+        :returns List[Habit]: Retrieved Habits
+        """
+        return Habit.get_many(session=self.session, habit_ids=habit_ids, habit_names=habit_names)
+
+    def update(self, habit: Habit, new_name: Optional[str] = None, new_periodicity: Optional[Periodicity] = None) -> bool:
+        """
+        Updates the name and/or periodicity of a Habit.
+
+        :param habit: Habit to be updated.
+        :param new_name: New name for the habit.
+        :param new_periodicity: New periodicity for the habit.
+
+        :returns bool: True if changes were made, False otherwise.
+        """
+        return habit.update(session=self.session, new_name=new_name, new_periodicity=new_periodicity)
+
+    def delete(self, habit: Habit) -> None:
+        """
+        Deletes a Habit and its completion history.
+
+        :param habit: Habit to be deleted.
+        """
+        habit.delete(session=self.session)
+
+    def delete_many(self, habit_ids: Iterable[int] = (), habit_names: Iterable[str] = (), periodicity: Optional[Periodicity] = None) -> int:
+        """
+        Deletes all Habits matching any of the given IDs / Names, restricted to the given Periodicity, and their completion history.
+
+        :param habit_ids: IDs of the habits to delete.
+        :param habit_names: Names of the habits to delete.
+        :param periodicity: Only delete Habits with this Periodicity. Deletes all Habits with it if neither IDs nor Names are given.
+
+        :returns int: Number of deleted Habits
+        """
+        return Habit.delete_many(session=self.session, habit_ids=habit_ids, habit_names=habit_names, periodicity=periodicity)
+
+    def complete(self, habit: Habit) -> Optional[tuple[HabitEntry, bool]]:
+        """
+        Completes a Habit.
+
+        :param habit: Habit to be completed.
+
+        :returns: Created HabitEntry and whether the streak has been broken. None if the Habit was already completed in the current period.
+        """
+        return habit.complete(session=self.session)
+
+    def complete_many(self, habits: Iterable[Habit]) -> Dict[int, Optional[tuple[HabitEntry, bool]]]:
+        """
+        Completes multiple Habits.
+
+        :param habits: Habits to be completed. Duplicates are only completed once.
+
+        :returns Dict[int, Optional[tuple[HabitEntry, bool]]]: Result of complete per Habit ID.
+        """
+        return Habit.complete_many(session=self.session, habits=habits)
+
+    def list(self) -> List[Row]:
+        """
+        Retrieves all Habits, ordered by their ID.
+
+        :returns List[Row]: ID, Name, Current Streak, Longest Streak and Periodicity per Habit
+        """
+        return HabitRepository(session=self.session).list()
+
+    def longest_streak(self, periodicity: Optional[Periodicity] = None, active: bool = False) -> Optional[Habit]:
+        """
+        Retrieves the Habit with the longest streak, like the analytics streak command.
+
+        :param periodicity: Only consider Habits with this Periodicity.
+        :param active: Compare the currently active streaks instead of the longest streaks.
+
+        :returns Habit: Habit with the longest streak. None if no Habit was found.
+        """
+        sort_order = Habit.streak if active else Habit.highest_streak
+        statement = select(Habit).order_by(sort_order.desc()).limit(1)
+        if periodicity is not None:
+            statement = statement.where(Habit.periodicity == periodicity)
+
+        return self.session.scalar(statement)
+
+    def streaks(self, since: Optional[date] = None, until: Optional[date] = None, min_length: int = 1, habit_id: Optional[int] = None,
+                habit_name: Optional[str] = None, periodicity: Optional[Periodicity] = None) -> List[Row]:
+        """
+        Retrieves all streaks found in the completion history, longest first, like the analytics streaks command.
+        See helpers.streaks.streak_runs_statement for the parameters.
+
+        :returns List[Row]: Habit ID, Name, Periodicity, first period, last period and length per streak
+        """
+        # Imported here, helpers.streaks loads numpy
+        from helpers.streaks import streak_runs_statement
+
+        return self.session.execute(streak_runs_statement(since=since, until=until, min_length=min_length, habit_id=habit_id,
+                                                          habit_name=habit_name, periodicity=periodicity)).all()
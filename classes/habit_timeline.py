@@ -0,0 +1,211 @@
+from datetime import date
+from typing import Optional, Iterable, Dict, Tuple
+
+import numpy as np
+from sqlalchemy import select, func
+from sqlalchemy.orm import Session
+
+from classes.orm.habit import Habit
+from classes.orm.habit_entry import HabitEntry
+from classes.periodicity import Periodicity
+from helpers.compaction import load_summary_days
+from helpers.streaks import JULIAN_DAY_ORDINAL_OFFSET, julian_day_number_expression
+
+
+class HabitTimeline:
+    """
+    Completion history of a single Habit, held in memory for analytics that would otherwise query or hydrate every HabitEntry.
+
+    Completions are stored as a sorted array of the indexes of all completed periods (see Periodicity.period_index),
+    4 bytes per completed period instead of several hundred bytes per HabitEntry object.
+    Timelines loaded together are views into one shared array, so every further Habit only adds a small constant overhead.
+
+    Timelines are a snapshot, later completions are not reflected.
+    """
+    __slots__ = ('habit_id', 'periodicity', 'periods')
+
+    def __init__(self, habit_id: int, periodicity: Periodicity, periods: np.ndarray) -> None:
+        """
+        :param habit_id: ID of the Habit.
+        :param periodicity: Periodicity of the Habit, which the periods are based on.
+        :param periods: Indexes of the completed periods as int32, sorted ascending without duplicates.
+        """
+        self.habit_id = habit_id
+        self.periodicity = periodicity
+        self.periods = periods
+
+    def __len__(self) -> int:
+        return len(self.periods)
+
+    def __repr__(self) -> str:
+        return f'HabitTimeline(habit_id={self.habit_id!r}, periodicity={self.periodicity!r}, periods={len(self.periods)!r})'
+
+    @property
+    def streak(self) -> int:
+        """
+        Length of the run of consecutive periods ending with the last completion, like Habit.streak.
+        """
+        return int(self.runs()[1][-1]) if len(self.periods) > 0 else 0
+
+    @property
+    def highest_streak(self) -> int:
+        """
+        Length of the longest run of consecutive periods, like Habit.highest_streak.
+        """
+        return int(self.runs()[1].max()) if len(self.periods) > 0 else 0
+
+    def completed(self, value: date) -> bool:
+        """
+        Checks whether the Habit was completed in the period the given date belongs to.
+
+        :param value: Any date of the period.
+
+        :returns bool: True if the period was completed, False otherwise.
+        """
+        period = self.periodicity.period_index(value=value)
+        position = np.searchsorted(self.periods, period)
+        return bool(position < len(self.periods) and self.periods[position] == period)
+
+    def completion_mask(self, since: date, until: date) -> np.ndarray:
+        """
+        Returns whether each period from since to until was completed.
+
+        :param since: Any date of the first period.
+        :param until: Any date of the last period.
+
+        :returns np.ndarray: Boolean per period, the first element belongs to the period of since.
+        :raises ValueError: until is before since
+        """
+        first_period, last_period = self.__period_range(since=since, until=until)
+
+        mask = np.zeros(last_period - first_period + 1, dtype=bool)
+        start, end = np.searchsorted(self.periods, first_period, side='left'), np.searchsorted(self.periods, last_period, side='right')
+        mask[self.periods[start:end] - first_period] = True
+        return mask
+
+    def completion_rate(self, since: date, until: date) -> float:
+        """
+        Returns the share of completed periods from since to until.
+
+        :param since: Any date of the first period.
+        :param until: Any date of the last period.
+
+        :returns float: Completed periods divided by all periods, between 0 and 1.
+        :raises ValueError: until is before since
+        """
+        first_period, last_period = self.__period_range(since=since, until=until)
+
+        completed = np.searchsorted(self.periods, last_period, side='right') - np.searchsorted(self.periods, first_period, side='left')
+        return int(completed) / (last_period - first_period + 1)
+
+    def runs(self) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Returns every streak (run of consecutive completed periods) in chronological order.
+
+        :returns np.ndarray: First period per run
+        :returns np.ndarray: Length per run
+        """
+        if len(self.periods) == 0:
+            return np.empty(0, dtype=np.int32), np.empty(0, dtype=np.int64)
+
+        starts = np.flatnonzero(np.r_[True, np.diff(self.periods) != 1])
+        return self.periods[starts], np.diff(np.r_[starts, len(self.periods)])
+
+    def gaps(self) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Returns every gap (run of missed periods) between the first and the last completion in chronological order.
+
+        :returns np.ndarray: First missed period per gap
+        :returns np.ndarray: Number of missed periods per gap
+        """
+        differences = np.diff(self.periods)
+        ends = np.flatnonzero(differences > 1)
+        return self.periods[ends] + 1, differences[ends] - 1
+
+# region Class Methods
+
+    @classmethod
+    def load(cls, session: Session, habit_ids: Optional[Iterable[int]] = None) -> Dict[int, 'HabitTimeline']:
+        """
+        Loads the timelines of many Habits in bulk, without creating a Python object per completion.
+        Multiple completions within the same period are only stored once. Compacted completions are included.
+
+        :param session: The SQLAlchemy session object.
+        :param habit_ids: IDs of the Habits to load. All Habits are loaded if None.
+
+        :returns Dict[int, HabitTimeline]: Timeline per Habit ID, including Habits without any completions. Unknown IDs are skipped.
+        """
+        periodicity_statement = select(Habit.habit_id, Habit.periodicity)
+        statement = (select(HabitEntry.habit_id, func.group_concat(julian_day_number_expression(completion_date=HabitEntry.completion_date)))
+                     .group_by(HabitEntry.habit_id))
+        if habit_ids is not None:
+            habit_ids = sorted(set(habit_ids))
+            periodicity_statement = periodicity_statement.where(Habit.habit_id.in_(habit_ids))
+            statement = statement.where(HabitEntry.habit_id.in_(habit_ids))
+        periodicities: Dict[int, Periodicity] = dict(session.execute(periodicity_statement).all())
+        summary_days = load_summary_days(session=session, habit_ids=habit_ids)
+
+        # SQLite returns the days of each Habit as a single string, which is parsed at once.
+        # Habits are parsed one at a time, so only the compact periods of all Habits are held at the same time.
+        habit_periods: Dict[int, np.ndarray] = {}
+        for habit_id, days in session.execute(statement):
+            if days is None or habit_id not in periodicities:
+                continue
+
+            ordinals = np.fromstring(days, dtype=np.int32, sep=',') - JULIAN_DAY_ORDINAL_OFFSET
+            if habit_id in summary_days:
+                ordinals = np.concatenate([ordinals, summary_days.pop(habit_id).astype(np.int32)])
+            habit_periods[habit_id] = cls.__periods(periodicity=periodicities[habit_id], ordinals=ordinals)
+
+        # Habits whose completions were all compacted
+        for habit_id, ordinals in summary_days.items():
+            if habit_id in periodicities:
+                habit_periods[habit_id] = cls.__periods(periodicity=periodicities[habit_id], ordinals=ordinals.astype(np.int32))
+
+        # All timelines are views into one shared array
+        periods = np.concatenate(list(habit_periods.values())) if len(habit_periods) > 0 else np.empty(0, dtype=np.int32)
+        ends = np.cumsum([len(values) for values in habit_periods.values()], dtype=np.int64)
+        slices = {habit_id: (int(end) - len(values), int(end)) for (habit_id, values), end in zip(habit_periods.items(), ends)}
+        habit_periods.clear()
+
+        timelines = {}
+        for habit_id, periodicity in sorted(periodicities.items()):
+            start, end = slices.get(habit_id, (0, 0))
+            timelines[habit_id] = cls(habit_id=habit_id, periodicity=periodicity, periods=periods[start:end])
+
+        return timelines
+
+# endregion
+
+# region Helpers
+
+    @staticmethod
+    def __periods(periodicity: Periodicity, ordinals: np.ndarray) -> np.ndarray:
+        """
+        Converts the completed days of a Habit to its completed periods.
+
+        :param periodicity: Periodicity of the Habit.
+        :param ordinals: date.toordinal() of every completion as int32, in any order.
+
+        :returns np.ndarray: Indexes of the completed periods, sorted ascending without duplicates
+        """
+        # Same computation as Periodicity.period_index, np.unique also sorts and drops multiple completions of a period
+        return np.unique(ordinals if periodicity is Periodicity.Daily else (ordinals - 1) // 7)
+
+    def __period_range(self, since: date, until: date) -> Tuple[int, int]:
+        """
+        Converts a date range to the indexes of its first and last period.
+
+        :param since: Any date of the first period.
+        :param until: Any date of the last period.
+
+        :returns int: Index of the first period
+        :returns int: Index of the last period
+        :raises ValueError: until is before since
+        """
+        if until < since:
+            raise ValueError('The end of the range must not be before its start!')
+
+        return self.periodicity.period_index(value=since), self.periodicity.period_index(value=until)
+
+# endregion
@@ -0,0 +1,72 @@
+from importlib import import_module
+from typing import Dict, Tuple, Optional, List
+
+import click
+from click import Context, HelpFormatter
+
+# Key in the meta dictionary of the context, contains the name and arguments of the invoked subcommand (e.g. for tracker.py --remote)
+SUBCOMMAND_ARGS_KEY = 'lazy_group.subcommand_args'
+
+
+class LazyGroup(click.Group):
+    """
+    Click Group that only imports the modules of its subcommands once they are actually used.
+    Listing the available commands (e.g. for --help) uses the given short help texts and imports nothing.
+    """
+
+    def __init__(self, *args, lazy_subcommands: Optional[Dict[str, Tuple[str, str]]] = None, **kwargs) -> None:
+        """
+        :param lazy_subcommands: Mapping of command names to their import path ("module.path:attribute") and short help text.
+        """
+        super().__init__(*args, **kwargs)
+        self.lazy_subcommands = lazy_subcommands or {}
+
+    def parse_args(self, ctx: Context, args: List[str]) -> List[str]:
+        rest = super().parse_args(ctx, args)
+        # Name and arguments of the subcommand, which are no longer available once the group callback runs
+        ctx.meta[SUBCOMMAND_ARGS_KEY] = [*ctx.protected_args, *ctx.args]
+        return rest
+
+    def list_commands(self, ctx: Context) -> List[str]:
+        return sorted({*super().list_commands(ctx), *self.lazy_subcommands})
+
+    def get_command(self, ctx: Context, cmd_name: str) -> Optional[click.Command]:
+        if cmd_name not in self.commands and cmd_name in self.lazy_subcommands:
+            self.add_command(self.__load_command(cmd_name=cmd_name), name=cmd_name)
+        return super().get_command(ctx, cmd_name)
+
+    def format_commands(self, ctx: Context, formatter: HelpFormatter) -> None:
+        rows = []
+        for cmd_name in self.list_commands(ctx):
+            if cmd_name in self.commands:
+                command = self.commands[cmd_name]
+                if command.hidden:
+                    continue
+                rows.append((cmd_name, command.get_short_help_str(limit=formatter.width - 6 - len(cmd_name))))
+            else:
+                rows.append((cmd_name, self.lazy_subcommands[cmd_name][1]))
+
+        if rows:
+            with formatter.section('Commands'):
+                formatter.write_dl(rows)
+
+# region Helpers
+
+    def __load_command(self, cmd_name: str) -> click.Command:
+        """
+        Imports the command registered under the given name.
+
+        :param cmd_name: Name of the command to be imported.
+
+        :returns click.Command: Imported Command
+        """
+        import_path, _ = self.lazy_subcommands[cmd_name]
+        module_name, attribute_name = import_path.split(':', maxsplit=1)
+
+        command = getattr(import_module(module_name), attribute_name)
+        if not isinstance(command, click.Command):
+            raise ValueError(f'Lazy command {import_path} is not a click Command!')
+
+        return command
+
+# endregion
@@ -0,0 +1,82 @@
+from contextlib import nullcontext
+from typing import Optional, ContextManager, TYPE_CHECKING
+
+from helpers.database import DEFAULT_BUSY_RETRIES, DEFAULT_BUSY_BACKOFF
+
+if TYPE_CHECKING:
+    from sqlalchemy import Engine
+    from sqlalchemy.orm import Session, sessionmaker
+    from classes.helpers.profiler import Profiler
+
+
+class LazySessionMaker:
+    """
+    Session factory that only creates the database engine and migrates the schema once the first session is requested.
+    Invocations that never access the database (e.g. --help) therefore never import SQLAlchemy.
+    """
+
+    def __init__(self, url: str, profile: str, busy_retries: int = DEFAULT_BUSY_RETRIES, busy_backoff: float = DEFAULT_BUSY_BACKOFF,
+                 profiler: Optional['Profiler'] = None) -> None:
+        """
+        :param url: SQLAlchemy URL of the database.
+        :param profile: Name of the pragma profile applied to every connection.
+        :param busy_retries: Number of retries of write transactions if the database is locked.
+        :param busy_backoff: Seconds before the first retry, doubled for every further one.
+        :param profiler: Profiler that times the engine creation and migration and records all statements of the engine.
+        """
+        self.url = url
+        self.profile = profile
+        self.busy_retries = busy_retries
+        self.busy_backoff = busy_backoff
+        self.profiler = profiler
+        self.__session_maker: Optional['sessionmaker'] = None
+
+    def __call__(self, **kwargs) -> 'Session':
+        return self.session_maker(**kwargs)
+
+    @property
+    def engine(self) -> 'Engine':
+        """
+        Engine of the database. Created on first access.
+        """
+        return self.session_maker.kw['bind']
+
+    @property
+    def session_maker(self) -> 'sessionmaker':
+        """
+        Underlying SQLAlchemy sessionmaker. Created on first access.
+        Raises a click.UsageError if the schema is outdated and the profile is read-only.
+        """
+        if self.__session_maker is None:
+            from sqlalchemy.orm import sessionmaker
+            from classes.orm.migrations import migrate
+            from helpers.database import create_database_engine
+
+            with self.__phase(name='engine'):
+                engine = create_database_engine(url=self.url, profile=self.profile)
+                if self.profiler is not None:
+                    self.profiler.instrument(engine=engine)
+            with self.__phase(name='schema'):
+                try:
+                    migrate(engine=engine)
+                except ValueError as error:
+                    # Reported like an invalid configuration, instead of a traceback from within the command
+                    import click
+
+                    raise click.UsageError(message=str(error))
+            # Sessions inherit the info dictionary, see helpers.database.retry_on_busy
+            self.__session_maker = sessionmaker(bind=engine, info={'busy_retries': self.busy_retries, 'busy_backoff': self.busy_backoff})
+
+        return self.__session_maker
+
+# region Helpers
+
+    def __phase(self, name: str) -> ContextManager:
+        """
+        Times the enclosed block as the given phase of the profiler, if any.
+
+        :param name: Name of the phase.
+        """
+        return self.profiler.phase(name=name) if self.profiler is not None else nullcontext()
+
+# endregion
@@ -0,0 +1,187 @@
+import os
+from bisect import bisect_left
+from typing import List, Tuple, Optional, Iterator
+
+# Appended to the path of the database to get the path of its name index
+NAME_INDEX_SUFFIX = '.names'
+# Stored in the first line of every index, indexes of other versions are rebuilt
+NAME_INDEX_VERSION = 1
+
+
+class NameIndex:
+    """
+    Sorted index of all Habit Names and IDs, used for the shell completion of --name and --id.
+
+    The index is cached in a file next to the database and only rebuilt once the database or its WAL file changed.
+    Completions are therefore served without importing SQLAlchemy or opening the database.
+    Names are looked up by a case-insensitive prefix through binary search over the sorted lines of the file, which are not parsed upfront.
+
+    File format: a signature line, the number of Names, one "casefolded name<TAB>id<TAB>name" line per Habit sorted by the casefolded Name,
+    followed by one "id<TAB>name" line per Habit sorted by the ID as string.
+    Names containing tabs or line breaks are not indexed.
+    """
+
+    def __init__(self, name_lines: List[str], id_lines: List[str]) -> None:
+        """
+        :param name_lines: Sorted "casefolded name<TAB>id<TAB>name" lines.
+        :param id_lines: Sorted "id<TAB>name" lines.
+        """
+        self.name_lines = name_lines
+        self.id_lines = id_lines
+
+    @classmethod
+    def load(cls, database_path: str) -> 'NameIndex':
+        """
+        Loads the cached index of the given database, the index is rebuilt first if the database changed since it was cached.
+        An index that cannot be cached (e.g. read-only directory) is rebuilt on every call.
+
+        :param database_path: Path of the SQLite database file.
+
+        :returns NameIndex: Index of all Habits of the database. Empty if the database does not exist (yet).
+        """
+        signature = cls.__signature(database_path=database_path)
+        if signature is None:
+            return cls(name_lines=[], id_lines=[])
+
+        index_path = database_path + NAME_INDEX_SUFFIX
+        try:
+            with open(index_path, encoding='utf-8') as file:
+                lines = file.read().split('\n')
+            if lines[0] == signature:
+                name_count = int(lines[1])
+                return cls(name_lines=lines[2:2 + name_count], id_lines=lines[2 + name_count:])
+        except (OSError, ValueError, IndexError):
+            pass
+
+        index = cls.build(database_path=database_path)
+        index.__save(index_path=index_path, signature=signature)
+        return index
+
+    @classmethod
+    def build(cls, database_path: str) -> 'NameIndex':
+        """
+        Reads all Habits from the given database through a read-only sqlite3 connection.
+
+        :param database_path: Path of the SQLite database file.
+
+        :returns NameIndex: Index of all Habits of the database. Empty if the database cannot be read, e.g. before its schema was created.
+        """
+        # Only imported when the index is rebuilt, completions served from the cached index do not need them
+        import sqlite3
+        from pathlib import Path
+
+        try:
+            connection = sqlite3.connect(Path(database_path).absolute().as_uri() + '?mode=ro', uri=True)
+            try:
+                habits = connection.execute('SELECT id, name FROM habit').fetchall()
+            finally:
+                connection.close()
+        except sqlite3.Error:
+            return cls(name_lines=[], id_lines=[])
+
+        habits = [(str(habit_id), name) for habit_id, name in habits if '\t' not in name and '\n' not in name and '\r' not in name]
+        return cls(name_lines=sorted(f'{name.casefold()}\t{habit_id}\t{name}' for habit_id, name in habits),
+                   id_lines=sorted(f'{habit_id}\t{name}' for habit_id, name in habits))
+
+    def complete_names(self, prefix: str, limit: int) -> List[str]:
+        """
+        Returns the Names starting with the given prefix, ignoring case.
+
+        :param prefix: Prefix of the Names.
+        :param limit: Maximum number of returned Names.
+
+        :returns List[str]: Matching Names, sorted ignoring case
+        """
+        key = prefix.casefold()
+        names = []
+        for line in self.__prefixed(lines=self.name_lines, prefix=key):
+            if len(names) == limit:
+                break
+            # The prefix must not match past the casefolded Name
+            if line.index('\t') >= len(key):
+                names.append(line.rsplit('\t', maxsplit=1)[1])
+        return names
+
+    def complete_ids(self, prefix: str, limit: int) -> List[Tuple[str, str]]:
+        """
+        Returns the IDs starting with the given prefix.
+
+        :param prefix: Prefix of the IDs.
+        :param limit: Maximum number of returned IDs.
+
+        :returns List[Tuple[str, str]]: Matching IDs and their Names, sorted as strings
+        """
+        ids = []
+        for line in self.__prefixed(lines=self.id_lines, prefix=prefix):
+            if len(ids) == limit:
+                break
+            habit_id, name = line.split('\t', maxsplit=1)
+            if len(habit_id) >= len(prefix):
+                ids.append((habit_id, name))
+        return ids
+
+# region Helpers
+
+    @staticmethod
+    def __signature(database_path: str) -> Optional[str]:
+        """
+        Returns the signature of the current state of the database, which changes with every write to the database or its WAL file.
+        PRAGMA data_version would require opening the database, the file headers, modification times and sizes are compared instead.
+        Modification times alone miss writes within the same tick of the file system clock, the headers do not:
+        the file change counter of the database is incremented by every commit outside of WAL mode,
+        WAL commits grow the WAL file until it is reset, which changes the salts in its header.
+
+        :param database_path: Path of the SQLite database file.
+
+        :returns Optional[str]: Signature of the database. None if the database does not exist.
+        """
+        try:
+            with open(database_path, 'rb') as file:
+                change_counter = file.read(28)[24:28].hex()
+                database = os.fstat(file.fileno())
+        except OSError:
+            return None
+
+        try:
+            with open(database_path + '-wal', 'rb') as file:
+                salts = file.read(32)[16:24].hex()
+                wal = os.fstat(file.fileno())
+            wal_state = f'{salts} {wal.st_mtime_ns} {wal.st_size}'
+        except OSError:
+            wal_state = '- 0 0'
+
+        return f'{NAME_INDEX_VERSION} {change_counter} {database.st_mtime_ns} {database.st_size} {wal_state}'
+
+    @staticmethod
+    def __prefixed(lines: List[str], prefix: str) -> Iterator[str]:
+        """
+        Yields the sorted lines starting with the given prefix, which are adjacent.
+
+        :param lines: Sorted lines.
+        :param prefix: Prefix of the lines.
+        """
+        for position in range(bisect_left(lines, prefix), len(lines)):
+            if not lines[position].startswith(prefix):
+                return
+            yield lines[position]
+
+    def __save(self, index_path: str, signature: str) -> None:
+        """
+        Writes the index to the given file. The file is replaced atomically, concurrent completions read either the old or new index.
+        Failures are ignored, the index is then rebuilt by the next completion.
+
+        :param index_path: Path of the index file.
+        :param signature: Signature of the database the index was built from.
+        """
+        temporary_path = f'{index_path}.{os.getpid()}.tmp'
+        try:
+            with open(temporary_path, 'w', encoding='utf-8') as file:
+                file.write('\n'.join([signature, str(len(self.name_lines)), *self.name_lines, *self.id_lines]))
+            os.replace(temporary_path, index_path)
+        except OSError:
+            try:
+                os.remove(temporary_path)
+            except OSError:
+                pass
+
+# endregion
@@ -0,0 +1,236 @@
+import json
+import time
+from contextlib import contextmanager, nullcontext
+from datetime import datetime
+from typing import Optional, Dict, List, Iterator, ContextManager, TextIO, TYPE_CHECKING
+
+import click
+
+if TYPE_CHECKING:
+    from cProfile import Profile
+    from sqlalchemy import Engine
+
+# Key of the Profiler in the object of the click context
+PROFILER_KEY = 'profiler'
+
+SUMMARY_STATEMENT_COUNT = 10
+SUMMARY_FUNCTION_COUNT = 15
+
+
+class QueryRecord:
+    """
+    Execution of a single SQL statement.
+    """
+    __slots__ = ('statement', 'duration', 'rows')
+
+    def __init__(self, statement: str, duration: float) -> None:
+        """
+        :param statement: Executed SQL statement.
+        :param duration: Execution time in seconds, without fetching the result.
+        """
+        self.statement = statement
+        self.duration = duration
+        self.rows = 0
+
+
+class Profiler:
+    """
+    Collects timings of a single tracker invocation: the duration of its phases, every executed SQL statement
+    and optionally a cProfile of the command.
+
+    Phases may nest and repeat, their durations are summed up per name. The command phase contains the render phase.
+    """
+
+    def __init__(self, started_at: float, args: List[str], json_path: Optional[str] = None, pstats_path: Optional[str] = None) -> None:
+        """
+        :param started_at: time.perf_counter() value at the start of tracker.py, the startup phase ends once the profiler is created.
+        :param args: Command line arguments of the invocation.
+        :param json_path: File a JSON line with all metrics is appended to.
+        :param pstats_path: File the cProfile statistics of the command are written to.
+        """
+        self.started_at = started_at
+        self.args = args
+        self.json_path = json_path
+        self.pstats_path = pstats_path
+
+        self.phases: Dict[str, float] = {'startup': time.perf_counter() - started_at}
+        self.queries: List[QueryRecord] = []
+        self.__query_starts: List[float] = []
+        self.__cursor_queries: Dict[int, QueryRecord] = {}
+        self.__command_started_at: Optional[float] = None
+        self.__profile: Optional['Profile'] = None
+
+    @contextmanager
+    def phase(self, name: str) -> Iterator[None]:
+        """
+        Times the enclosed block as the given phase.
+
+        :param name: Name of the phase.
+        """
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.phases[name] = self.phases.get(name, 0.0) + time.perf_counter() - start
+
+    def instrument(self, engine: 'Engine') -> None:
+        """
+        Records every statement executed on the given engine. Must be called before the engine opens its first connection.
+
+        :param engine: SQLAlchemy Engine to be instrumented.
+        """
+        from sqlalchemy import event
+
+        event.listen(engine, 'connect', self.__on_connect)
+        event.listen(engine, 'before_cursor_execute', self.__before_cursor_execute)
+        event.listen(engine, 'after_cursor_execute', self.__after_cursor_execute)
+
+    def start_command(self) -> None:
+        """
+        Starts the command phase and the cProfile, if requested.
+        """
+        if self.pstats_path is not None:
+            from cProfile import Profile
+
+            self.__profile = Profile()
+            self.__profile.enable()
+        self.__command_started_at = time.perf_counter()
+
+    def finish(self) -> None:
+        """
+        Ends the command phase, prints the summary to stderr and writes the requested outputs.
+        """
+        finished_at = time.perf_counter()
+        if self.__command_started_at is not None:
+            self.phases['command'] = finished_at - self.__command_started_at
+        if self.__profile is not None:
+            self.__profile.disable()
+        self.phases['total'] = finished_at - self.started_at
+
+        output = click.get_text_stream('stderr')
+        self.__write_summary(output=output)
+
+        if self.__profile is not None:
+            import pstats
+
+            self.__profile.dump_stats(self.pstats_path)
+            output.write(f'\ncProfile written to {self.pstats_path}, top {SUMMARY_FUNCTION_COUNT} functions by cumulative time:\n')
+            pstats.Stats(self.__profile, stream=output).sort_stats('cumulative').print_stats(SUMMARY_FUNCTION_COUNT)
+
+        if self.json_path is not None:
+            # A single append per invocation, so that concurrent invocations can share the file
+            with open(self.json_path, 'a', encoding='utf-8') as json_file:
+                json_file.write(json.dumps(self.to_dict()) + '\n')
+
+    def to_dict(self) -> dict:
+        """
+        Returns all collected metrics. Durations are given in milliseconds.
+
+        :returns dict: Metrics of the invocation
+        """
+        return {
+            'timestamp': datetime.now().isoformat(),
+            'args': self.args,
+            'phases': {name: round(duration * 1000, 3) for name, duration in self.phases.items()},
+            'queries': {
+                'count': len(self.queries),
+                'time_ms': round(sum(query.duration for query in self.queries) * 1000, 3),
+                'rows': sum(query.rows for query in self.queries),
+                'statements': self.get_statements(),
+            },
+        }
+
+    def get_statements(self) -> List[dict]:
+        """
+        Aggregates the recorded queries per statement, slowest first.
+
+        :returns List[dict]: Statement, number of executions, total time in milliseconds and rows per statement
+        """
+        statements: Dict[str, dict] = {}
+        for query in self.queries:
+            statement = statements.setdefault(query.statement, {'statement': query.statement, 'count': 0, 'time_ms': 0.0, 'rows': 0})
+            statement['count'] += 1
+            statement['time_ms'] += query.duration * 1000
+            statement['rows'] += query.rows
+
+        for statement in statements.values():
+            statement['time_ms'] = round(statement['time_ms'], 3)
+        return sorted(statements.values(), key=lambda value: value['time_ms'], reverse=True)
+
+# region Helpers
+
+    def __on_connect(self, dbapi_connection, connection_record) -> None:
+        # Called for every fetched row, counts the rows returned per statement
+        dbapi_connection.row_factory = self.__count_row
+
+    def __count_row(self, cursor, row: tuple) -> tuple:
+        query = self.__cursor_queries.get(id(cursor))
+        if query is not None:
+            query.rows += 1
+        return row
+
+    def __before_cursor_execute(self, conn, cursor, statement, parameters, context, executemany) -> None:
+        self.__query_starts.append(time.perf_counter())
+
+    def __after_cursor_execute(self, conn, cursor, statement, parameters, context, executemany) -> None:
+        query = QueryRecord(statement=' '.join(statement.split()), duration=time.perf_counter() - self.__query_starts.pop())
+        self.queries.append(query)
+
+        if cursor.description is not None:
+            # Rows are counted while they are fetched
+            self.__cursor_queries[id(cursor)] = query
+        else:
+            self.__cursor_queries.pop(id(cursor), None)
+            query.rows = max(cursor.rowcount, 0)
+
+    def __write_summary(self, output: TextIO) -> None:
+        """
+        Writes a human-readable summary of the collected metrics.
+
+        :param output: Stream the summary is written to.
+        """
+        from tabulate import tabulate
+
+        phases = ' | '.join(f'{name} {duration * 1000:.1f} ms' for name, duration in self.phases.items())
+        query_time = sum(query.duration for query in self.queries) * 1000
+        rows = sum(query.rows for query in self.queries)
+
+        output.write(f'\nProfile of: {" ".join(self.args)}\n')
+        output.write(f'Phases: {phases}\n')
+        output.write(f'Queries: {len(self.queries)} in {query_time:.1f} ms, {rows} row(s)\n')
+
+        statements = self.get_statements()
+        if len(statements) > 0:
+            table = [[statement['time_ms'], statement['count'], statement['rows'], shorten(text=statement['statement'], width=100)]
+                     for statement in statements[:SUMMARY_STATEMENT_COUNT]]
+            output.write(tabulate(tabular_data=table, headers=['Time (ms)', 'Count', 'Rows', 'Statement'], floatfmt='.3f'))
+            output.write('\n')
+
+# endregion
+
+
+def profile_phase(name: str) -> ContextManager:
+    """
+    Times the enclosed block as the given phase, if the current command is profiled.
+
+    :param name: Name of the phase.
+
+    :returns ContextManager: Context manager timing the phase
+    """
+    ctx = click.get_current_context(silent=True)
+    if ctx is None or not isinstance(ctx.obj, dict) or ctx.obj.get(PROFILER_KEY) is None:
+        return nullcontext()
+
+    return ctx.obj[PROFILER_KEY].phase(name=name)
+
+
+def shorten(text: str, width: int) -> str:
+    """
+    Shortens the given text to the given width.
+
+    :param text: Text to be shortened.
+    :param width: Maximum length.
+
+    :returns str: Shortened text
+    """
+    return text if len(text) <= width else text[:width - 3] + '...'
@@ -1,19 +1,29 @@
-from datetime import datetime, timedelta, date
-from typing import Optional
+from datetime import datetime, date
+from typing import Optional, Iterable, List, Dict
 
-from sqlalchemy import func, String, Integer, Enum, CheckConstraint, select, Select, desc, exists
+from sqlalchemy import func, String, Integer, Enum, CheckConstraint, Index, select, Select, Update, update, delete, case, exists, or_, ColumnElement
+from sqlalchemy.dialects.sqlite import insert, Insert
 from sqlalchemy.orm import Mapped, mapped_column, Session
 
 from classes.orm.base import Base
 from classes.orm.habit_entry import HabitEntry
+from classes.orm.habit_entry_summary import HabitEntrySummary
 from classes.periodicity import Periodicity
+from helpers.database import begin_immediate, commit, retry_on_busy
 
 
 class Habit(Base):
     __tablename__ = "habit"
     __table_args__ = (
         CheckConstraint(name='check_habit_name', sqltext='length(name) >= 1'),
-        CheckConstraint(name='check_periodicity', sqltext="periodicity IN ('Daily', 'Weekly')")
+        CheckConstraint(name='check_periodicity', sqltext="periodicity IN ('Daily', 'Weekly')"),
+        Index('unique_habit_name', 'name', unique=True),
+        Index('index_habit_total_completions', 'total_completions'),
+        Index('index_habit_last_completion', 'last_completion'),
+        Index('index_habit_streak', 'streak'),
+        Index('index_habit_highest_streak', 'highest_streak'),
+        Index('index_habit_periodicity', 'periodicity'),
+        Index('index_habit_creation_date', 'creation_date'),
     )
 
     habit_id: Mapped[int] = mapped_column(Integer(), name='id', primary_key=True, autoincrement=True)
@@ -21,7 +31,11 @@ class Habit(Base):
     periodicity: Mapped[Periodicity] = mapped_column(Enum(Periodicity), nullable=False)
     streak: Mapped[int] = mapped_column(Integer(), default=0, nullable=False)
     highest_streak: Mapped[int] = mapped_column(Integer(), default=0, nullable=False)
-    creation_date: Mapped[Optional[datetime]] = mapped_column(default=datetime.now(), server_default=func.current_timestamp(), nullable=False)
+    creation_date: Mapped[Optional[datetime]] = mapped_column(default=datetime.now, server_default=func.current_timestamp(), nullable=False)
+
+    # Aggregates of the completion history, maintained on every completion so that analytics do not need to join HabitEntry
+    total_completions: Mapped[int] = mapped_column(Integer(), default=0, server_default='0', nullable=False)
+    last_completion: Mapped[Optional[datetime]] = mapped_column(nullable=True)
 
     def __repr__(self) -> str:
         return f'Habit(id={self.habit_id!r}, name={self.name!r}, periodicity={self.periodicity!r}, creation_date={self.creation_date!r})'
@@ -41,71 +55,43 @@ class Habit(Base):
             self.name = new_name
             changes_made = True
         if new_periodicity is not None and new_periodicity != self.periodicity:
+            # Imported here, helpers.streaks depends on this module
+            from helpers.streaks import rebuild_period_keys, rebuild_streaks
+
             self.periodicity = new_periodicity
+            session.flush()
+            # Periods and thereby streaks change with the Periodicity
+            rebuild_period_keys(session=session, habit_ids=[self.habit_id])
+            rebuild_streaks(session=session, habit_ids=[self.habit_id])
+            # The streaks are updated without synchronizing the session
+            session.expire(self, ['streak', 'highest_streak'])
             changes_made = True
 
         if changes_made:
-            session.commit()
+            commit(session=session)
 
         return changes_made
 
     def delete(self, session: Session) -> None:
         """
-        Deletes the current Habit object from the database.
+        Deletes the current Habit object and its completion history from the database, see delete_many.
 
         :param session: The SQLAlchemy session object.
 
         :returns: None
         """
-        session.delete(self)
-        session.commit()
+        self.delete_many(session=session, habit_ids=[self.habit_id])
 
     def complete(self, session: Session) -> Optional[tuple[HabitEntry, bool]]:
         """
         Complete a habit by creating a new entry in the HabitEntry table.
+        See complete_many for how concurrent completions are handled.
 
         :param session: The SQLAlchemy session object.
 
-        :returns: Created HabitEntry
+        :returns: Created HabitEntry and whether the streak has been broken. None if the Habit was already completed in the current period.
         """
-        statement: Select
-        statement = (select(HabitEntry.completion_date)
-                     .where(HabitEntry.habit_id.is_(self.habit_id))
-                     .order_by(desc(HabitEntry.completion_date))
-                     .limit(1))
-
-        last_completion: datetime
-        last_completion = session.scalar(statement)
-
-        streak_broken = False
-
-        # If there is no previous streak, this is the first time the Habit is completed
-        if last_completion is None:
-            self.streak = 1
-        else:
-            streak_validity = self.__check_streak_validity(last_completion)
-
-            # Check if we already completed the Habit in the current period
-            if streak_validity is None:
-                return None
-
-            # Check if we passed the "Break Date" for our current Streak
-            if streak_validity:
-                self.streak += 1
-            else:
-                self.streak = 1
-                streak_broken = True
-
-        # If the current Streak is higher than the current highest one, update the highest streak
-        if self.streak > self.highest_streak:
-            self.highest_streak = self.streak
-
-        new_entry = HabitEntry(habit_id=self.habit_id)
-
-        session.add(new_entry)
-        session.commit()
-
-        return new_entry, streak_broken
+        return self.complete_many(session=session, habits=[self])[self.habit_id]
 
 # region Class Methods
 
@@ -123,7 +109,7 @@ class Habit(Base):
         new_habit = cls(name=habit_name, periodicity=periodicity)
 
         session.add(new_habit)
-        session.commit()
+        commit(session=session)
 
         return new_habit
 
@@ -138,7 +124,14 @@ class Habit(Base):
 
         :returns Habit: Retrieved Habit
         """
-        statement = select(cls).where(cls.habit_id.is_(habit_id).__or__(cls.name.is_(habit_name))).limit(1)
+        # Query the ID and Name separately, an OR over both columns prevents SQLite from using either index
+        statement: Select
+        if habit_id is not None:
+            statement = select(cls).where(cls.habit_id == habit_id)
+        elif habit_name is not None:
+            statement = select(cls).where(cls.name == habit_name)
+        else:
+            return None
 
         target_habit = session.scalar(statement)
         if target_habit is None:
@@ -146,10 +139,187 @@ class Habit(Base):
 
         return target_habit
 
+    @classmethod
+    def get_many(cls, session: Session, habit_ids: Iterable[int] = (), habit_names: Iterable[str] = ()) -> List['Habit']:
+        """
+        Retrieves all Habits matching any of the given IDs / Names with a single query.
+
+        :param session: The SQLAlchemy session object.
+        :param habit_ids: IDs of the habits to retrieve.
+        :param habit_names: Names of the habits to retrieve.
+
+        :returns List[Habit]: Retrieved Habits
+        """
+        habit_ids, habit_names = set(habit_ids), set(habit_names)
+        if len(habit_ids) == 0 and len(habit_names) == 0:
+            return []
+
+        statement = select(cls).where(or_(cls.habit_id.in_(habit_ids), cls.name.in_(habit_names)))
+        return list(session.scalars(statement))
+
+    @classmethod
+    def delete_many(cls, session: Session, habit_ids: Iterable[int] = (), habit_names: Iterable[str] = (), periodicity: Optional[Periodicity] = None) -> int:
+        """
+        Deletes all Habits matching the given filters (see match_condition) and their completion history within a single transaction.
+
+        Entries and summaries are deleted explicitly with one statement per table instead of relying on ON DELETE CASCADE,
+        which SQLite only applies on connections with foreign keys enabled.
+        Deleted Habits that are loaded in the session are removed from it, their loaded attributes stay accessible.
+
+        :param session: The SQLAlchemy session object.
+        :param habit_ids: IDs of the habits to delete.
+        :param habit_names: Names of the habits to delete.
+        :param periodicity: Only delete Habits with this Periodicity. Deletes all Habits with it if neither IDs nor Names are given.
+
+        :returns int: Number of deleted Habits
+        """
+        condition = cls.match_condition(habit_ids=habit_ids, habit_names=habit_names, periodicity=periodicity)
+        if condition is None:
+            return 0
+
+        def operation() -> int:
+            begin_immediate(session=session)
+            matched = select(cls.habit_id).where(condition)
+            session.execute(delete(HabitEntry).where(HabitEntry.habit_id.in_(matched)).execution_options(synchronize_session=False))
+            session.execute(delete(HabitEntrySummary).where(HabitEntrySummary.habit_id.in_(matched)).execution_options(synchronize_session=False))
+            # Fetching the deleted IDs (through RETURNING) removes the deleted Habits from the session
+            deleted = session.execute(delete(cls).where(condition).execution_options(synchronize_session='fetch')).rowcount
+            commit(session=session)
+            return deleted
+
+        return retry_on_busy(session=session, operation=operation)
+
+    @classmethod
+    def match_condition(cls, habit_ids: Iterable[int] = (), habit_names: Iterable[str] = (), periodicity: Optional[Periodicity] = None) -> Optional[ColumnElement[bool]]:
+        """
+        Builds a condition matching all Habits with any of the given IDs / Names, restricted to the given Periodicity.
+
+        :param habit_ids: IDs of the habits to match.
+        :param habit_names: Names of the habits to match.
+        :param periodicity: Only match Habits with this Periodicity. Matches all Habits with it if neither IDs nor Names are given.
+
+        :returns ColumnElement[bool]: SQLAlchemy condition. None if no filter was given, which would match every Habit.
+        """
+        habit_ids, habit_names = set(habit_ids), set(habit_names)
+
+        identifiers = []
+        if len(habit_ids) > 0:
+            identifiers.append(cls.habit_id.in_(habit_ids))
+        if len(habit_names) > 0:
+            identifiers.append(cls.name.in_(habit_names))
+
+        if len(identifiers) == 0:
+            return cls.periodicity == periodicity if periodicity is not None else None
+        if periodicity is None:
+            return or_(*identifiers)
+        return or_(*identifiers) & (cls.periodicity == periodicity)
+
+    @classmethod
+    def complete_many(cls, session: Session, habits: Iterable['Habit']) -> Dict[int, Optional[tuple[HabitEntry, bool]]]:
+        """
+        Completes multiple Habits within a single transaction.
+
+        The transaction takes the write lock upfront (BEGIN IMMEDIATE) and is retried if the database is locked by another process.
+        Entries are inserted with one statement, the unique period index rejects periods that have already been completed.
+        Streaks and aggregates are updated with SQL expressions on the stored values, so concurrent completions never overwrite each other.
+
+        :param session: The SQLAlchemy session object.
+        :param habits: Habits to be completed. Duplicates are only completed once.
+
+        :returns Dict[int, Optional[tuple[HabitEntry, bool]]]: Result of Habit.complete per Habit ID.
+        """
+        habits = {target_habit.habit_id: target_habit for target_habit in habits}
+        results: Dict[int, Optional[tuple[HabitEntry, bool]]] = {habit_id: None for habit_id in habits}
+
+        # Habits that are known to be completed in the current period are skipped without taking the write lock
+        pending = [target_habit for target_habit in habits.values()
+                   if target_habit.last_completion is None or target_habit.__check_streak_validity(last_completion=target_habit.last_completion) is not None]
+        if len(pending) == 0:
+            return results
+
+        results.update(retry_on_busy(session=session, operation=lambda: cls.__insert_completions(session=session, habits=pending)))
+        return results
+
 # endregion
 
 # region Helpers
 
+    @classmethod
+    def __insert_completions(cls, session: Session, habits: List['Habit']) -> Dict[int, tuple[HabitEntry, bool]]:
+        """
+        Completes the given Habits within a single write transaction and commits it.
+
+        :param session: The SQLAlchemy session object.
+        :param habits: Habits to be completed.
+
+        :returns Dict[int, tuple[HabitEntry, bool]]: Created HabitEntry and whether the streak has been broken per completed Habit ID.
+        """
+        begin_immediate(session=session)
+
+        completion_date = datetime.now()
+        new_entries: Dict[int, HabitEntry]
+        new_entries = {new_entry.habit_id: new_entry for new_entry in session.scalars(cls.insert_entries_statement().returning(HabitEntry), [
+            cls.entry_values(habit_id=target_habit.habit_id, periodicity=target_habit.periodicity, completion_date=completion_date) for target_habit in habits
+        ])}
+
+        results: Dict[int, tuple[HabitEntry, bool]] = {}
+        if len(new_entries) > 0:
+            statement = cls.update_completed_statement(habit_ids=new_entries.keys(), completion_date=completion_date).execution_options(synchronize_session='fetch')
+            for habit_id, streak, total_completions in session.execute(statement):
+                # A new streak after earlier completions means the previous streak has been broken
+                results[habit_id] = (new_entries[habit_id], streak == 1 and total_completions > 1)
+
+        commit(session=session)
+
+        return results
+
+    @classmethod
+    def update_completed_statement(cls, habit_ids: Iterable[int], completion_date: datetime) -> Update:
+        """
+        Returns a statement updating the streaks and aggregates of Habits that have just been completed.
+        The streak continues if the directly preceding period has been completed, otherwise a new one is started.
+
+        :param habit_ids: IDs of the completed Habits.
+        :param completion_date: Date of the completion
+
+        :returns Update: SQLAlchemy Update statement returning the ID, new streak and new total completions
+        """
+        previous_period = case(*[(cls.periodicity == periodicity, periodicity.period_index(value=completion_date.date()) - 1) for periodicity in Periodicity])
+        continued = exists().where(HabitEntry.habit_id == cls.habit_id, HabitEntry.period_key == previous_period)
+        new_streak = case((continued, cls.streak + 1), else_=1)
+
+        return (update(cls)
+                .where(cls.habit_id.in_(habit_ids))
+                .values(streak=new_streak,
+                        highest_streak=func.max(cls.highest_streak, new_streak),
+                        total_completions=cls.total_completions + 1,
+                        last_completion=completion_date)
+                .returning(cls.habit_id, cls.streak, cls.total_completions))
+
+    @staticmethod
+    def entry_values(habit_id: int, periodicity: Periodicity, completion_date: datetime) -> Dict[str, int | datetime]:
+        """
+        Returns the values of a new HabitEntry completing a Habit at the given time.
+
+        :param habit_id: ID of the completed Habit.
+        :param periodicity: Periodicity of the completed Habit.
+        :param completion_date: Date of the completion
+
+        :returns Dict[str, int | datetime]: Values for insert_entries_statement
+        """
+        return {'habit_id': habit_id, 'completion_date': completion_date, 'period_key': periodicity.period_index(value=completion_date.date())}
+
+    @staticmethod
+    def insert_entries_statement() -> Insert:
+        """
+        Returns a statement inserting HabitEntries, see entry_values.
+        Entries for a period that has already been completed are skipped by the unique period index,
+        which makes the check atomic even if multiple processes complete the same Habit at once.
+
+        :returns Insert: SQLAlchemy Insert statement
+        """
+        return insert(HabitEntry).on_conflict_do_nothing(index_elements=[HabitEntry.habit_id, HabitEntry.period_key])
+
     def __check_streak_validity(self, last_completion: datetime) -> Optional[bool]:
         """
         Checks if the current Habit streak is still active.
@@ -159,28 +329,15 @@ class Habit(Base):
 
         :returns bool: True if the streak is still active, False otherwise.
         """
-        current_date = date.today()
-        last_completion_date = last_completion.date()
+        current_period = self.periodicity.period_index(value=date.today())
+        last_completion_period = self.periodicity.period_index(value=last_completion.date())
 
-        break_date: date
-        if self.periodicity is Periodicity.Daily:
-            # If we already completed the Habit today, don't do anything
-            if last_completion_date == current_date:
-                return None
-
-            break_date = last_completion_date + timedelta(days=2)
-        else:
-            last_completion_week = last_completion_date.isocalendar().week
-            current_week = current_date.isocalendar().week
-
-            # If we already completed the Habit this week, don't do anything
-            if last_completion_week == current_week:
-                return None
-
-            days_until_monday = 7 - last_completion_date.weekday() if last_completion_date.weekday() > 0 else 0       # Get the number of days till Monday
-            break_date = last_completion_date + timedelta(days=days_until_monday + 7)                                 # Add another week
+        # If we already completed the Habit in the current period, don't do anything
+        if last_completion_period >= current_period:
+            return None
 
-        return current_date < break_date
+        # The streak is only kept if the last completion was in the directly preceding period
+        return current_period - last_completion_period == 1
 
     @classmethod
     def exists(cls, session: Session, habit_name: str) -> bool:
@@ -1,7 +1,7 @@
 from datetime import datetime
 from typing import Optional
 
-from sqlalchemy import func, Integer, ForeignKey
+from sqlalchemy import func, Integer, ForeignKey, Index
 from sqlalchemy.orm import Mapped, mapped_column
 
 from classes.orm.base import Base
@@ -9,10 +9,17 @@ from classes.orm.base import Base
 
 class HabitEntry(Base):
     __tablename__ = "habit_entry"
+    __table_args__ = (
+        Index('index_habit_entry_completion', 'habit_id', 'completion_date'),
+        Index('unique_habit_entry_period', 'habit_id', 'period_key', unique=True),
+    )
 
     habit_entry_id: Mapped[int] = mapped_column(Integer(), name='id', primary_key=True, autoincrement=True)
     habit_id: Mapped[int] = mapped_column(ForeignKey('habit.id', ondelete='CASCADE'))
-    completion_date: Mapped[Optional[datetime]] = mapped_column(default=datetime.today(), server_default=func.current_timestamp())
+    completion_date: Mapped[Optional[datetime]] = mapped_column(default=datetime.now, server_default=func.current_timestamp())
+
+    # Periodicity.period_index of the completion. Only set for the first entry of each period, further entries (e.g. from old databases) keep NULL.
+    period_key: Mapped[Optional[int]] = mapped_column(Integer(), nullable=True)
 
     def __repr__(self) -> str:
         return f'HabitEntry(id={self.habit_id!r}, habit_id={self.habit_id!r}, completion_date={self.completion_date!r})'
@@ -0,0 +1,24 @@
+from datetime import datetime
+
+from sqlalchemy import Integer, ForeignKey
+from sqlalchemy.orm import Mapped, mapped_column
+
+from classes.orm.base import Base
+
+
+class HabitEntrySummary(Base):
+    __tablename__ = "habit_entry_summary"
+    # Rows are only ever looked up by their primary key, storing them in its B-tree saves the separate rowid index
+    __table_args__ = {'sqlite_with_rowid': False}
+
+    habit_id: Mapped[int] = mapped_column(ForeignKey('habit.id', ondelete='CASCADE'), primary_key=True)
+    # date.toordinal() of the first day of the summarized month
+    month: Mapped[int] = mapped_column(Integer(), primary_key=True)
+
+    # Number of compacted completions and bitmap of the completed days of the month (bit 0 is the first day)
+    completion_count: Mapped[int] = mapped_column(Integer(), nullable=False)
+    completed_days: Mapped[int] = mapped_column(Integer(), nullable=False)
+    last_completion: Mapped[datetime] = mapped_column(nullable=False)
+
+    def __repr__(self) -> str:
+        return f'HabitEntrySummary(habit_id={self.habit_id!r}, month={self.month!r}, completion_count={self.completion_count!r})'
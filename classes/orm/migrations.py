@@ -0,0 +1,205 @@
+from typing import Callable, List
+
+from sqlalchemy import Connection, Engine
+
+
+def migration_001_create_tables(connection: Connection) -> None:
+    """
+    Creates the initial Habit and HabitEntry tables.
+    Databases created before versioning already contain these tables and are left untouched.
+
+    :param connection: The SQLAlchemy connection object.
+    """
+    connection.exec_driver_sql("""
+        CREATE TABLE IF NOT EXISTS habit (
+            id INTEGER NOT NULL,
+            name VARCHAR NOT NULL,
+            periodicity VARCHAR(6) NOT NULL,
+            streak INTEGER NOT NULL,
+            highest_streak INTEGER NOT NULL,
+            creation_date DATETIME DEFAULT CURRENT_TIMESTAMP NOT NULL,
+            PRIMARY KEY (id),
+            CONSTRAINT check_habit_name CHECK (length(name) >= 1),
+            CONSTRAINT check_periodicity CHECK (periodicity IN ('Daily', 'Weekly'))
+        )
+    """)
+    connection.exec_driver_sql("""
+        CREATE TABLE IF NOT EXISTS habit_entry (
+            id INTEGER NOT NULL,
+            habit_id INTEGER NOT NULL,
+            completion_date DATETIME DEFAULT CURRENT_TIMESTAMP,
+            PRIMARY KEY (id),
+            FOREIGN KEY(habit_id) REFERENCES habit (id) ON DELETE CASCADE
+        )
+    """)
+
+
+def migration_002_create_lookup_indexes(connection: Connection) -> None:
+    """
+    Creates the completion index on HabitEntry and the unique name index on Habit.
+    Habit names were not unique before, duplicates are renamed to "<name> (<id>)" to allow creating the index.
+    If that name is taken as well (e.g. by a Habit called "<name> (<id>)"), a counter is appended: "<name> (<id>, 2)", "<name> (<id>, 3)", ...
+
+    :param connection: The SQLAlchemy connection object.
+    """
+    duplicates = connection.exec_driver_sql('SELECT id, name FROM habit WHERE id NOT IN (SELECT min(id) FROM habit GROUP BY name) ORDER BY id').all()
+    for habit_id, name in duplicates:
+        new_name, counter = f'{name} ({habit_id})', 1
+        # Checked against all Habits, including the ones renamed before
+        while connection.exec_driver_sql('SELECT 1 FROM habit WHERE name = ?', (new_name,)).first() is not None:
+            counter += 1
+            new_name = f'{name} ({habit_id}, {counter})'
+        connection.exec_driver_sql('UPDATE habit SET name = ? WHERE id = ?', (new_name, habit_id))
+
+    connection.exec_driver_sql('CREATE INDEX IF NOT EXISTS index_habit_entry_completion ON habit_entry (habit_id, completion_date)')
+    connection.exec_driver_sql('CREATE UNIQUE INDEX IF NOT EXISTS unique_habit_name ON habit (name)')
+
+
+def migration_003_add_completion_aggregates(connection: Connection) -> None:
+    """
+    Adds the total_completions and last_completion aggregates to Habit, backfills them from the completion history
+    and creates the indexes used for sorting by them.
+
+    :param connection: The SQLAlchemy connection object.
+    """
+    connection.exec_driver_sql("ALTER TABLE habit ADD COLUMN total_completions INTEGER DEFAULT '0' NOT NULL")
+    connection.exec_driver_sql('ALTER TABLE habit ADD COLUMN last_completion DATETIME')
+    connection.exec_driver_sql("""
+        UPDATE habit SET
+            total_completions = (SELECT count(*) FROM habit_entry WHERE habit_entry.habit_id = habit.id),
+            last_completion = (SELECT max(completion_date) FROM habit_entry WHERE habit_entry.habit_id = habit.id)
+    """)
+    connection.exec_driver_sql('CREATE INDEX IF NOT EXISTS index_habit_total_completions ON habit (total_completions)')
+    connection.exec_driver_sql('CREATE INDEX IF NOT EXISTS index_habit_last_completion ON habit (last_completion)')
+
+
+def migration_004_add_entry_period_key(connection: Connection) -> None:
+    """
+    Adds the period_key to HabitEntry, backfills it from the completion date and the Periodicity of the Habit
+    and creates the unique index on (habit_id, period_key).
+    Only the first entry of each period receives a key, further entries of the same period keep NULL.
+
+    :param connection: The SQLAlchemy connection object.
+    """
+    connection.exec_driver_sql('ALTER TABLE habit_entry ADD COLUMN period_key INTEGER')
+    # Same computation as Periodicity.period_index, 1721425 converts the Julian day number to date.toordinal()
+    connection.exec_driver_sql("""
+        UPDATE habit_entry SET period_key = (
+            SELECT CASE habit.periodicity
+                WHEN 'Weekly' THEN (CAST(julianday(habit_entry.completion_date) + 0.5 AS INTEGER) - 1721425 - 1) / 7
+                ELSE CAST(julianday(habit_entry.completion_date) + 0.5 AS INTEGER) - 1721425
+            END
+            FROM habit WHERE habit.id = habit_entry.habit_id
+        )
+    """)
+    connection.exec_driver_sql("""
+        UPDATE habit_entry SET period_key = NULL
+        WHERE id NOT IN (SELECT min(id) FROM habit_entry GROUP BY habit_id, period_key)
+    """)
+    connection.exec_driver_sql('CREATE UNIQUE INDEX IF NOT EXISTS unique_habit_entry_period ON habit_entry (habit_id, period_key)')
+
+
+def migration_005_create_sort_indexes(connection: Connection) -> None:
+    """
+    Creates indexes on the remaining sort targets of analytics list, so that sorted pages are read from an index.
+
+    :param connection: The SQLAlchemy connection object.
+    """
+    connection.exec_driver_sql('CREATE INDEX IF NOT EXISTS index_habit_streak ON habit (streak)')
+    connection.exec_driver_sql('CREATE INDEX IF NOT EXISTS index_habit_highest_streak ON habit (highest_streak)')
+    connection.exec_driver_sql('CREATE INDEX IF NOT EXISTS index_habit_periodicity ON habit (periodicity)')
+    connection.exec_driver_sql('CREATE INDEX IF NOT EXISTS index_habit_creation_date ON habit (creation_date)')
+
+
+def migration_006_create_entry_summaries(connection: Connection) -> None:
+    """
+    Creates the HabitEntrySummary table, which holds the completions rolled up by the compact command.
+
+    :param connection: The SQLAlchemy connection object.
+    """
+    connection.exec_driver_sql("""
+        CREATE TABLE IF NOT EXISTS habit_entry_summary (
+            habit_id INTEGER NOT NULL,
+            month INTEGER NOT NULL,
+            completion_count INTEGER NOT NULL,
+            completed_days INTEGER NOT NULL,
+            last_completion DATETIME NOT NULL,
+            PRIMARY KEY (habit_id, month),
+            FOREIGN KEY(habit_id) REFERENCES habit (id) ON DELETE CASCADE
+        ) WITHOUT ROWID
+    """)
+
+
+# Migrations are applied in order, the position in this list (starting at 1) is the schema version they migrate to.
+# Existing migrations must never be changed or reordered, schema changes are always added as a new migration.
+MIGRATIONS: List[Callable[[Connection], None]] = [
+    migration_001_create_tables,
+    migration_002_create_lookup_indexes,
+    migration_003_add_completion_aggregates,
+    migration_004_add_entry_period_key,
+    migration_005_create_sort_indexes,
+    migration_006_create_entry_summaries,
+]
+
+SCHEMA_VERSION = len(MIGRATIONS)
+
+
+def get_schema_version(connection: Connection) -> int:
+    """
+    Retrieves the schema version of the database.
+
+    :param connection: The SQLAlchemy connection object.
+
+    :returns int: Current schema version. 0 for new databases or databases created before versioning.
+    """
+    return connection.exec_driver_sql('PRAGMA user_version').scalar()
+
+
+def migrate(engine: Engine) -> bool:
+    """
+    Brings the database schema up to date by applying all pending migrations in a single transaction.
+    If the stored schema version is current, no DDL is executed at all.
+
+    :param engine: SQLAlchemy Engine of the target database.
+
+    :returns bool: True if migrations were applied, False if the schema was already up-to-date.
+    :raises ValueError: Migrations are pending, but the connections of the engine are read-only
+    """
+    with engine.connect() as connection:
+        return migrate_connection(connection=connection)
+
+
+def migrate_connection(connection: Connection) -> bool:
+    """
+    Brings the database schema up to date on the given connection, see migrate.
+    Used for AsyncEngines through AsyncConnection.run_sync.
+
+    :param connection: The SQLAlchemy connection object. Must not be within a transaction.
+
+    :returns bool: True if migrations were applied, False if the schema was already up-to-date.
+    :raises ValueError: Migrations are pending, but the connection is read-only (readonly-analytics profile)
+    """
+    version = get_schema_version(connection=connection)
+    if version >= SCHEMA_VERSION:
+        return False
+
+    # query_only connections reject the write lock with a bare "attempt to write a readonly database"
+    if connection.exec_driver_sql('PRAGMA query_only').scalar():
+        raise ValueError(f'The database schema is outdated (version {version} of {SCHEMA_VERSION}) and can not be migrated by a read-only connection! '
+                         'Run any command with another profile (e.g. TRACKER_DB_PROFILE=durable) once to migrate it.')
+
+    # Take the write lock before re-reading the version, another process might have migrated in the meantime
+    connection.exec_driver_sql('BEGIN IMMEDIATE')
+    version = get_schema_version(connection=connection)
+    if version >= SCHEMA_VERSION:
+        connection.rollback()
+        return False
+
+    for migration in MIGRATIONS[version:]:
+        migration(connection)
+
+    # PRAGMA statements do not support bound parameters, SCHEMA_VERSION is always an int
+    connection.exec_driver_sql(f'PRAGMA user_version = {SCHEMA_VERSION:d}')
+    connection.commit()
+
+    return True
@@ -1,3 +1,4 @@
+from datetime import date
 from enum import Enum
 from typing import Optional
 
@@ -25,3 +26,33 @@ class Periodicity(Enum):
             return Periodicity.Weekly
         else:
             raise NotImplementedError
+
+    def period_index(self, value: date) -> int:
+        """
+        Converts a date to the index of the period it belongs to.
+        Consecutive periods have consecutive indexes, also across year boundaries.
+        Daily periods are counted by the date's ordinal, weekly periods by the number of ISO weeks (Monday - Sunday) since 0001-01-01.
+
+        :param value: Input Date
+
+        :returns int: Index of the Period
+        """
+        if self is Periodicity.Daily:
+            return value.toordinal()
+
+        # 0001-01-01 (ordinal 1) is a Monday
+        return (value.toordinal() - 1) // 7
+
+    def period_start(self, period_index: int) -> date:
+        """
+        Converts the index of a period back to the first date of the period.
+        Inverse of period_index.
+
+        :param period_index: Index of the Period
+
+        :returns date: First date of the Period
+        """
+        if self is Periodicity.Daily:
+            return date.fromordinal(period_index)
+
+        return date.fromordinal(period_index * 7 + 1)
@@ -0,0 +1,230 @@
+import hmac
+import io
+import json
+import os
+import secrets
+import sys
+import time
+import traceback
+from contextlib import redirect_stdout, redirect_stderr
+from http.server import BaseHTTPRequestHandler
+from socketserver import TCPServer
+from typing import List
+
+import click
+
+from helpers.remote import REMOTE_COMMANDS, SERVER_HOST, SERVER_HOSTNAMES, COMMANDS_PATH, HEALTH_PATH, token_path
+
+# Seconds a connection may stay idle, an idle client would otherwise block the server
+REQUEST_TIMEOUT = 10
+
+# Read-only commands run on startup, so that the first request neither imports the commands nor compiles their statements
+WARM_UP_COMMANDS = [
+    ['analytics', 'list', '--limit', '1'],
+    ['analytics', 'streak'],
+]
+
+
+class TrackerServer(TCPServer):
+    """
+    Local HTTP server that runs habit and analytics commands within a long-running process.
+    Every command uses the same database engine, so its pooled connections, their prepared statements and page cache,
+    the compiled statements and the imported modules are reused instead of being set up by every invocation.
+
+    Requests are handled one at a time: commands redirect the process-wide stdout and stderr while they run,
+    and SQLite only allows a single writer anyway.
+
+    Commands are only run for clients that send the token of the server, which is written to a file only the user can read (see token_path).
+    """
+    # Based on TCPServer, as HTTPServer resolves the fully qualified name of the host on startup
+    # A restarted server does not have to wait for the connections of the previous one to time out
+    allow_reuse_address = True
+
+    def __init__(self, port: int, command: click.Command, obj: dict, prog_name: str = 'tracker.py') -> None:
+        """
+        :param port: Port the server listens on. 0 picks a free port.
+        :param command: Root command the arguments of every request are passed to.
+        :param obj: Object of the click context of every command, contains the shared session maker.
+        :param prog_name: Program name shown in usage and help texts.
+        """
+        super().__init__(server_address=(SERVER_HOST, port), RequestHandlerClass=TrackerRequestHandler)
+        self.command = command
+        self.obj = obj
+        self.prog_name = prog_name
+        self.command_count = 0
+        self.token = secrets.token_urlsafe(32)
+        self.__write_token()
+
+    @property
+    def port(self) -> int:
+        """
+        Port the server listens on.
+        """
+        return self.server_address[1]
+
+    def server_close(self) -> None:
+        super().server_close()
+        try:
+            os.remove(token_path(port=self.port))
+        except OSError:
+            pass
+
+    def warm_up(self) -> None:
+        """
+        Creates the database engine, migrates the schema and runs WARM_UP_COMMANDS. Their output is discarded.
+        """
+        for args in WARM_UP_COMMANDS:
+            self.run_command(args=args)
+
+    def run_command(self, args: List[str], input_: str = '') -> dict:
+        """
+        Runs a command and captures its output.
+
+        :param args: Arguments of the command, starting with one of REMOTE_COMMANDS.
+        :param input_: Input of the command, answers its prompts. Prompts without input abort the command.
+
+        :returns dict: "exit_code", "stdout" and "stderr" of the command as well as its "duration_ms"
+        """
+        if len(args) == 0 or args[0] not in REMOTE_COMMANDS:
+            return {'exit_code': 2, 'stdout': '', 'stderr': f'Error: Only the {" and ".join(REMOTE_COMMANDS)} commands can be run remotely!\n', 'duration_ms': 0.0}
+
+        stdout, stderr = io.StringIO(), io.StringIO()
+        stdin = sys.stdin
+        start = time.perf_counter()
+        try:
+            sys.stdin = io.StringIO(input_)
+            with redirect_stdout(stdout), redirect_stderr(stderr):
+                # Standalone mode handles usage errors and aborts like a regular invocation and always ends with SystemExit
+                self.command.main(args=args, prog_name=self.prog_name, obj=dict(self.obj), standalone_mode=True)
+            exit_code = 0
+        except SystemExit as exit_:
+            exit_code = exit_.code if isinstance(exit_.code, int) else int(exit_.code is not None)
+        except Exception as error:
+            traceback.print_exc()
+            stderr.write(f'Error: {error}\n')
+            exit_code = 1
+        finally:
+            sys.stdin = stdin
+
+        return {'exit_code': exit_code, 'stdout': stdout.getvalue(), 'stderr': stderr.getvalue(), 'duration_ms': (time.perf_counter() - start) * 1000}
+
+# region Helpers
+
+    def __write_token(self) -> None:
+        """
+        Writes the token of the server to its token file, which only the user can read and write (mode 0600).
+        The file is created under a temporary name and then replaced, so that clients never read a partially written token.
+        """
+        path = token_path(port=self.port)
+        os.makedirs(os.path.dirname(path), mode=0o700, exist_ok=True)
+
+        temporary_path = f'{path}.{os.getpid()}.tmp'
+        descriptor = os.open(temporary_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with os.fdopen(descriptor, 'w', encoding='ascii') as file:
+            file.write(self.token)
+        os.replace(temporary_path, path)
+
+# endregion
+
+
+class TrackerRequestHandler(BaseHTTPRequestHandler):
+    """
+    JSON API of the TrackerServer.
+
+    POST /commands with {"args": [...], "input": "..."} runs a command, see TrackerServer.run_command.
+    GET /health returns the status of the server and the number of commands it has run.
+
+    Browsers can send requests to local servers from any web page, commands therefore require
+    - a Host header naming the server, which fails for DNS rebinding,
+    - no Origin header, which browsers send with every cross-origin POST,
+    - the Content-Type application/json, which browsers only send cross-origin after a preflight the server never approves,
+    - the token of the server as "Authorization: Bearer <token>".
+    """
+    server: TrackerServer
+    timeout = REQUEST_TIMEOUT
+
+    def do_GET(self) -> None:
+        if self.__rejected(command=False):
+            return
+        if self.path != HEALTH_PATH:
+            self.__send_json(status=404, body={'error': f'Unknown path {self.path}!'})
+            return
+
+        self.__send_json(status=200, body={'status': 'ok', 'commands': self.server.command_count})
+
+    def do_POST(self) -> None:
+        # Read before the request is checked, closing the connection with unread data may reset it before the client reads the response
+        try:
+            body = self.rfile.read(int(self.headers.get('Content-Length', 0)))
+        except ValueError:
+            body = None
+
+        if self.__rejected(command=True):
+            return
+        if self.path != COMMANDS_PATH:
+            self.__send_json(status=404, body={'error': f'Unknown path {self.path}!'})
+            return
+
+        try:
+            if body is None:
+                raise ValueError('Invalid Content-Length!')
+            request = json.loads(body)
+            args, input_ = request['args'], request.get('input', '')
+            if not isinstance(args, list) or not all(isinstance(arg, str) for arg in args) or not isinstance(input_, str):
+                raise TypeError('Invalid arguments!')
+        except (ValueError, KeyError, TypeError):
+            self.__send_json(status=400, body={'error': 'Malformed request, expected {"args": [...], "input": "..."}!'})
+            return
+
+        self.server.command_count += 1
+        self.__send_json(status=200, body=self.server.run_command(args=args, input_=input_))
+
+    def log_message(self, format_: str, *args) -> None:
+        # Requests are not logged, errors of commands are printed by TrackerServer.run_command
+        pass
+
+# region Helpers
+
+    def __rejected(self, command: bool) -> bool:
+        """
+        Checks the headers of the request and sends an error response if they are not allowed, see TrackerRequestHandler.
+
+        :param command: Whether the request runs a command, which additionally requires the Content-Type and token.
+
+        :returns bool: Whether the request was rejected
+        """
+        if self.headers.get('Host', '').lower() not in [f'{hostname}:{self.server.port}' for hostname in SERVER_HOSTNAMES]:
+            self.__send_json(status=403, body={'error': 'Invalid Host header!'})
+            return True
+        if 'Origin' in self.headers:
+            self.__send_json(status=403, body={'error': 'Requests from web pages are not allowed!'})
+            return True
+        if not command:
+            return False
+
+        if self.headers.get('Content-Type', '').split(';', maxsplit=1)[0].strip().lower() != 'application/json':
+            self.__send_json(status=415, body={'error': 'Content-Type must be application/json!'})
+            return True
+
+        scheme, _, token = self.headers.get('Authorization', '').partition(' ')
+        if scheme.lower() != 'bearer' or not hmac.compare_digest(token.strip().encode('utf-8'), self.server.token.encode('ascii')):
+            self.__send_json(status=401, body={'error': f'Missing or invalid token, the token of the server is stored in {token_path(port=self.server.port)}!'})
+            return True
+
+        return False
+
+    def __send_json(self, status: int, body: dict) -> None:
+        """
+        Sends a JSON response.
+
+        :param status: HTTP status code.
+        :param body: Body of the response.
+        """
+        data = json.dumps(body).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+# endregion
@@ -0,0 +1,72 @@
+from typing import Optional, Iterable
+
+from sqlalchemy import select, update, union_all, func, or_, Select
+from sqlalchemy.orm import Session
+
+from classes.orm.habit import Habit
+from classes.orm.habit_entry import HabitEntry
+from classes.orm.habit_entry_summary import HabitEntrySummary
+
+REBUILD_BATCH_SIZE = 1000
+
+
+def rebuild_aggregates(session: Session, habit_ids: Optional[Iterable[int]] = None, batch_size: int = REBUILD_BATCH_SIZE) -> None:
+    """
+    Recomputes the completion aggregates (total_completions, last_completion) of Habits from their completion history, including compacted completions.
+    Each Habit is updated through correlated subqueries, which use the completion index instead of scanning all entries.
+
+    Changes are flushed, committing is up to the caller.
+
+    :param session: The SQLAlchemy session object.
+    :param habit_ids: IDs of the Habits to rebuild. All Habits are rebuilt if None.
+    :param batch_size: Number of Habits updated per statement.
+    """
+    entry_total = select(func.count()).where(HabitEntry.habit_id == Habit.habit_id).scalar_subquery()
+    entry_last = select(func.max(HabitEntry.completion_date)).where(HabitEntry.habit_id == Habit.habit_id).scalar_subquery()
+    summary_total = select(func.coalesce(func.sum(HabitEntrySummary.completion_count), 0)).where(HabitEntrySummary.habit_id == Habit.habit_id).scalar_subquery()
+    summary_last = select(func.max(HabitEntrySummary.last_completion)).where(HabitEntrySummary.habit_id == Habit.habit_id).scalar_subquery()
+
+    total_completions = entry_total + summary_total
+    # The scalar max() of SQLite is NULL if any argument is, Habits may have only entries, only summaries or neither
+    last_completion = func.max(func.coalesce(entry_last, summary_last), func.coalesce(summary_last, entry_last))
+    statement = (update(Habit)
+                 .values(total_completions=total_completions, last_completion=last_completion)
+                 .execution_options(synchronize_session=False))
+
+    if habit_ids is None:
+        session.execute(statement)
+        return
+
+    habit_ids = sorted(set(habit_ids))
+    for start in range(0, len(habit_ids), batch_size):
+        session.execute(statement.where(Habit.habit_id.in_(habit_ids[start:start + batch_size])))
+
+
+def aggregate_mismatches_statement() -> Select:
+    """
+    Builds a query returning every Habit whose stored completion aggregates differ from its completion history, including compacted completions.
+
+    Rows contain the Habit ID, Name, stored and actual total completions as well as stored and actual last completion.
+
+    :returns Select: SQLAlchemy Select statement
+    """
+    history = union_all(select(HabitEntry.habit_id,
+                               func.count().label('total_completions'),
+                               func.max(HabitEntry.completion_date).label('last_completion'))
+                        .group_by(HabitEntry.habit_id),
+                        select(HabitEntrySummary.habit_id,
+                               func.sum(HabitEntrySummary.completion_count),
+                               func.max(HabitEntrySummary.last_completion))
+                        .group_by(HabitEntrySummary.habit_id)
+                        ).subquery('history')
+    actual = (select(history.c.habit_id,
+                     func.sum(history.c.total_completions).label('total_completions'),
+                     func.max(history.c.last_completion).label('last_completion'))
+              .group_by(history.c.habit_id)
+              .subquery('actual'))
+    actual_total_completions = func.coalesce(actual.c.total_completions, 0)
+
+    return (select(Habit.habit_id, Habit.name, Habit.total_completions, actual_total_completions, Habit.last_completion, actual.c.last_completion)
+            .join(actual, actual.c.habit_id == Habit.habit_id, isouter=True)
+            .where(or_(Habit.total_completions != actual_total_completions, Habit.last_completion.is_distinct_from(actual.c.last_completion)))
+            .order_by(Habit.habit_id))
@@ -1,50 +1,184 @@
-from typing import Type, List, Optional, Tuple
+import csv
+import json
+import sys
+from datetime import datetime
+from itertools import islice
+from typing import Type, List, Optional, Iterable, Iterator, TextIO, TYPE_CHECKING
 
 import click
-from sqlalchemy import Row
-from tabulate import tabulate
 
+from classes.helpers.profiler import profile_phase
 from classes.helpers.terminal_options import TerminalColor, TerminalFormat
-from classes.orm.habit import Habit
+from classes.periodicity import Periodicity
 
+if TYPE_CHECKING:
+    from click.shell_completion import CompletionItem
+    from sqlalchemy import Row
+    from classes.helpers.name_index import NameIndex
+    from classes.orm.habit import Habit
 
-def list_habits(habits: List[Type[Habit] | Row], extra_headers: Optional[List[str]] = None) -> None:
+OUTPUT_FORMATS = ['table', 'json', 'jsonl', 'csv']
+
+# Number of rows fetched from the database at once and rendered per table
+LIST_CHUNK_SIZE = 1000
+
+# Maximum number of candidates offered by the shell completion of --name and --id
+COMPLETION_LIMIT = 100
+
+
+def list_habits(habits: Iterable[Type['Habit'] | 'Row'], extra_headers: Optional[List[str]] = None, format_: str = 'table') -> None:
     """
-    Prints a formatted table of the given list of habits.
+    Prints the given habits in the given format.
+    Habits are consumed lazily, so that streamed results are written without loading them into memory at once.
+    Tables are rendered in chunks of LIST_CHUNK_SIZE rows, every chunk repeats the headers.
 
-    :param habits: List of Habits to be printed
+    :param habits: Habits to be printed. Either Habit objects or rows starting with either a Habit object or its ID, Name, Streaks and Periodicity.
     :param extra_headers: List of extra headers to be added to the table
+    :param format_: Output Format. One of OUTPUT_FORMATS.
     """
-    data = []
+    from tabulate import tabulate
+
     headers = ["ID", "Name", "Current Streak", "Longest Streak", "Periodicity"]
     if extra_headers is not None:
         headers.extend(extra_headers)
 
-    if isinstance(habits[0], Habit):
-        for habit in habits:
-            data.append([habit.habit_id, habit.name, habit.streak, habit.highest_streak, habit.periodicity.name])
-    elif isinstance(habits[0], Row):
-        for habit in habits:
-            habit_data = []
-            for field in habit:
-                if isinstance(field, Habit):
-                    habit_data.extend([field.habit_id, field.name, field.streak, field.highest_streak, field.periodicity.name])
-                else:
-                    habit_data.append(field)
-            data.append(habit_data)
+    # Streamed rows are fetched while they are rendered, the render phase of --profile includes fetching them
+    with profile_phase(name='render'):
+        rows = get_habit_rows(habits=habits)
+        output = sys.stdout
+
+        if format_ == 'table':
+            first_chunk = True
+            while len(chunk := list(islice(rows, LIST_CHUNK_SIZE))) > 0:
+                if not first_chunk:
+                    output.write('\n')
+                output.write(tabulate(tabular_data=chunk, headers=headers))
+                output.write('\n')
+                first_chunk = False
 
-    print(tabulate(tabular_data=data, headers=headers))
+            if first_chunk:
+                colored_print(message='No Habits found.', color=TerminalColor.YELLOW)
+            return
 
+        keys = [header.lower().replace(' ', '_') for header in headers]
+        records = (dict(zip(keys, [value.isoformat(sep=' ') if type(value) is datetime else value for value in row])) for row in rows)
+        write_records(records=records, keys=keys, format_=format_, output=output)
 
-def colored_print(message: str, color: Optional[TerminalColor] = None, format_: Optional[TerminalFormat] = None) -> None:
+
+def colored_print(message: str, color: Optional[TerminalColor] = None, format_: Optional[TerminalFormat] = None, err: bool = False) -> None:
     """
     Prints an error message in a formatted way.
 
     :param message: Message to be printed
     :param color: Color of the message
     :param format_: Format of the message
+    :param err: Print to stderr instead of stdout
     """
     color = color.value if color is not None else ''
     format_ = format_.value if format_ is not None else ''
 
-    click.echo(message=f'{color}{format_}{message}\033[0m', color=True)
+    click.echo(message=f'{color}{format_}{message}\033[0m', color=True, err=err)
+
+
+def complete_habit_names(ctx: click.Context, param: click.Parameter, incomplete: str) -> List['CompletionItem']:
+    """
+    Shell completion of Habit Names (click shell_complete callback). Names are matched by prefix, ignoring case.
+    Served from the name index of the configured database, see NameIndex.
+
+    :param ctx: Context of the completed command.
+    :param param: Completed option.
+    :param incomplete: Value typed so far.
+
+    :returns List[CompletionItem]: Matching Names
+    """
+    from click.shell_completion import CompletionItem
+
+    index = load_name_index()
+    if index is None:
+        return []
+    return [CompletionItem(value=name) for name in index.complete_names(prefix=incomplete, limit=COMPLETION_LIMIT)]
+
+
+def complete_habit_ids(ctx: click.Context, param: click.Parameter, incomplete: str) -> List['CompletionItem']:
+    """
+    Shell completion of Habit IDs (click shell_complete callback). The Name of every ID is passed as its help text.
+    Served from the name index of the configured database, see NameIndex.
+
+    :param ctx: Context of the completed command.
+    :param param: Completed option.
+    :param incomplete: Value typed so far.
+
+    :returns List[CompletionItem]: Matching IDs
+    """
+    from click.shell_completion import CompletionItem
+
+    index = load_name_index()
+    if index is None:
+        return []
+    return [CompletionItem(value=habit_id, help=name) for habit_id, name in index.complete_ids(prefix=incomplete, limit=COMPLETION_LIMIT)]
+
+
+# region Helpers
+
+def load_name_index() -> Optional['NameIndex']:
+    """
+    Loads the name index of the configured database.
+    The group callback, which would usually load the configuration, is not run for shell completions.
+
+    :returns Optional[NameIndex]: Name index. None if the configuration is invalid.
+    """
+    from classes.helpers.name_index import NameIndex
+    from helpers.database import load_database_config
+
+    try:
+        config = load_database_config()
+    except ValueError:
+        return None
+    return NameIndex.load(database_path=config['path'])
+
+
+def get_habit_rows(habits: Iterable[Type['Habit'] | 'Row']) -> Iterator[list]:
+    """
+    Converts the given habits into rows of plain values.
+
+    :param habits: Habits as accepted by list_habits
+
+    :returns Iterator[list]: ID, Name, Current Streak, Longest Streak, Periodicity (Name) and any further values per Habit
+    """
+    from classes.orm.habit import Habit
+
+    for habit in habits:
+        if isinstance(habit, Habit):
+            yield [habit.habit_id, habit.name, habit.streak, habit.highest_streak, habit.periodicity.name]
+        elif isinstance(habit[0], Habit):
+            yield [habit[0].habit_id, habit[0].name, habit[0].streak, habit[0].highest_streak, habit[0].periodicity.name, *habit[1:]]
+        else:
+            # Checking the exact type is considerably faster than isinstance for large listings
+            yield [field.name if type(field) is Periodicity else field for field in habit]
+
+
+def write_records(records: Iterable[dict], keys: List[str], format_: str, output: TextIO) -> None:
+    """
+    Writes the given records one at a time.
+
+    :param records: Records to be written
+    :param keys: Keys of every record, used as CSV header
+    :param format_: Output Format. One of json, jsonl or csv.
+    :param output: Stream the records should be written to
+    """
+    if format_ == 'csv':
+        writer = csv.DictWriter(output, fieldnames=keys, lineterminator='\n')
+        writer.writeheader()
+        writer.writerows(records)
+    elif format_ == 'jsonl':
+        for record in records:
+            output.write(json.dumps(record) + '\n')
+    else:
+        # The array is written element by element, so that it never has to be built in memory
+        output.write('[')
+        for index, record in enumerate(records):
+            output.write((',\n' if index > 0 else '\n') + json.dumps(record))
+        output.write('\n]\n')
+
+
+# endregion
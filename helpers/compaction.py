@@ -0,0 +1,277 @@
+from datetime import date, datetime, time, timedelta
+from typing import Optional, Iterable, List, Dict, Tuple
+
+import numpy as np
+from sqlalchemy import select, insert, delete, exists, func, cast, literal, bindparam, Integer, Select, Delete
+from sqlalchemy.orm import Session, aliased
+
+from classes.orm.habit import Habit
+from classes.orm.habit_entry import HabitEntry
+from classes.orm.habit_entry_summary import HabitEntrySummary
+from helpers.database import begin_immediate, retry_on_busy
+
+COMPACTION_BATCH_SIZE = 1000
+ORPHAN_BATCH_SIZE = 10000
+
+# Completing a Habit checks the key of the raw entry of the previous period (see Habit.update_completed_statement).
+# Only compacting completions older than a month keeps the previous week raw, independent of the Periodicity.
+MIN_COMPACTION_AGE = 31
+
+# Encodes the month and the bitmap of a summary into a single integer, see load_summary_days
+MONTH_SHIFT = 31
+
+
+def compaction_boundary(today: date, older_than: int) -> date:
+    """
+    Returns the first day that is not compacted. Only whole months are compacted, so it is always the first day of a month.
+
+    :param today: Current date.
+    :param older_than: Minimum age of compacted completions in days.
+
+    :returns date: First day of the month containing the day older_than days ago
+    """
+    return (today - timedelta(days=older_than)).replace(day=1)
+
+
+def compact_history(session: Session, before: date, habit_ids: Optional[Iterable[int]] = None, batch_size: int = COMPACTION_BATCH_SIZE) -> Tuple[int, int]:
+    """
+    Rolls the completions before the given date up into one HabitEntrySummary per Habit and month and deletes them.
+    Months in which a Habit was completed more than once on the same day are kept, the bitmap can only hold one completion per day.
+    Months that were already summarized are kept as well, e.g. completions imported after an earlier compaction.
+
+    Habits are processed in batches, every batch is committed in its own write transaction.
+
+    :param session: The SQLAlchemy session object.
+    :param before: First day that is not compacted. Must be the first day of a month, see compaction_boundary.
+    :param habit_ids: IDs of the Habits to compact. All Habits are compacted if None.
+    :param batch_size: Number of Habits compacted per transaction.
+
+    :returns int: Number of compacted (deleted) completions
+    :returns int: Number of created summaries
+    :raises ValueError: before is not the first day of a month
+    """
+    if before.day != 1:
+        raise ValueError('Only whole months can be compacted!')
+
+    if habit_ids is None:
+        habit_ids = session.scalars(select(Habit.habit_id).order_by(Habit.habit_id)).all()
+    else:
+        habit_ids = sorted(set(habit_ids))
+
+    compacted = summarized = 0
+    for start in range(0, len(habit_ids), batch_size):
+        batch = habit_ids[start:start + batch_size]
+
+        def operation() -> Tuple[int, int]:
+            begin_immediate(session=session)
+            result = compact_batch(session=session, habit_ids=batch, before=before)
+            session.commit()
+            return result
+
+        batch_compacted, batch_summarized = retry_on_busy(session=session, operation=operation)
+        compacted += batch_compacted
+        summarized += batch_summarized
+
+    return compacted, summarized
+
+
+def delete_orphans(session: Session, batch_size: int = ORPHAN_BATCH_SIZE) -> Tuple[int, int, int]:
+    """
+    Deletes all HabitEntries and HabitEntrySummaries whose Habit no longer exists.
+    Orphans are left behind if Habits are deleted on connections without foreign keys, whose ON DELETE CASCADE SQLite does not apply.
+
+    The IDs of the deleted Habits are collected first, their entries are then deleted in batches through the completion index,
+    every batch is committed in its own write transaction.
+
+    :param session: The SQLAlchemy session object.
+    :param batch_size: Number of entries deleted per transaction.
+
+    :returns int: Number of deleted entries
+    :returns int: Number of deleted summaries
+    :returns int: Number of deleted Habits the orphans belonged to
+    """
+    # Aliased, so that the selected batch is not correlated with the table entries are deleted from
+    entry = aliased(HabitEntry)
+    entry_orphaned = ~exists().where(Habit.habit_id == entry.habit_id)
+    summary_orphaned = ~exists().where(Habit.habit_id == HabitEntrySummary.habit_id)
+    habit_ids = sorted(set(session.scalars(select(entry.habit_id).distinct().where(entry_orphaned)).all())
+                       | set(session.scalars(select(HabitEntrySummary.habit_id).distinct().where(summary_orphaned)).all()))
+
+    entries = summaries = 0
+    for start in range(0, len(habit_ids), COMPACTION_BATCH_SIZE):
+        chunk = habit_ids[start:start + COMPACTION_BATCH_SIZE]
+        # Orphans are checked again within every transaction, in case a Habit was created with one of the IDs in the meantime
+        entry_batch = select(entry.habit_entry_id).where(entry.habit_id.in_(chunk)).where(entry_orphaned).limit(batch_size)
+        entry_statement = delete(HabitEntry).where(HabitEntry.habit_entry_id.in_(entry_batch))
+        summary_statement = delete(HabitEntrySummary).where(HabitEntrySummary.habit_id.in_(chunk)).where(summary_orphaned)
+
+        deleted = batch_size
+        while deleted == batch_size:
+            deleted = delete_in_transaction(session=session, statement=entry_statement)
+            entries += deleted
+        summaries += delete_in_transaction(session=session, statement=summary_statement)
+
+    return entries, summaries, len(habit_ids)
+
+
+def load_summary_days(session: Session, habit_ids: Optional[Iterable[int]] = None, since: Optional[date] = None,
+                      until: Optional[date] = None) -> Dict[int, np.ndarray]:
+    """
+    Loads the completed days of all summaries, so that they can be read alongside the remaining HabitEntries.
+    SQLite returns the summaries of each Habit as a single string, like the completions in helpers.streaks.load_completion_periods.
+
+    :param session: The SQLAlchemy session object.
+    :param habit_ids: IDs of the Habits to load. All Habits are loaded if None.
+    :param since: Only load days on or after this date.
+    :param until: Only load days on or before this date.
+
+    :returns Dict[int, np.ndarray]: date.toordinal() of every completed day as int64, sorted ascending, per Habit ID with at least one
+    """
+    statement = (select(HabitEntrySummary.habit_id,
+                        func.group_concat(HabitEntrySummary.month.bitwise_lshift(MONTH_SHIFT).bitwise_or(HabitEntrySummary.completed_days)))
+                 .group_by(HabitEntrySummary.habit_id))
+    if habit_ids is not None:
+        statement = statement.where(HabitEntrySummary.habit_id.in_(list(habit_ids)))
+    if since is not None:
+        # Months are identified by their first day, no month starting a month or more before since contains it
+        statement = statement.where(HabitEntrySummary.month > since.toordinal() - 31)
+    if until is not None:
+        statement = statement.where(HabitEntrySummary.month <= until.toordinal())
+
+    offsets = np.arange(MONTH_SHIFT, dtype=np.int64)
+    habit_days: Dict[int, np.ndarray] = {}
+    for habit_id, summaries in session.execute(statement):
+        keys = np.fromstring(summaries, dtype=np.int64, sep=',')
+        # Every set bit of a bitmap is a completed day, its position is the offset to the first day of the month
+        rows, days = np.nonzero((keys[:, np.newaxis] & ((1 << MONTH_SHIFT) - 1)) >> offsets & 1)
+        ordinals = np.sort((keys >> MONTH_SHIFT)[rows] + days)
+        if since is not None:
+            ordinals = ordinals[ordinals >= since.toordinal()]
+        if until is not None:
+            ordinals = ordinals[ordinals <= until.toordinal()]
+        if len(ordinals) > 0:
+            habit_days[habit_id] = ordinals
+
+    return habit_days
+
+
+def summary_days_statement() -> Select:
+    """
+    Builds a query returning every completed day of all summaries, for queries that read summaries and HabitEntries in SQL.
+
+    Rows contain the Habit ID and the date.toordinal() of the day, labeled "ordinal".
+
+    :returns Select: SQLAlchemy Select statement
+    """
+    # Offsets of all days of a month to its first day, 0 to 30
+    offsets = select(literal(0).label('offset')).cte('day_offsets', recursive=True)
+    offsets = offsets.union_all(select(offsets.c.offset + 1).where(offsets.c.offset < MONTH_SHIFT - 1))
+
+    return (select(HabitEntrySummary.habit_id, (HabitEntrySummary.month + offsets.c.offset).label('ordinal'))
+            .join(offsets, HabitEntrySummary.completed_days.bitwise_rshift(offsets.c.offset).bitwise_and(1) == 1))
+
+
+def database_size(session: Session) -> int:
+    """
+    Returns the size of the database file, without free pages.
+
+    :param session: The SQLAlchemy session object.
+
+    :returns int: Size in bytes
+    """
+    connection = session.connection()
+    pages = connection.exec_driver_sql('PRAGMA page_count').scalar() - connection.exec_driver_sql('PRAGMA freelist_count').scalar()
+    return pages * connection.exec_driver_sql('PRAGMA page_size').scalar()
+
+
+def vacuum(session: Session) -> None:
+    """
+    Returns the free pages of the database to the file system.
+    Databases in incremental auto_vacuum mode only release their free pages, all other databases are rebuilt through VACUUM.
+    Must not be called within a transaction.
+
+    :param session: The SQLAlchemy session object.
+    """
+    connection = session.connection()
+    # auto_vacuum: 0 = NONE, 1 = FULL, 2 = INCREMENTAL
+    if connection.exec_driver_sql('PRAGMA auto_vacuum').scalar() == 2:
+        connection.exec_driver_sql('PRAGMA incremental_vacuum')
+    else:
+        connection.exec_driver_sql('VACUUM')
+
+
+# region Helpers
+
+def delete_in_transaction(session: Session, statement: Delete) -> int:
+    """
+    Runs a DELETE statement in its own write transaction and commits it, retrying it if the database is locked.
+
+    :param session: The SQLAlchemy session object.
+    :param statement: DELETE statement to be run.
+
+    :returns int: Number of deleted rows
+    """
+    def operation() -> int:
+        begin_immediate(session=session)
+        deleted = session.execute(statement.execution_options(synchronize_session=False)).rowcount
+        session.commit()
+        return deleted
+
+    return retry_on_busy(session=session, operation=operation)
+
+
+def compact_batch(session: Session, habit_ids: List[int], before: date) -> Tuple[int, int]:
+    """
+    Compacts the completions of the given Habits before the given date, see compact_history.
+    Changes are flushed, committing is up to the caller.
+
+    :param session: The SQLAlchemy session object.
+    :param habit_ids: IDs of the Habits to compact.
+    :param before: First day that is not compacted.
+
+    :returns int: Number of compacted (deleted) completions
+    :returns int: Number of created summaries
+    """
+    month = func.date(HabitEntry.completion_date, 'start of month').label('month')
+    day_bit = literal(1).bitwise_lshift(cast(func.strftime('%d', HabitEntry.completion_date), Integer) - 1)
+    statement = (select(HabitEntry.habit_id,
+                        month,
+                        func.count(),
+                        func.count(func.date(HabitEntry.completion_date).distinct()),
+                        func.sum(day_bit),
+                        func.max(HabitEntry.completion_date))
+                 .where(HabitEntry.habit_id.in_(habit_ids))
+                 .where(HabitEntry.completion_date < datetime.combine(before, time.min))
+                 .group_by(HabitEntry.habit_id, month))
+
+    existing = set(session.execute(select(HabitEntrySummary.habit_id, HabitEntrySummary.month).where(HabitEntrySummary.habit_id.in_(habit_ids))).all())
+
+    summaries = []
+    for habit_id, month_start, completion_count, day_count, completed_days, last_completion in session.execute(statement):
+        month_ordinal = date.fromisoformat(month_start).toordinal()
+        # Within a month without multiple completions per day, the sum of the day bits is the bitmap
+        if completion_count != day_count or (habit_id, month_ordinal) in existing:
+            continue
+        summaries.append({'habit_id': habit_id, 'month': month_ordinal, 'completion_count': completion_count,
+                          'completed_days': completed_days, 'last_completion': last_completion})
+
+    if len(summaries) == 0:
+        return 0, 0
+
+    session.execute(insert(HabitEntrySummary.__table__), summaries)
+
+    # The completions of every summarized month are deleted through the completion index
+    entries = HabitEntry.__table__
+    delete_statement = (delete(entries)
+                        .where(entries.c.habit_id == bindparam('summary_habit_id'))
+                        .where(entries.c.completion_date >= bindparam('month_start'))
+                        .where(entries.c.completion_date < bindparam('month_end')))
+    session.execute(delete_statement, [
+        {'summary_habit_id': summary['habit_id'], 'month_start': datetime.combine(date.fromordinal(summary['month']), time.min),
+         'month_end': datetime.combine((date.fromordinal(summary['month']) + timedelta(days=31)).replace(day=1), time.min)}
+        for summary in summaries
+    ])
+
+    return sum(summary['completion_count'] for summary in summaries), len(summaries)
+
+# endregion
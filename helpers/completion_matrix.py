@@ -0,0 +1,146 @@
+from datetime import date, datetime, time, timedelta
+from typing import Optional, List, Tuple
+
+import numpy as np
+from sqlalchemy import select, func, Row
+from sqlalchemy.orm import Session
+
+from classes.orm.habit import Habit
+from classes.orm.habit_entry import HabitEntry
+from classes.periodicity import Periodicity
+from helpers.compaction import load_summary_days
+from helpers.streaks import JULIAN_DAY_ORDINAL_OFFSET, julian_day_number_expression
+
+WEEKDAYS = ['Mon', 'Tue', 'Wed', 'Thu', 'Fri', 'Sat', 'Sun']
+
+
+def load_completion_matrix(session: Session, since: date, until: date, habit_id: Optional[int] = None, habit_name: Optional[str] = None,
+                           periodicity: Optional[Periodicity] = None) -> Tuple[List[Row], np.ndarray]:
+    """
+    Loads the number of completions per Habit and day into a Habits x days matrix.
+    The completion days of each Habit are returned by SQLite as a single string, no Python object is created per completion.
+    Compacted completions count once per completed day, summaries only hold days with a single completion.
+
+    :param session: The SQLAlchemy session object.
+    :param since: First day of the matrix.
+    :param until: Last day of the matrix.
+    :param habit_id: Only load the Habit with this ID. Takes precedence over habit_name.
+    :param habit_name: Only load the Habit with this Name.
+    :param periodicity: Only load Habits with this Periodicity.
+
+    :returns List[Row]: ID, Name, Periodicity and Creation Date per Habit (matrix row), ordered by ID
+    :returns np.ndarray: Completions per Habit (row) and day (column), the first column is since
+    """
+    habit_statement = select(Habit.habit_id, Habit.name, Habit.periodicity, Habit.creation_date).order_by(Habit.habit_id)
+    if habit_id is not None:
+        habit_statement = habit_statement.where(Habit.habit_id == habit_id)
+    elif habit_name is not None:
+        habit_statement = habit_statement.where(Habit.name == habit_name)
+    if periodicity is not None:
+        habit_statement = habit_statement.where(Habit.periodicity == periodicity)
+
+    habits = session.execute(habit_statement).all()
+    day_count = (until - since).days + 1
+    if len(habits) == 0:
+        return habits, np.zeros((0, day_count), dtype=np.int64)
+
+    # Correlated per Habit, so that only the completions within the range are read from the index instead of all of them
+    days = (select(func.group_concat(julian_day_number_expression(completion_date=HabitEntry.completion_date)))
+            .where(HabitEntry.habit_id == Habit.habit_id)
+            .where(HabitEntry.completion_date >= datetime.combine(since, time.min))
+            .where(HabitEntry.completion_date < datetime.combine(until + timedelta(days=1), time.min))
+            .scalar_subquery())
+    statement = habit_statement.with_only_columns(Habit.habit_id, days)
+
+    rows = {habit.habit_id: row for row, habit in enumerate(habits)}
+    cells = []
+    for completion_habit_id, completion_days in session.execute(statement):
+        if completion_habit_id in rows and completion_days is not None:
+            columns = np.fromstring(completion_days, dtype=np.int64, sep=',') - (JULIAN_DAY_ORDINAL_OFFSET + since.toordinal())
+            cells.append(rows[completion_habit_id] * day_count + columns)
+
+    habit_ids = list(rows) if habit_id is not None or habit_name is not None else None
+    for summary_habit_id, summary_days in load_summary_days(session=session, habit_ids=habit_ids, since=since, until=until).items():
+        if summary_habit_id in rows:
+            cells.append(rows[summary_habit_id] * day_count + summary_days - since.toordinal())
+
+    # Every completion is counted in its cell of the flattened matrix at once
+    flat_cells = np.concatenate(cells) if len(cells) > 0 else np.empty(0, dtype=np.int64)
+    return habits, np.bincount(flat_cells, minlength=len(habits) * day_count).reshape(len(habits), day_count)
+
+
+def fold_periods(counts: np.ndarray, since: date, periodicity: Periodicity) -> Tuple[np.ndarray, int]:
+    """
+    Sums the columns of a completion matrix per period of the given Periodicity.
+
+    :param counts: Completions per Habit and day, as returned by load_completion_matrix.
+    :param since: Day of the first column.
+    :param periodicity: Periodicity whose periods the days are summed up to.
+
+    :returns np.ndarray: Completions per Habit (row) and period (column)
+    :returns int: Index of the period of the first column
+    """
+    first_period = periodicity.period_index(value=since)
+    if periodicity is Periodicity.Daily:
+        return counts, first_period
+
+    # Same computation as Periodicity.period_index, the first and last week may be incomplete
+    weeks = (np.arange(counts.shape[1]) + since.toordinal() - 1) // 7
+    return np.add.reduceat(counts, np.flatnonzero(np.r_[True, weeks[1:] != weeks[:-1]]), axis=1), first_period
+
+
+def completion_statistics(habits: List[Row], counts: np.ndarray, since: date, last: int) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Computes the completion rate and weekday distribution of every Habit over its last periods, based on its own Periodicity.
+    Only periods since the creation of a Habit count towards its rate.
+
+    :param habits: Habits of the matrix rows, as returned by load_completion_matrix.
+    :param counts: Completions per Habit and day, as returned by load_completion_matrix.
+    :param since: Day of the first column, as returned by rate_window_start.
+    :param last: Number of periods per Habit, the last column is the last day of the last period.
+
+    :returns np.ndarray: Number of completed periods per Habit
+    :returns np.ndarray: Number of periods since the creation per Habit, at most last
+    :returns np.ndarray: Completions within the periods per Habit (row) and weekday (column, Monday first)
+    """
+    completed = np.zeros(len(habits), dtype=np.int64)
+    periods = np.zeros(len(habits), dtype=np.int64)
+    weekdays = np.zeros((len(habits), 7), dtype=np.int64)
+
+    # Maps every day to its weekday, multiplying with it sums the completions per weekday
+    day_weekdays = ((np.arange(counts.shape[1]) + since.weekday()) % 7)[:, np.newaxis] == np.arange(7)[np.newaxis, :]
+
+    periodicities = np.array([habit.periodicity.value for habit in habits], dtype=np.int64)
+    for periodicity in Periodicity:
+        rows = np.flatnonzero(periodicities == periodicity.value)
+        if len(rows) == 0:
+            continue
+
+        habit_counts = counts[rows]
+        period_counts, first_period = fold_periods(counts=habit_counts, since=since, periodicity=periodicity)
+        first_period += period_counts.shape[1] - last
+        period_counts = period_counts[:, -last:]
+
+        # A period counts from the one the Habit was created in
+        creation_periods = np.array([periodicity.period_index(value=habits[row].creation_date.date()) for row in rows], dtype=np.int64)
+        eligible = (np.arange(last) + first_period)[np.newaxis, :] >= creation_periods[:, np.newaxis]
+        completed[rows] = ((period_counts > 0) & eligible).sum(axis=1)
+        periods[rows] = eligible.sum(axis=1)
+
+        first_day = (periodicity.period_start(period_index=first_period) - since).days
+        weekdays[rows] = habit_counts[:, first_day:] @ day_weekdays[first_day:].astype(np.int64)
+
+    return completed, periods, weekdays
+
+
+def rate_window_start(until: date, last: int) -> date:
+    """
+    Returns the first day of the matrix needed by completion_statistics.
+    It is the Monday of the first of the last weeks, which also covers the last days.
+
+    :param until: Last day of the window.
+    :param last: Number of periods.
+
+    :returns date: First day of the window
+    """
+    return Periodicity.Weekly.period_start(period_index=Periodicity.Weekly.period_index(value=until) - last + 1)
@@ -0,0 +1,308 @@
+import os
+import random
+import time
+from configparser import ConfigParser
+from typing import Dict, Callable, TypeVar, TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from sqlalchemy import Engine
+    from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession
+    from sqlalchemy.orm import Session
+
+T = TypeVar('T')
+
+CONFIG_FILE = 'tracker.ini'
+ENV_DATABASE_PATH = 'TRACKER_DATABASE'
+ENV_DATABASE_PROFILE = 'TRACKER_DB_PROFILE'
+ENV_BUSY_RETRIES = 'TRACKER_BUSY_RETRIES'
+ENV_BUSY_BACKOFF = 'TRACKER_BUSY_BACKOFF'
+
+DEFAULT_DATABASE_PATH = 'habits.sqlite'
+DEFAULT_PROFILE = 'durable'
+
+# Key in session.info, if set to True methods that usually commit only flush (see HabitService.batch)
+DEFER_COMMIT = 'defer_commit'
+
+# Write transactions that still fail with SQLITE_BUSY after the busy_timeout are retried with exponential backoff
+DEFAULT_BUSY_RETRIES = 5
+DEFAULT_BUSY_BACKOFF = 0.05     # Seconds before the first retry, doubled for every further one
+
+# Pragmas applied to every new connection, depending on the selected profile.
+# foreign_keys is required for the ON DELETE CASCADE of HabitEntry, SQLite disables it by default.
+PRAGMA_PROFILES: Dict[str, Dict[str, str | int]] = {
+    'durable': {
+        'foreign_keys': 'ON',
+        'synchronous': 'FULL',
+        'busy_timeout': 5000,
+    },
+    'fast': {
+        'foreign_keys': 'ON',
+        'journal_mode': 'WAL',
+        'synchronous': 'NORMAL',
+        'busy_timeout': 5000,
+        'mmap_size': 256 * 1024 * 1024,
+        'cache_size': -64 * 1024,           # Negative values are in KiB
+        'temp_store': 'MEMORY',
+    },
+    'readonly-analytics': {
+        'foreign_keys': 'ON',
+        'query_only': 'ON',
+        'busy_timeout': 5000,
+        'mmap_size': 256 * 1024 * 1024,
+        'cache_size': -64 * 1024,
+        'temp_store': 'MEMORY',
+    },
+}
+
+
+def load_database_config(config_path: str = CONFIG_FILE) -> Dict[str, str | int | float]:
+    """
+    Loads the database configuration.
+    Values are taken from the environment variables first, then from the [database] section of the config file.
+
+    :param config_path: Path of the config file. A missing file is ignored.
+
+    :returns Dict[str, str | int | float]: Database "path", pragma "profile" as well as "busy_retries" and "busy_backoff" (seconds)
+    :raises ValueError: Unknown profile or invalid retry settings were configured
+    """
+    parser = ConfigParser()
+    parser.read(config_path)
+
+    config = {
+        'path': os.environ.get(ENV_DATABASE_PATH) or parser.get('database', 'path', fallback=DEFAULT_DATABASE_PATH),
+        'profile': os.environ.get(ENV_DATABASE_PROFILE) or parser.get('database', 'profile', fallback=DEFAULT_PROFILE),
+        'busy_retries': int(os.environ.get(ENV_BUSY_RETRIES) or parser.get('database', 'busy_retries', fallback=DEFAULT_BUSY_RETRIES)),
+        'busy_backoff': float(os.environ.get(ENV_BUSY_BACKOFF) or parser.get('database', 'busy_backoff', fallback=DEFAULT_BUSY_BACKOFF)),
+    }
+
+    validate_profile(profile=config['profile'])
+    if config['busy_retries'] < 0 or config['busy_backoff'] < 0:
+        raise ValueError('busy_retries and busy_backoff must not be negative!')
+
+    return config
+
+
+def create_database_engine(url: str, profile: str = DEFAULT_PROFILE) -> 'Engine':
+    """
+    Creates an SQLAlchemy Engine that applies the pragmas of the given profile to every new connection.
+
+    :param url: SQLAlchemy URL of the database.
+    :param profile: Name of the pragma profile. See PRAGMA_PROFILES.
+
+    :returns Engine: Created Engine
+    :raises ValueError: Unknown profile was passed
+    """
+    from sqlalchemy import create_engine
+
+    validate_profile(profile=profile)
+
+    engine = create_engine(url)
+    register_pragmas(engine=engine, profile=profile)
+
+    return engine
+
+
+def create_async_database_engine(url: str, profile: str = DEFAULT_PROFILE) -> 'AsyncEngine':
+    """
+    Creates an SQLAlchemy AsyncEngine that applies the pragmas of the given profile to every new connection.
+
+    :param url: SQLAlchemy URL of the database, using the aiosqlite driver (sqlite+aiosqlite://).
+    :param profile: Name of the pragma profile. See PRAGMA_PROFILES.
+
+    :returns AsyncEngine: Created AsyncEngine
+    :raises ValueError: Unknown profile was passed
+    """
+    from sqlalchemy.ext.asyncio import create_async_engine
+
+    validate_profile(profile=profile)
+
+    engine = create_async_engine(url)
+    # Connections are opened by the synchronous engine within the AsyncEngine, its adapted connections are used like sqlite3 connections
+    register_pragmas(engine=engine.sync_engine, profile=profile)
+
+    return engine
+
+
+def begin_immediate(session: 'Session') -> None:
+    """
+    Starts a write transaction on the connection of the session, unless the connection is already within one.
+    BEGIN IMMEDIATE takes the write lock upfront, so reads within the transaction can not be invalidated by other writers
+    and lock conflicts surface at the start of the transaction (where they can be retried) instead of at the first write.
+
+    :param session: The SQLAlchemy session object.
+    """
+    connection = session.connection()
+    # The driver connection is the sqlite3 connection, or the aiosqlite connection wrapping it for AsyncSessions
+    if not connection.connection.driver_connection.in_transaction:
+        connection.exec_driver_sql('BEGIN IMMEDIATE')
+
+
+def commit(session: 'Session') -> None:
+    """
+    Commits the session, unless commits are deferred (see DEFER_COMMIT). Deferred changes are only flushed.
+
+    :param session: The SQLAlchemy session object.
+    """
+    if commits_deferred(session=session):
+        session.flush()
+    else:
+        session.commit()
+
+
+def retry_on_busy(session: 'Session', operation: Callable[[], T]) -> T:
+    """
+    Runs a write operation, retrying it with exponential backoff as long as the database is locked by another writer.
+    The session is rolled back before every retry. Retries and backoff are taken from session.info (see LazySessionMaker).
+
+    :param session: The SQLAlchemy session object.
+    :param operation: Operation to be run. Has to start its own transaction.
+
+    :returns T: Result of the operation
+    :raises OperationalError: Database was still locked after the last retry, or any other operational error occurred
+    """
+    from sqlalchemy.exc import OperationalError
+
+    # Rolling back would discard the whole deferred transaction, retrying it is up to its owner
+    if commits_deferred(session=session):
+        return operation()
+
+    retries = session.info.get('busy_retries', DEFAULT_BUSY_RETRIES)
+    backoff = session.info.get('busy_backoff', DEFAULT_BUSY_BACKOFF)
+
+    for attempt in range(retries + 1):
+        try:
+            return operation()
+        except OperationalError as error:
+            session.rollback()
+            if attempt == retries or not is_busy_error(error=error):
+                raise
+
+            time.sleep(busy_delay(backoff=backoff, attempt=attempt))
+
+
+async def retry_on_busy_async(session: 'AsyncSession', operation: Callable[['Session'], T]) -> T:
+    """
+    Runs a write operation on the synchronous session of an AsyncSession, see retry_on_busy.
+    Retries are awaited, so that their backoff does not block the event loop. While the database is locked, the operation
+    waits for the busy_timeout within the thread of the aiosqlite connection, which does not block the event loop either.
+
+    :param session: The SQLAlchemy AsyncSession object.
+    :param operation: Operation to be run, receives the synchronous session. Has to start its own transaction.
+
+    :returns T: Result of the operation
+    :raises OperationalError: Database was still locked after the last retry, or any other operational error occurred
+    """
+    import asyncio
+    from sqlalchemy.exc import OperationalError
+
+    if commits_deferred(session=session.sync_session):
+        return await session.run_sync(operation)
+
+    retries = session.sync_session.info.get('busy_retries', DEFAULT_BUSY_RETRIES)
+    backoff = session.sync_session.info.get('busy_backoff', DEFAULT_BUSY_BACKOFF)
+
+    for attempt in range(retries + 1):
+        try:
+            return await session.run_sync(run_without_retries, operation)
+        except OperationalError as error:
+            await session.rollback()
+            if attempt == retries or not is_busy_error(error=error):
+                raise
+
+            await asyncio.sleep(busy_delay(backoff=backoff, attempt=attempt))
+
+
+# region Helpers
+
+def busy_delay(backoff: float, attempt: int) -> float:
+    """
+    Returns the delay before retrying a write transaction that failed because the database was locked.
+
+    :param backoff: Seconds before the first retry.
+    :param attempt: Number of the failed attempt, starting at 0.
+
+    :returns float: Delay in seconds
+    """
+    # Jitter prevents processes that were blocked by the same writer from retrying in lockstep
+    return backoff * 2 ** attempt * random.uniform(0.5, 1.5)
+
+
+def run_without_retries(session: 'Session', operation: Callable[['Session'], T]) -> T:
+    """
+    Runs an operation while retry_on_busy does not retry, the caller retries the whole operation instead.
+
+    :param session: The SQLAlchemy session object.
+    :param operation: Operation to be run, receives the session.
+
+    :returns T: Result of the operation
+    """
+    retries = session.info.get('busy_retries')
+    session.info['busy_retries'] = 0
+    try:
+        return operation(session)
+    finally:
+        if retries is None:
+            del session.info['busy_retries']
+        else:
+            session.info['busy_retries'] = retries
+
+
+def register_pragmas(engine: 'Engine', profile: str) -> None:
+    """
+    Applies the pragmas of the given profile to every new connection of the engine.
+
+    :param engine: SQLAlchemy Engine.
+    :param profile: Name of the pragma profile. See PRAGMA_PROFILES.
+    """
+    from sqlalchemy import event
+
+    pragmas = PRAGMA_PROFILES[profile]
+
+    @event.listens_for(engine, 'connect')
+    def apply_pragmas(dbapi_connection, connection_record) -> None:
+        cursor = dbapi_connection.cursor()
+        for name, value in pragmas.items():
+            # PRAGMA statements do not support bound parameters, all values are static
+            cursor.execute(f'PRAGMA {name} = {value}')
+        cursor.close()
+
+
+def commits_deferred(session: 'Session') -> bool:
+    """
+    Checks whether commits of the given session are deferred to its owner.
+
+    :param session: The SQLAlchemy session object.
+
+    :returns bool: True if commits are deferred, False otherwise.
+    """
+    return session.info.get(DEFER_COMMIT) is True
+
+
+def is_busy_error(error: Exception) -> bool:
+    """
+    Checks whether the given error was caused by SQLITE_BUSY (or SQLITE_LOCKED).
+
+    :param error: Error raised by SQLAlchemy
+
+    :returns bool: True if the database was locked, False otherwise.
+    """
+    original = getattr(error, 'orig', error)
+    error_name = getattr(original, 'sqlite_errorname', '')
+    if error_name.startswith(('SQLITE_BUSY', 'SQLITE_LOCKED')):
+        return True
+
+    return 'database is locked' in str(original)
+
+
+def validate_profile(profile: str) -> None:
+    """
+    Validates that a pragma profile with the given name exists.
+
+    :param profile: Name of the pragma profile.
+
+    :raises ValueError: Unknown profile was passed
+    """
+    if profile not in PRAGMA_PROFILES:
+        raise ValueError(f'Unknown database profile "{profile}"! Available profiles: {", ".join(PRAGMA_PROFILES)}')
+
+# endregion
@@ -0,0 +1,103 @@
+import base64
+import binascii
+import json
+import operator
+from datetime import datetime
+from enum import Enum
+from typing import Any, List, Tuple
+
+from sqlalchemy import and_, ColumnElement
+from sqlalchemy.orm import InstrumentedAttribute
+
+
+def encode_cursor(sort: str, descending: bool, value: Any, habit_id: int) -> str:
+    """
+    Encodes the position after the given row into an opaque cursor.
+
+    :param sort: Sort Order the cursor was created for.
+    :param descending: Whether the rows are sorted in descending order.
+    :param value: Value of the sort target of the last returned row.
+    :param habit_id: ID of the last returned Habit.
+
+    :returns str: URL-safe cursor
+    """
+    if isinstance(value, datetime):
+        value = value.isoformat()
+    elif isinstance(value, Enum):
+        value = value.name
+
+    payload = json.dumps([sort, descending, value, habit_id], separators=(',', ':'))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor: str, sort: str, descending: bool, target: InstrumentedAttribute) -> Tuple[Any, int]:
+    """
+    Decodes a cursor created by encode_cursor.
+
+    :param cursor: Cursor to be decoded.
+    :param sort: Sort Order of the current request.
+    :param descending: Whether the current request sorts in descending order.
+    :param target: Sort target of the current request, used to restore the type of the value.
+
+    :returns Any: Value of the sort target of the last returned row
+    :returns int: ID of the last returned Habit
+    :raises ValueError: The cursor is malformed or was created for a different sort order
+    """
+    try:
+        payload = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        cursor_sort, cursor_descending, value, habit_id = json.loads(payload)
+    except (binascii.Error, UnicodeDecodeError, ValueError, TypeError):
+        raise ValueError('Malformed cursor!')
+
+    if cursor_sort != sort or cursor_descending != descending:
+        raise ValueError(f'Cursor was created for a different sort order ({cursor_sort} {"descending" if cursor_descending else "ascending"})!')
+    if type(habit_id) is not int:
+        raise ValueError('Malformed cursor!')
+    if value is None:
+        if not target.expression.nullable:
+            raise ValueError('Malformed cursor!')
+        return None, habit_id
+
+    python_type = target.type.python_type
+    try:
+        if python_type is datetime:
+            return datetime.fromisoformat(value), habit_id
+        if issubclass(python_type, Enum):
+            return python_type[value], habit_id
+    except (KeyError, TypeError, ValueError):
+        raise ValueError('Malformed cursor!')
+
+    if type(value) is not python_type:
+        raise ValueError('Malformed cursor!')
+    return value, habit_id
+
+
+def keyset_conditions(target: InstrumentedAttribute, tie_breaker: InstrumentedAttribute, descending: bool, value: Any, last_id: int) -> List[ColumnElement[bool]]:
+    """
+    Returns the filters selecting all rows after a cursor position, for a query ordered by (target, tie_breaker).
+
+    Every filter covers a single contiguous range of an index on the target (which implicitly ends with the rowid),
+    so each can be answered by seeking into the index. Applied in the returned order, they continue the sort order.
+    A combined row value comparison would only seek on the target and then walk all rows sharing its value.
+    SQLite sorts NULL before any other value, i.e. first in ascending and last in descending order.
+
+    :param target: Sort target.
+    :param tie_breaker: Unique column used to order rows sharing a target value, sorted in the same direction.
+    :param descending: Whether the rows are sorted in descending order.
+    :param value: Target value of the last returned row.
+    :param last_id: Tie-breaker value of the last returned row.
+
+    :returns List[ColumnElement[bool]]: Filters in sort order
+    """
+    after = operator.lt if descending else operator.gt
+
+    if value is None:
+        conditions = [and_(target.is_(None), after(tie_breaker, last_id))]
+        if not descending:
+            conditions.append(target.is_not(None))
+        return conditions
+
+    conditions = [and_(target == value, after(tie_breaker, last_id)), after(target, value)]
+    if descending and target.expression.nullable:
+        conditions.append(target.is_(None))
+    return conditions
@@ -0,0 +1,132 @@
+import json
+import os
+import sys
+from typing import List, Tuple
+
+# Commands that can be run by the server of tracker.py serve
+REMOTE_COMMANDS = ('habit', 'analytics')
+
+SERVER_HOST = '127.0.0.1'
+DEFAULT_SERVER_PORT = 8765
+DEFAULT_SERVER_ADDRESS = f'{SERVER_HOST}:{DEFAULT_SERVER_PORT}'
+ENV_REMOTE_ADDRESS = 'TRACKER_REMOTE_ADDRESS'
+
+# Host names the server accepts in the Host header of requests, any other one points to e.g. a DNS rebinding attack
+SERVER_HOSTNAMES = ('127.0.0.1', 'localhost')
+
+# Every server writes a secret token to a file only the user can read, clients have to send it with every command
+ENV_TOKEN_DIRECTORY = 'TRACKER_TOKEN_DIR'
+DEFAULT_TOKEN_DIRECTORY = os.path.join('~', '.tracker')
+
+COMMANDS_PATH = '/commands'
+HEALTH_PATH = '/health'
+
+# Seconds a remote command may take, including the transfer of its output
+REMOTE_TIMEOUT = 300
+
+
+def send_command(address: str, args: List[str], input_: str = '') -> dict:
+    """
+    Runs a command on the server of tracker.py serve.
+
+    :param address: Address of the server as [HOST:]PORT.
+    :param args: Arguments of the command, starting with one of REMOTE_COMMANDS.
+    :param input_: Input of the command, answers its prompts.
+
+    :returns dict: "exit_code", "stdout" and "stderr" of the command as well as its server-side "duration_ms"
+    :raises ValueError: The address is malformed or the server rejected the request
+    :raises OSError: The server could not be reached
+    """
+    # A plain socket instead of http.client, which imports the email and ssl packages and adds about 40 ms to the startup of the client.
+    # The server answers with HTTP/1.0, i.e. closes the connection after the response.
+    import socket
+
+    host, port = parse_address(address=address)
+    body = json.dumps({'args': args, 'input': input_}).encode('utf-8')
+    request = (f'POST {COMMANDS_PATH} HTTP/1.0\r\nHost: {host}:{port}\r\nContent-Type: application/json\r\n'
+               f'Authorization: Bearer {read_token(port=port)}\r\nContent-Length: {len(body)}\r\n\r\n').encode('ascii') + body
+
+    with socket.create_connection(address=(host, port), timeout=REMOTE_TIMEOUT) as connection:
+        connection.sendall(request)
+        response = b''.join(iter(lambda: connection.recv(65536), b''))
+
+    head, _, content = response.partition(b'\r\n\r\n')
+    status_line = head.split(b'\r\n', maxsplit=1)[0].split()
+    if len(status_line) < 2 or not status_line[1].isdigit():
+        raise ValueError(f'Malformed response of the server at {address}!')
+
+    body = json.loads(content)
+    if int(status_line[1]) != 200:
+        raise ValueError(body.get('error', f'Server responded with status {int(status_line[1])}!'))
+    return body
+
+
+def forward_command(address: str, args: List[str]) -> int:
+    """
+    Runs a command on the server of tracker.py serve and writes its output as if it had run locally.
+    Input piped into the process is forwarded to answer the prompts of the command, an interactive terminal is not.
+
+    :param address: Address of the server as [HOST:]PORT.
+    :param args: Arguments of the command, starting with one of REMOTE_COMMANDS.
+
+    :returns int: Exit code of the command
+    :raises ValueError: The address is malformed or the server rejected the request
+    :raises OSError: The server could not be reached
+    """
+    input_ = sys.stdin.read() if sys.stdin is not None and not sys.stdin.isatty() else ''
+    result = send_command(address=address, args=args, input_=input_)
+
+    sys.stdout.write(result['stdout'])
+    sys.stdout.flush()
+    sys.stderr.write(result['stderr'])
+    sys.stderr.flush()
+    return result['exit_code']
+
+
+def token_path(port: int) -> str:
+    """
+    Returns the path of the token file of the server listening on the given port.
+    The directory is taken from the TRACKER_TOKEN_DIR environment variable and defaults to ~/.tracker.
+
+    :param port: Port of the server.
+
+    :returns str: Path of the token file
+    """
+    directory = os.environ.get(ENV_TOKEN_DIRECTORY) or DEFAULT_TOKEN_DIRECTORY
+    return os.path.join(os.path.expanduser(directory), f'server-{port}.token')
+
+
+# region Helpers
+
+def read_token(port: int) -> str:
+    """
+    Reads the token of the server listening on the given port.
+
+    :param port: Port of the server.
+
+    :returns str: Token of the server. Empty if it has no token file (e.g. it was started by another user), the server then rejects the request.
+    """
+    try:
+        with open(token_path(port=port), encoding='ascii') as file:
+            return file.read().strip()
+    except (OSError, UnicodeDecodeError):
+        return ''
+
+
+def parse_address(address: str) -> Tuple[str, int]:
+    """
+    Parses a server address.
+
+    :param address: Address as [HOST:]PORT, the host defaults to SERVER_HOST.
+
+    :returns str: Host
+    :returns int: Port
+    :raises ValueError: The address is malformed
+    """
+    host, _, port = address.rpartition(':')
+    if not port.isdigit() or not 0 < int(port) < 65536:
+        raise ValueError(f'Invalid server address "{address}", expected [HOST:]PORT!')
+
+    return host or SERVER_HOST, int(port)
+
+# endregion
@@ -0,0 +1,276 @@
+from datetime import date, datetime, time, timedelta
+from typing import Optional, Iterable, List, Tuple
+
+import numpy as np
+from sqlalchemy import select, update, union, case, cast, func, Integer, Select, ColumnElement
+from sqlalchemy.orm import Session, aliased
+
+from classes.orm.habit import Habit
+from classes.orm.habit_entry import HabitEntry
+from classes.periodicity import Periodicity
+from helpers.compaction import load_summary_days, summary_days_statement
+
+REBUILD_BATCH_SIZE = 1000
+
+# Julian day number of 0001-01-01 minus one, subtracting it results in the same ordinal as date.toordinal()
+JULIAN_DAY_ORDINAL_OFFSET = 1721425
+
+
+def rebuild_streaks(session: Session, habit_ids: Optional[Iterable[int]] = None, batch_size: int = REBUILD_BATCH_SIZE) -> int:
+    """
+    Recomputes the current and highest streak of Habits from their completion history.
+    The result matches replaying every completion through Habit.complete: the current streak is the run ending at the last completion.
+
+    Habits are processed in batches. The completion periods of each batch are loaded into contiguous arrays,
+    runs of consecutive periods are found with vectorized operations and written back with a single executemany UPDATE.
+
+    Changes are flushed, committing is up to the caller.
+
+    :param session: The SQLAlchemy session object.
+    :param habit_ids: IDs of the Habits to rebuild. All Habits are rebuilt if None.
+    :param batch_size: Number of Habits processed at once. Memory usage grows with the number of completions per batch.
+
+    :returns int: Number of Habits with at least one completion that were updated.
+    """
+    if habit_ids is None:
+        habit_ids = session.scalars(select(Habit.habit_id).order_by(Habit.habit_id)).all()
+    else:
+        habit_ids = sorted(set(habit_ids))
+
+    updated = 0
+    for start in range(0, len(habit_ids), batch_size):
+        batch = habit_ids[start:start + batch_size]
+
+        # Reset all Habits of the batch first, Habits without any completions do not show up in the computed streaks
+        session.execute(update(Habit).where(Habit.habit_id.in_(batch)).values(streak=0, highest_streak=0).execution_options(synchronize_session=False))
+
+        streak_habit_ids, streaks, highest_streaks = compute_streaks(*load_completion_periods(session=session, habit_ids=batch))
+        if len(streak_habit_ids) == 0:
+            continue
+
+        session.execute(update(Habit), [
+            {'habit_id': habit_id, 'streak': streak, 'highest_streak': highest_streak}
+            for habit_id, streak, highest_streak in zip(streak_habit_ids.tolist(), streaks.tolist(), highest_streaks.tolist())
+        ])
+        updated += len(streak_habit_ids)
+
+    return updated
+
+
+def rebuild_period_keys(session: Session, habit_ids: Optional[Iterable[int]] = None, batch_size: int = REBUILD_BATCH_SIZE) -> None:
+    """
+    Recomputes the period key of all HabitEntries of the given Habits, e.g. after their Periodicity has changed.
+    Only the first entry of each period receives a key, the unique period index only allows one keyed entry per period.
+
+    Changes are flushed, committing is up to the caller.
+
+    :param session: The SQLAlchemy session object.
+    :param habit_ids: IDs of the Habits to rebuild. All Habits are rebuilt if None.
+    :param batch_size: Number of Habits updated per statement.
+    """
+    period_key = (select(period_index_expression(periodicity=Habit.periodicity, completion_date=HabitEntry.completion_date))
+                  .where(Habit.habit_id == HabitEntry.habit_id)
+                  .scalar_subquery())
+
+    # Aliased, so that the subquery is not correlated with the updated table
+    entry = aliased(HabitEntry)
+    first_entries = (select(func.min(entry.habit_entry_id))
+                     .join(Habit, Habit.habit_id == entry.habit_id)
+                     .group_by(entry.habit_id, period_index_expression(periodicity=Habit.periodicity, completion_date=entry.completion_date)))
+
+    batches = [None]
+    if habit_ids is not None:
+        habit_ids = sorted(set(habit_ids))
+        batches = [habit_ids[start:start + batch_size] for start in range(0, len(habit_ids), batch_size)]
+
+    for batch in batches:
+        clear_statement = update(HabitEntry).values(period_key=None).execution_options(synchronize_session=False)
+        key_statement = update(HabitEntry).values(period_key=period_key).execution_options(synchronize_session=False)
+        batch_first_entries = first_entries
+        if batch is not None:
+            clear_statement = clear_statement.where(HabitEntry.habit_id.in_(batch))
+            key_statement = key_statement.where(HabitEntry.habit_id.in_(batch))
+            batch_first_entries = first_entries.where(entry.habit_id.in_(batch))
+
+        # Keys are cleared first, otherwise the new key of an entry could collide with the old key of another one
+        session.execute(clear_statement)
+        session.execute(key_statement.where(HabitEntry.habit_entry_id.in_(batch_first_entries)))
+
+
+def compute_streaks(habit_ids: np.ndarray, periods: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Computes the current and highest streak per Habit from completion periods.
+
+    :param habit_ids: Habit ID per completion, sorted ascending.
+    :param periods: Period index per completion, sorted ascending within each Habit.
+
+    :returns np.ndarray: IDs of all Habits with at least one completion
+    :returns np.ndarray: Current streak (length of the run containing the last completion) per Habit
+    :returns np.ndarray: Highest streak per Habit
+    """
+    if len(habit_ids) == 0:
+        empty = np.empty(0, dtype=np.int64)
+        return empty, empty, empty
+
+    # Multiple completions within the same period only count once
+    unique = np.ones(len(habit_ids), dtype=bool)
+    unique[1:] = (habit_ids[1:] != habit_ids[:-1]) | (periods[1:] != periods[:-1])
+    habit_ids, periods = habit_ids[unique], periods[unique]
+
+    # A run starts with every new Habit and whenever a period was skipped
+    run_starts = np.ones(len(habit_ids), dtype=bool)
+    run_starts[1:] = (habit_ids[1:] != habit_ids[:-1]) | (np.diff(periods) != 1)
+    run_lengths = np.bincount(np.cumsum(run_starts) - 1)
+    run_habit_ids = habit_ids[run_starts]
+
+    # Runs are ordered by Habit, so the runs of every Habit form a contiguous block
+    habit_starts = np.flatnonzero(np.r_[True, run_habit_ids[1:] != run_habit_ids[:-1]])
+    habit_ends = np.r_[habit_starts[1:], len(run_lengths)] - 1
+
+    return run_habit_ids[habit_starts], run_lengths[habit_ends], np.maximum.reduceat(run_lengths, habit_starts)
+
+
+def load_completion_periods(session: Session, habit_ids: Optional[List[int]] = None) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Loads the period index of every completion, based on the current Periodicity of its Habit. Compacted completions are included.
+    SQLite returns the days of each Habit as a single concatenated string, which is parsed into an array at once.
+    This avoids creating a Python object per completion.
+
+    :param session: The SQLAlchemy session object.
+    :param habit_ids: IDs of the Habits to load. All Habits are loaded if None.
+
+    :returns np.ndarray: Habit ID per completion, sorted ascending.
+    :returns np.ndarray: Period index per completion, sorted ascending within each Habit.
+    """
+    # Periodicities are loaded separately, joining Habit would add a lookup per completion
+    periodicity_statement = select(Habit.habit_id, Habit.periodicity)
+    statement: Select
+    statement = (select(HabitEntry.habit_id,
+                        func.count(HabitEntry.completion_date),
+                        func.group_concat(julian_day_number_expression(completion_date=HabitEntry.completion_date)))
+                 .group_by(HabitEntry.habit_id))
+    if habit_ids is not None:
+        periodicity_statement = periodicity_statement.where(Habit.habit_id.in_(habit_ids))
+        statement = statement.where(HabitEntry.habit_id.in_(habit_ids))
+
+    periodicities = dict(session.execute(periodicity_statement).all())
+    rows = [row for row in session.execute(statement) if row[1] > 0 and row[0] in periodicities]
+    summary_days = {habit_id: days for habit_id, days in load_summary_days(session=session, habit_ids=habit_ids).items() if habit_id in periodicities}
+    if len(rows) == 0 and len(summary_days) == 0:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+
+    counts = np.array([row[1] for row in rows] + [len(days) for days in summary_days.values()], dtype=np.int64)
+    row_habit_ids = [row[0] for row in rows] + list(summary_days)
+    habit_ids = np.repeat(np.array(row_habit_ids, dtype=np.int64), counts)
+    weekly = np.repeat(np.array([periodicities[habit_id] is Periodicity.Weekly for habit_id in row_habit_ids], dtype=bool), counts)
+    ordinals = np.concatenate([np.fromstring(','.join(row[2] for row in rows), dtype=np.int64, sep=',') - JULIAN_DAY_ORDINAL_OFFSET,
+                               *summary_days.values()])
+
+    # Same computation as Periodicity.period_index
+    periods = np.where(weekly, (ordinals - 1) // 7, ordinals)
+
+    # group_concat does not guarantee any order, sort by Habit and period at once through a combined key
+    keys = np.sort((habit_ids << 32) | periods, kind='stable')
+    return keys >> 32, keys & 0xFFFFFFFF
+
+
+def streak_runs_statement(since: Optional[date] = None, until: Optional[date] = None, min_length: int = 1, habit_id: Optional[int] = None,
+                          habit_name: Optional[str] = None, periodicity: Optional[Periodicity] = None) -> Select:
+    """
+    Builds a query returning every streak (run of consecutive completed periods) computed directly from the completion history.
+    Completions are mapped to their period, consecutive periods are grouped by their difference to ROW_NUMBER() ("gaps and islands").
+    Compacted completions are read from the days of their summaries.
+
+    Rows contain the Habit ID, Name, Periodicity, first period, last period and length of each streak, longest streaks first.
+
+    :param since: Only consider completions on or after this date.
+    :param until: Only consider completions on or before this date.
+    :param min_length: Minimum length of the returned streaks.
+    :param habit_id: Only consider the Habit with this ID. Takes precedence over habit_name.
+    :param habit_name: Only consider the Habit with this Name.
+    :param periodicity: Only consider Habits with this Periodicity.
+
+    :returns Select: SQLAlchemy Select statement
+    """
+    period = period_index_expression(periodicity=Habit.periodicity, completion_date=HabitEntry.completion_date).label('period')
+    entry_periods = select(HabitEntry.habit_id, period).join(Habit, Habit.habit_id == HabitEntry.habit_id)
+
+    summary_days = summary_days_statement().subquery('summary_days')
+    summary_period = ordinal_period_index_expression(periodicity=Habit.periodicity, ordinal=summary_days.c.ordinal).label('period')
+    summary_periods = select(summary_days.c.habit_id, summary_period).join(Habit, Habit.habit_id == summary_days.c.habit_id)
+
+    if since is not None:
+        entry_periods = entry_periods.where(HabitEntry.completion_date >= datetime.combine(since, time.min))
+        summary_periods = summary_periods.where(summary_days.c.ordinal >= since.toordinal())
+    if until is not None:
+        entry_periods = entry_periods.where(HabitEntry.completion_date < datetime.combine(until + timedelta(days=1), time.min))
+        summary_periods = summary_periods.where(summary_days.c.ordinal <= until.toordinal())
+
+    habit_filters = []
+    if habit_id is not None:
+        habit_filters.append(Habit.habit_id == habit_id)
+    elif habit_name is not None:
+        habit_filters.append(Habit.name == habit_name)
+    if periodicity is not None:
+        habit_filters.append(Habit.periodicity == periodicity)
+
+    # UNION also drops multiple completions within the same period
+    periods = union(entry_periods.where(*habit_filters), summary_periods.where(*habit_filters)).cte('periods')
+
+    # Within a run, period and row number increase in lockstep, so their difference is constant per run
+    islands = select(periods.c.habit_id,
+                     periods.c.period,
+                     (periods.c.period - func.row_number().over(partition_by=periods.c.habit_id, order_by=periods.c.period)).label('island')
+                     ).cte('islands')
+
+    length = func.count().label('length')
+    runs = (select(islands.c.habit_id, func.min(islands.c.period).label('first_period'), func.max(islands.c.period).label('last_period'), length)
+            .group_by(islands.c.habit_id, islands.c.island)
+            .having(func.count() >= min_length)
+            .subquery('runs'))
+
+    return (select(Habit.habit_id, Habit.name, Habit.periodicity, runs.c.first_period, runs.c.last_period, runs.c.length)
+            .join(runs, runs.c.habit_id == Habit.habit_id)
+            .order_by(runs.c.length.desc(), Habit.habit_id, runs.c.first_period))
+
+
+# region Helpers
+
+def period_index_expression(periodicity: ColumnElement, completion_date: ColumnElement) -> ColumnElement[int]:
+    """
+    Returns an SQL expression computing Periodicity.period_index for the given datetime column.
+
+    :param periodicity: Column containing the Periodicity
+    :param completion_date: Column containing the datetime
+
+    :returns ColumnElement[int]: SQL Expression
+    """
+    ordinal = julian_day_number_expression(completion_date=completion_date) - JULIAN_DAY_ORDINAL_OFFSET
+    return ordinal_period_index_expression(periodicity=periodicity, ordinal=ordinal)
+
+
+def ordinal_period_index_expression(periodicity: ColumnElement, ordinal: ColumnElement) -> ColumnElement[int]:
+    """
+    Returns an SQL expression computing Periodicity.period_index for the given date.toordinal() column.
+
+    :param periodicity: Column containing the Periodicity
+    :param ordinal: Column containing the ordinal of the date
+
+    :returns ColumnElement[int]: SQL Expression
+    """
+    return case((periodicity == Periodicity.Weekly, (ordinal - 1) // 7), else_=ordinal)
+
+
+def julian_day_number_expression(completion_date: ColumnElement) -> ColumnElement[int]:
+    """
+    Returns an SQL expression computing the Julian Day Number of the given datetime column.
+    Subtracting JULIAN_DAY_ORDINAL_OFFSET results in date.toordinal().
+
+    :param completion_date: Column containing the datetime
+
+    :returns ColumnElement[int]: SQL Expression
+    """
+    # Julian days start at noon, adding half a day and truncating results in the day number of the date
+    return cast(func.julianday(completion_date) + 0.5, Integer)
+
+# endregion
@@ -1,17 +1,22 @@
-from typing import Optional, Tuple
+from datetime import date, datetime, timedelta
+from typing import Optional, Tuple, TYPE_CHECKING
 
 import click
 from click import Group, Context
-from sqlalchemy import func
-from sqlalchemy.orm import Session, Mapped
 
 from classes.helpers.terminal_options import TerminalColor
-from classes.orm.habit import Habit
-from classes.orm.habit_entry import HabitEntry
 from classes.periodicity import Periodicity
-from helpers.cli_helper import colored_print, list_habits
+from helpers.cli_helper import colored_print, list_habits, write_records, complete_habit_names, complete_habit_ids, OUTPUT_FORMATS, LIST_CHUNK_SIZE
 from helpers.validations import validate_periodicity
 
+# Cells of analytics heatmap tables
+HEATMAP_COMPLETED = '■'
+HEATMAP_MISSED = '·'
+
+# SQLAlchemy and the ORM classes are imported within the commands, so that e.g. --help does not need to load them
+if TYPE_CHECKING:
+    from sqlalchemy.orm import Session, Mapped
+
 
 @click.group()
 def analytics() -> Group:
@@ -26,41 +31,81 @@ def analytics() -> Group:
 @click.option('-s', '--sort', 'sort_order', default='ID', help='Field by which Habit(s) should be sorted by.', type=click.Choice(['ID', 'Name', 'Streak', 'HighestStreak', 'Periodicity', 'CreationDate', 'TotalCompletions', 'MostRecentCompletion'], case_sensitive=False))
 @click.option('--asc', 'sort_order_asc', default=False, is_flag=True, help='Sort Habit(s) in ascending order.', type=bool)
 @click.option('--desc', 'sort_order_desc', default=False, is_flag=True, help='Sort Habit(s) in descending order.', type=bool)
+@click.option('-l', '--limit', default=None, help='Maximum number of Habits to list.', type=click.IntRange(min=1))
+@click.option('-a', '--after', default=None, help='Cursor printed by a previous --limit call, continues listing after its last Habit.', type=str)
+@click.option('--format', 'format_', default='table', help='Output format of the Habit list.', type=click.Choice(OUTPUT_FORMATS, case_sensitive=False))
 @click.pass_context
-def analytics_list(ctx: Context, periodicity: Optional[Periodicity], sort_order: str, sort_order_asc: bool, sort_order_desc: bool) -> None:
+def analytics_list(ctx: Context, periodicity: Optional[Periodicity], sort_order: str, sort_order_asc: bool, sort_order_desc: bool, limit: Optional[int], after: Optional[str], format_: str) -> None:
     """\b
     Lists all existing Habits.
 
     If a Periodicity is given, uses it as a filter.
-    If a Sort Order is given, uses it to sort the Habits by the given field.
+    If a Sort Order is given, uses it to sort the Habits by the given field. Habits with equal values are sorted by their ID.
+    If a Limit is given, only that many Habits are listed, followed by a cursor for the next page (on stderr).
     """
+    from itertools import chain
+    from sqlalchemy import func, literal_column
+    from classes.orm.habit import Habit
+    from helpers.pagination import encode_cursor, decode_cursor, keyset_conditions
+
+    target, number_based = get_sort_target(sort=sort_order)
+    if number_based and not sort_order_asc and not sort_order_desc:
+        sort_order_desc = True
+
+    after_position = None
+    if after is not None:
+        try:
+            after_position = decode_cursor(cursor=after, sort=sort_order, descending=sort_order_desc, target=target)
+        except ValueError as error:
+            raise click.BadParameter(message=str(error), param_hint='--after')
+
     with ctx.obj['session_maker']() as session:  # type: Session
-        query = (session.query(Habit,
-                               func.count(HabitEntry.habit_entry_id).label('total_completions'),
-                               func.max(HabitEntry.completion_date).label('most_recent_completion'))
-                        .join(HabitEntry, Habit.habit_id == HabitEntry.habit_id, isouter=True)
-                        .group_by(Habit.habit_id))
+        query = session.query(Habit,
+                              Habit.total_completions.label('total_completions'),
+                              Habit.last_completion.label('most_recent_completion'))
 
         if periodicity is not None:
-            query = query.filter(Habit.periodicity == periodicity)
+            # Without statistics SQLite expects the Periodicity index to be selective, prefers it over the index of the sort target
+            # and sorts all matching Habits for every page. likelihood() marks the filter as matching about half of all Habits.
+            query = query.filter(func.likelihood(Habit.periodicity == periodicity, literal_column('0.5')))
+
+        # The ID breaks ties, which makes the order total and allows continuing after any Habit
+        if sort_order_desc:
+            query = query.order_by(target.desc(), Habit.habit_id.desc())
+        else:
+            query = query.order_by(target.asc(), Habit.habit_id.asc())
 
-        target, number_based = get_sort_target(sort=sort_order)
-        if number_based and not sort_order_asc and not sort_order_desc:
-            sort_order_desc = True
+        # Every page seeks into the index of the sort target, so deep pages cost the same as the first one
+        queries = [query]
+        if after_position is not None:
+            after_value, after_id = after_position
+            queries = [query.filter(condition) for condition in keyset_conditions(target=target, tie_breaker=Habit.habit_id, descending=sort_order_desc,
+                                                                                  value=after_value, last_id=after_id)]
+
+        if limit is None:
+            # Rows are streamed from the database while they are printed
+            habits = queries[0].yield_per(LIST_CHUNK_SIZE) if len(queries) == 1 else chain.from_iterable(page_query.yield_per(LIST_CHUNK_SIZE) for page_query in queries)
+            list_habits(habits=habits, extra_headers=['Total Completions', 'Most Recent Completion'], format_=format_.lower())
+            return
 
-        if target is not None:
-            if sort_order_desc:
-                query = query.order_by(target.desc())
-            else:
-                query = query.order_by(target.asc())
+        # One more Habit than requested is fetched to find out whether there is a next page
+        habits = []
+        for page_query in queries:
+            habits.extend(page_query.limit(limit + 1 - len(habits)).all())
+            if len(habits) > limit:
+                break
 
-        habits = query.all()
-        list_habits(habits=habits, extra_headers=['Total Completions', 'Most Recent Completion'])
+        list_habits(habits=habits[:limit], extra_headers=['Total Completions', 'Most Recent Completion'], format_=format_.lower())
+
+        if len(habits) > limit:
+            last_habit = habits[limit - 1][0]
+            cursor = encode_cursor(sort=sort_order, descending=sort_order_desc, value=getattr(last_habit, target.key), habit_id=last_habit.habit_id)
+            colored_print(message=f'More Habits available, continue with: --after {cursor}', color=TerminalColor.YELLOW, err=True)
 
 
 @analytics.command(name='streak')
-@click.option('-i', '--id', 'habit_id', type=int, default=None, help='ID of the Habit that should be searched for. Takes precedence over --name.')
-@click.option('-n', '--name', type=str, default=None, help='Name of the Habit that should be searched for.')
+@click.option('-i', '--id', 'habit_id', type=int, default=None, help='ID of the Habit that should be searched for. Takes precedence over --name.', shell_complete=complete_habit_ids)
+@click.option('-n', '--name', type=str, default=None, help='Name of the Habit that should be searched for.', shell_complete=complete_habit_names)
 @click.option('-p', '--period', 'periodicity', default=None, help='Periodicity of the Habit(s) that should be searched for.', type=click.UNPROCESSED, callback=validate_periodicity)
 @click.option('-a', '--active', default=False, is_flag=True, help='Get the longest streak that is currently active', type=bool)
 @click.pass_context
@@ -72,6 +117,8 @@ def analytics_longest_streak(ctx: Context, habit_id: Optional[int], name: Option
     If neither an ID nor a Name is given, the Habit with the longest total streak is returned.
     This can additionally be refined by specifying a Periodicity.
     """
+    from classes.orm.habit import Habit
+
     with ctx.obj['session_maker']() as session:  # type: Session
         query = session.query(Habit)
 
@@ -101,18 +148,196 @@ def analytics_longest_streak(ctx: Context, habit_id: Optional[int], name: Option
             colored_print(message=f'The Habit with the longest{' active' if active else ''} streak is: {habit_with_longest_streak.name} with a streak of {streak_value}!', color=TerminalColor.GREEN)
 
 
+@analytics.command(name='streaks')
+@click.option('-i', '--id', 'habit_id', type=int, default=None, help='ID of the Habit that should be searched for. Takes precedence over --name.', shell_complete=complete_habit_ids)
+@click.option('-n', '--name', type=str, default=None, help='Name of the Habit that should be searched for.', shell_complete=complete_habit_names)
+@click.option('-p', '--period', 'periodicity', default=None, help='Periodicity of the Habit(s) that should be searched for.', type=click.UNPROCESSED, callback=validate_periodicity)
+@click.option('--since', default=None, help='Only consider completions on or after this date (YYYY-MM-DD).', type=click.DateTime(formats=['%Y-%m-%d']))
+@click.option('--until', default=None, help='Only consider completions on or before this date (YYYY-MM-DD).', type=click.DateTime(formats=['%Y-%m-%d']))
+@click.option('-m', '--min-length', default=1, help='Minimum length of the listed streaks.', type=click.IntRange(min=1))
+@click.pass_context
+def analytics_streaks(ctx: Context, habit_id: Optional[int], name: Optional[str], periodicity: Optional[Periodicity], since: Optional[datetime], until: Optional[datetime], min_length: int) -> None:
+    """\b
+    Lists all streaks found in the completion history, longest first.
+    Unlike the stored streak counters, this also covers past streaks and can be limited to a time range.
+    """
+    from tabulate import tabulate
+    from helpers.streaks import streak_runs_statement
+
+    statement = streak_runs_statement(since=since.date() if since is not None else None,
+                                      until=until.date() if until is not None else None,
+                                      min_length=min_length, habit_id=habit_id, habit_name=name, periodicity=periodicity)
+
+    with ctx.obj['session_maker']() as session:  # type: Session
+        data = []
+        for streak_habit_id, habit_name, habit_periodicity, first_period, last_period, length in session.execute(statement):
+            end_date = habit_periodicity.period_start(period_index=last_period + 1) - timedelta(days=1)
+            data.append([streak_habit_id, habit_name, habit_periodicity.name, habit_periodicity.period_start(period_index=first_period), end_date, length])
+
+    if len(data) == 0:
+        colored_print(message='No Matching Streak found.', color=TerminalColor.YELLOW)
+        return
+
+    print(tabulate(tabular_data=data, headers=['ID', 'Name', 'Periodicity', 'Start', 'End', 'Length']))
+
+
+@analytics.command(name='rate')
+@click.option('-i', '--id', 'habit_id', type=int, default=None, help='ID of the Habit that should be searched for. Takes precedence over --name.', shell_complete=complete_habit_ids)
+@click.option('-n', '--name', type=str, default=None, help='Name of the Habit that should be searched for.', shell_complete=complete_habit_names)
+@click.option('-p', '--period', 'periodicity', default=None, help='Periodicity of the Habit(s) that should be searched for.', type=click.UNPROCESSED, callback=validate_periodicity)
+@click.option('-l', '--last', default=30, help='Number of periods (days or weeks, depending on the Habit) the rate is computed over.', type=click.IntRange(min=1))
+@click.option('--until', default=None, help='Last day that is taken into account (YYYY-MM-DD). Defaults to today.', type=click.DateTime(formats=['%Y-%m-%d']))
+@click.option('-s', '--sort', 'sort_order', default='ID', help='Field by which Habit(s) should be sorted by. Rates are sorted in descending order.', type=click.Choice(['ID', 'Rate'], case_sensitive=False))
+@click.option('--format', 'format_', default='table', help='Output format of the rates.', type=click.Choice(OUTPUT_FORMATS, case_sensitive=False))
+@click.pass_context
+def analytics_rate(ctx: Context, habit_id: Optional[int], name: Optional[str], periodicity: Optional[Periodicity], last: int, until: Optional[datetime], sort_order: str, format_: str) -> None:
+    """\b
+    Lists the completion rate of Habits over their last periods, along with their completions per weekday.
+    Only periods since the creation of a Habit are taken into account, the current period counts as well.
+    """
+    import sys
+    import numpy as np
+    from tabulate import tabulate
+    from helpers.completion_matrix import WEEKDAYS, load_completion_matrix, completion_statistics, rate_window_start
+
+    until_date = until.date() if until is not None else date.today()
+    since = rate_window_start(until=until_date, last=last)
+
+    with ctx.obj['session_maker']() as session:  # type: Session
+        habits, counts = load_completion_matrix(session=session, since=since, until=until_date, habit_id=habit_id, habit_name=name, periodicity=periodicity)
+
+    if len(habits) == 0:
+        colored_print(message='No Matching Habit found.', color=TerminalColor.YELLOW)
+        return
+
+    completed, periods, weekdays = completion_statistics(habits=habits, counts=counts, since=since, last=last)
+    rates = np.divide(completed, periods, out=np.zeros(len(habits)), where=periods > 0)
+    order = np.argsort(-rates, kind='stable') if sort_order == 'Rate' else np.arange(len(habits))
+
+    rows = [[habits[row].habit_id, habits[row].name, habits[row].periodicity.name, int(completed[row]), int(periods[row]), round(float(rates[row]), 4), *weekdays[row].tolist()]
+            for row in order.tolist()]
+
+    if format_.lower() == 'table':
+        print(tabulate(tabular_data=[[*row[:5], f'{row[5]:.1%}', *row[6:]] for row in rows], headers=['ID', 'Name', 'Periodicity', 'Completed', 'Periods', 'Rate', *WEEKDAYS]))
+        return
+
+    keys = ['id', 'name', 'periodicity', 'completed', 'periods', 'rate', *[weekday.lower() for weekday in WEEKDAYS]]
+    write_records(records=(dict(zip(keys, row)) for row in rows), keys=keys, format_=format_.lower(), output=sys.stdout)
+
+
+@analytics.command(name='heatmap')
+@click.option('-i', '--id', 'habit_id', type=int, default=None, help='ID of the Habit that should be searched for. Takes precedence over --name.', shell_complete=complete_habit_ids)
+@click.option('-n', '--name', type=str, default=None, help='Name of the Habit that should be searched for.', shell_complete=complete_habit_names)
+@click.option('-p', '--period', 'periodicity', default=None, help='Periodicity of the Habit(s) that should be searched for.', type=click.UNPROCESSED, callback=validate_periodicity)
+@click.option('-d', '--days', default=28, help='Number of days shown, ending with --until.', type=click.IntRange(min=1))
+@click.option('--until', default=None, help='Last day that is shown (YYYY-MM-DD). Defaults to today.', type=click.DateTime(formats=['%Y-%m-%d']))
+@click.option('--format', 'format_', default='table', help='Output format of the heatmap.', type=click.Choice(['table', 'json', 'jsonl'], case_sensitive=False))
+@click.pass_context
+def analytics_heatmap(ctx: Context, habit_id: Optional[int], name: Optional[str], periodicity: Optional[Periodicity], days: int, until: Optional[datetime], format_: str) -> None:
+    """\b
+    Shows the completions of Habits per day as a calendar heatmap.
+    Tables mark every day with at least one completion, JSON contains the number of completions per day.
+    """
+    import sys
+    import numpy as np
+    from tabulate import tabulate
+    from helpers.completion_matrix import load_completion_matrix
+
+    until_date = until.date() if until is not None else date.today()
+    since = until_date - timedelta(days=days - 1)
+
+    with ctx.obj['session_maker']() as session:  # type: Session
+        habits, counts = load_completion_matrix(session=session, since=since, until=until_date, habit_id=habit_id, habit_name=name, periodicity=periodicity)
+
+    if len(habits) == 0:
+        colored_print(message='No Matching Habit found.', color=TerminalColor.YELLOW)
+        return
+
+    if format_.lower() == 'table':
+        cells = np.where(counts > 0, HEATMAP_COMPLETED, HEATMAP_MISSED)
+        weekdays = ''.join('MTWTFSS'[(since.weekday() + day) % 7] for day in range(days))
+        print(f'{since} - {until_date}')
+        print(tabulate(tabular_data=[[habit.habit_id, habit.name, ''.join(row)] for habit, row in zip(habits, cells.tolist())], headers=['ID', 'Name', weekdays]))
+        return
+
+    keys = ['id', 'name', 'periodicity', 'since', 'until', 'completions']
+    records = ({'id': habit.habit_id, 'name': habit.name, 'periodicity': habit.periodicity.name, 'since': since.isoformat(), 'until': until_date.isoformat(), 'completions': row}
+               for habit, row in zip(habits, counts.tolist()))
+    write_records(records=records, keys=keys, format_=format_.lower(), output=sys.stdout)
+
+
+@analytics.command(name='recompute')
+@click.option('-i', '--id', 'habit_ids', type=int, multiple=True, help='ID of a Habit whose streaks should be recomputed. Can be passed multiple times.', shell_complete=complete_habit_ids)
+@click.option('-a', '--all', 'all_habits', default=False, is_flag=True, help='Recompute the streaks of all Habits.', type=bool)
+@click.pass_context
+def analytics_recompute(ctx: Context, habit_ids: Tuple[int, ...], all_habits: bool) -> None:
+    """\b
+    Recomputes the current and longest streak of Habits from their completion history.
+    Useful after manual changes to the database or after changing the Periodicity of a Habit.
+    """
+    from helpers.streaks import rebuild_streaks, rebuild_period_keys
+
+    if len(habit_ids) == 0 and not all_habits:
+        colored_print(message='Either --id or --all has to be passed!', color=TerminalColor.YELLOW)
+        return
+
+    with ctx.obj['session_maker']() as session:  # type: Session
+        # Completions only continue a streak if the previous period is keyed, manually added entries are not
+        rebuild_period_keys(session=session, habit_ids=None if all_habits else habit_ids)
+        updated = rebuild_streaks(session=session, habit_ids=None if all_habits else habit_ids)
+        session.commit()
+
+    colored_print(message=f'Streaks have been recomputed! ({updated} Habit(s) with completions)', color=TerminalColor.GREEN)
+
+
+@analytics.command(name='check')
+@click.option('--fix', default=False, is_flag=True, help='Recompute the aggregates, period keys and streaks of all inconsistent Habits.', type=bool)
+@click.pass_context
+def analytics_check(ctx: Context, fix: bool) -> None:
+    """\b
+    Verifies the stored completion aggregates (Total Completions, Most Recent Completion) against the completion history.
+    Inconsistencies can only be caused by changes made outside of the tracker.
+    """
+    from tabulate import tabulate
+    from helpers.aggregates import aggregate_mismatches_statement, rebuild_aggregates
+    from helpers.streaks import rebuild_streaks, rebuild_period_keys
+
+    with ctx.obj['session_maker']() as session:  # type: Session
+        mismatches = session.execute(aggregate_mismatches_statement()).all()
+        if len(mismatches) == 0:
+            colored_print(message='All completion aggregates are consistent!', color=TerminalColor.GREEN)
+            return
+
+        print(tabulate(tabular_data=mismatches, headers=['ID', 'Name', 'Stored Completions', 'Actual Completions', 'Stored Most Recent Completion', 'Actual Most Recent Completion']))
+
+        if not fix:
+            colored_print(message=f'Found {len(mismatches)} inconsistent Habit(s)! Use --fix to recompute their aggregates.', color=TerminalColor.YELLOW)
+            return
+
+        # The completion history of inconsistent Habits was changed outside of the tracker, their period keys and streaks are outdated as well
+        habit_ids = [mismatch[0] for mismatch in mismatches]
+        rebuild_aggregates(session=session, habit_ids=habit_ids)
+        rebuild_period_keys(session=session, habit_ids=habit_ids)
+        rebuild_streaks(session=session, habit_ids=habit_ids)
+        session.commit()
+
+    colored_print(message=f'Aggregates of {len(mismatches)} Habit(s) have been recomputed!', color=TerminalColor.GREEN)
+
+
 # region Helpers
 
-def get_sort_target(sort: str) -> Tuple[Mapped, bool]:
+def get_sort_target(sort: str) -> Tuple['Mapped', bool]:
     """
     Returns the SQLAlchemy Mapped Object that should be used for sorting and whether the target is number-based.
     Number-based targets are sorted in descending order by default.
 
     :param sort: Sort Order to be used
-    :returns Mapped: SQLAlchemy Mapped Object to be used for sorting
+    :returns Mapped: SQLAlchemy Mapped Object to be used for sorting, backed by an index
     :returns bool: Whether the target is number-based
     """
-    target: Mapped
+    from classes.orm.habit import Habit
+
+    target: 'Mapped'
     number_based: bool = False
 
     if sort == 'ID':
@@ -131,14 +356,15 @@ def get_sort_target(sort: str) -> Tuple[Mapped, bool]:
         target = Habit.creation_date
         number_based = True
     elif sort == 'TotalCompletions':
-        target = func.count(HabitEntry.habit_entry_id)
+        target = Habit.total_completions
         number_based = True
     elif sort == 'MostRecentCompletion':
-        target = func.max(HabitEntry.completion_date)
+        target = Habit.last_completion
         number_based = True
     else:
         raise NotImplementedError(f'No implementation for sort order {sort}!')
 
     return target, number_based
 
+
 # endregion
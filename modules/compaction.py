@@ -0,0 +1,74 @@
+from datetime import date
+from typing import TYPE_CHECKING
+
+import click
+from click import Context
+
+from classes.helpers.terminal_options import TerminalColor
+from helpers.cli_helper import colored_print
+
+# SQLAlchemy and the ORM classes are imported within the commands, so that e.g. --help does not need to load them
+if TYPE_CHECKING:
+    from sqlalchemy.orm import Session
+
+# Same as helpers.compaction.MIN_COMPACTION_AGE, COMPACTION_BATCH_SIZE and ORPHAN_BATCH_SIZE, which would import SQLAlchemy and NumPy
+MIN_COMPACTION_AGE = 31
+COMPACTION_BATCH_SIZE = 1000
+ORPHAN_BATCH_SIZE = 10000
+
+
+@click.command(name='compact')
+@click.option('-o', '--older-than', default=365, show_default=True, help=f'Minimum age of compacted completions in days, at least {MIN_COMPACTION_AGE}.',
+              type=click.IntRange(min=MIN_COMPACTION_AGE))
+@click.option('-b', '--batch-size', default=COMPACTION_BATCH_SIZE, help='Number of Habits compacted per transaction.', type=click.IntRange(min=1))
+@click.option('--vacuum/--no-vacuum', default=True, help='Return the freed space to the file system afterwards.', type=bool)
+@click.pass_context
+def compact(ctx: Context, older_than: int, batch_size: int, vacuum: bool) -> None:
+    """\b
+    Rolls old completions up into one summary per Habit and month and deletes them, so that the completion history stops growing.
+    Only whole months are compacted. Streaks, analytics and exports read the summaries like the original completions.
+    The time of day of compacted completions is not kept, apart from the most recent completion of each month.
+    """
+    from helpers.compaction import compaction_boundary, compact_history, database_size, vacuum as vacuum_database
+
+    before = compaction_boundary(today=date.today(), older_than=older_than)
+    with ctx.obj['session_maker']() as session:  # type: Session
+        size_before = database_size(session=session)
+        compacted, summarized = compact_history(session=session, before=before, batch_size=batch_size)
+        if compacted == 0:
+            colored_print(message=f'No completions before {before} could be compacted.', color=TerminalColor.YELLOW)
+            return
+
+        if vacuum:
+            vacuum_database(session=session)
+        size_after = database_size(session=session)
+
+    colored_print(message=f'Compacted {compacted} completion(s) before {before} into {summarized} monthly summaries! '
+                          f'({size_before / 2 ** 20:.1f} MiB -> {size_after / 2 ** 20:.1f} MiB)', color=TerminalColor.GREEN)
+
+
+@click.command(name='gc')
+@click.option('-b', '--batch-size', default=ORPHAN_BATCH_SIZE, help='Number of orphaned completions deleted per transaction.', type=click.IntRange(min=1))
+@click.option('--vacuum/--no-vacuum', default=True, help='Return the freed space to the file system afterwards.', type=bool)
+@click.pass_context
+def gc(ctx: Context, batch_size: int, vacuum: bool) -> None:
+    """\b
+    Deletes orphaned completions and summaries, whose Habit no longer exists, and reports the reclaimed space.
+    Orphans are left behind if Habits are deleted by tools that do not enable foreign keys, e.g. the sqlite3 shell.
+    """
+    from helpers.compaction import delete_orphans, database_size, vacuum as vacuum_database
+
+    with ctx.obj['session_maker']() as session:  # type: Session
+        size_before = database_size(session=session)
+        entries, summaries, habits = delete_orphans(session=session, batch_size=batch_size)
+        if entries == 0 and summaries == 0:
+            colored_print(message='No orphaned completions found!', color=TerminalColor.GREEN)
+            return
+
+        if vacuum:
+            vacuum_database(session=session)
+        size_after = database_size(session=session)
+
+    colored_print(message=f'Deleted {entries} orphaned completion(s) and {summaries} summaries of {habits} deleted Habit(s)! '
+                          f'Reclaimed {(size_before - size_after) / 2 ** 20:.1f} MiB ({size_before / 2 ** 20:.1f} MiB -> {size_after / 2 ** 20:.1f} MiB)',
+                  color=TerminalColor.GREEN)
@@ -1,20 +1,23 @@
-from typing import Optional, List, Type
+import json
+from typing import Optional, List, Tuple, Iterable, TextIO, TYPE_CHECKING
 
 import click
 from click import Context
-from sqlalchemy import Select
-from sqlalchemy.orm import Session
 
 from classes.helpers.terminal_options import TerminalColor
-from classes.orm.habit import Habit
 from classes.periodicity import Periodicity
-from helpers.cli_helper import colored_print, list_habits
+from helpers.cli_helper import colored_print, list_habits, complete_habit_names, complete_habit_ids, OUTPUT_FORMATS, LIST_CHUNK_SIZE
 from helpers.validations import validate_habit_name, validate_periodicity
 
+# SQLAlchemy and the ORM classes are imported within the commands, so that e.g. --help does not need to load them
+if TYPE_CHECKING:
+    from sqlalchemy.orm import Session
+
 
 @click.group(invoke_without_command=True)
+@click.option('--format', 'format_', default='table', help='Output format of the Habit list.', type=click.Choice(OUTPUT_FORMATS, case_sensitive=False))
 @click.pass_context
-def habit(ctx: Context) -> None:
+def habit(ctx: Context, format_: str) -> None:
     """\b
     Module related to Habit Management.
     Prints a list of all existing Habits if no subcommand is given.
@@ -22,12 +25,10 @@ def habit(ctx: Context) -> None:
     if ctx.invoked_subcommand is not None:
         return
 
-    habits: List[Type[Habit]]
-    with ctx.obj['session_maker']() as session:  # type: Session
-        statement: Select
-        habits = session.query(Habit).all()
+    from classes.habit_repository import HabitRepository
 
-        list_habits(habits=habits)
+    with ctx.obj['session_maker']() as session:  # type: Session
+        list_habits(habits=HabitRepository(session=session).stream(chunk_size=LIST_CHUNK_SIZE), format_=format_.lower())
 
 
 @habit.command(name='create')
@@ -38,41 +39,66 @@ def habit_create(ctx: Context, habit_name: str, periodicity: Periodicity) -> Non
     """\b
     Creates a new Habit
     """
+    from classes.habit_repository import HabitRepository
+
     with ctx.obj['session_maker']() as session:  # type: Session
-        if Habit.exists(session=session, habit_name=habit_name):
+        if HabitRepository(session=session).create(habit_name=habit_name, periodicity=periodicity) is None:
             colored_print(message=f'ERROR: Habit "{habit_name}" already exists!', color=TerminalColor.RED)
             return
 
-        Habit.create(session=session, habit_name=habit_name, periodicity=periodicity)
+        session.commit()
         colored_print(message=f'Habit "{habit_name}" has been created with a {periodicity.name} Periodicity!', color=TerminalColor.GREEN)
 
 
 @habit.command(name='delete')
-@click.option('-i', '--id', 'habit_id', required=False, help='ID of the Habit that should be searched for. Takes precedence over --name.', type=int)
-@click.option('-n', '--name', 'habit_name', required=False, help='Name of the Habit to help with identification', type=str)
+@click.option('-i', '--id', 'habit_ids', type=int, multiple=True, help='ID of a Habit that should be deleted. Can be passed multiple times.', shell_complete=complete_habit_ids)
+@click.option('-n', '--name', 'habit_names', type=str, multiple=True, help='Name of a Habit that should be deleted. Can be passed multiple times.', shell_complete=complete_habit_names)
+@click.option('-p', '--period', 'periodicity', default=None, help='Only delete Habits of this Periodicity, all of them if no ID / Name is given (d/daily w/weekly).', type=click.UNPROCESSED, callback=validate_periodicity)
+@click.option('-y', '--yes', 'confirmed', default=False, is_flag=True, help='Delete without asking for confirmation.', type=bool)
 @click.pass_context
-def habit_delete(ctx: Context, habit_id: Optional[int], habit_name: Optional[str]) -> None:
+def habit_delete(ctx: Context, habit_ids: Tuple[int, ...], habit_names: Tuple[str, ...], periodicity: Optional[Periodicity], confirmed: bool) -> None:
     """\b
-    Deletes an existing Habit.
+    Deletes existing Habits and their completion history within a single transaction.
+    Habits are selected by any number of IDs / Names, optionally restricted to a Periodicity.
     Unless a Backup of the Database exists this is irreversible!
     """
-    if habit_id is None and not habit_name_condition(habit_name):
-        habit_name = click.prompt('Name', type=click.UNPROCESSED, value_proc=validate_habit_name)
+    from sqlalchemy import select
+    from classes.orm.habit import Habit
+
+    habit_names = tuple(habit_name for habit_name in habit_names if habit_name_condition(input_string=habit_name))
+    if len(habit_ids) == 0 and len(habit_names) == 0 and periodicity is None:
+        habit_names = (click.prompt('Name', type=click.UNPROCESSED, value_proc=validate_habit_name),)
 
+    condition = Habit.match_condition(habit_ids=habit_ids, habit_names=habit_names, periodicity=periodicity)
     with ctx.obj['session_maker']() as session:  # type: Session
-        target_habit = Habit.get(session=session, habit_id=habit_id, habit_name=habit_name)
-        if target_habit is None:
-            colored_print(message=f'No Habit with {"ID" if habit_id is not None else "Name"} {habit_id or habit_name} exists!', color=TerminalColor.YELLOW)
+        targets = session.execute(select(Habit.habit_id, Habit.name).where(condition).order_by(Habit.habit_id)).all()
+
+        kind = f'{periodicity.name} Habit' if periodicity is not None else 'Habit'
+        found_ids, found_names = {target.habit_id for target in targets}, {target.name for target in targets}
+        missing = [f'ID {habit_id}' for habit_id in dict.fromkeys(habit_ids) if habit_id not in found_ids]
+        missing += [f'Name {habit_name}' for habit_name in dict.fromkeys(habit_names) if habit_name not in found_names]
+        for identifier in missing:
+            colored_print(message=f'No {kind} with {identifier} exists!', color=TerminalColor.YELLOW)
+
+        if len(targets) == 0:
+            if len(habit_ids) == 0 and len(habit_names) == 0:
+                colored_print(message=f'No {kind} exists!', color=TerminalColor.YELLOW)
             return
 
-        click.confirm(text=f'Are you sure you want to delete the Habit \"{target_habit.name}\"?', abort=True)
+        if not confirmed:
+            shown = ', '.join(f'"{target.name}"' for target in targets[:5]) + (f' and {len(targets) - 5} more' if len(targets) > 5 else '')
+            click.confirm(text=f'Are you sure you want to delete the Habit {shown}?' if len(targets) == 1 else f'Are you sure you want to delete {len(targets)} Habits ({shown})?',
+                          abort=True)
 
-        target_habit.delete(session=session)
-        colored_print(message=f'Habit \"{target_habit.name}\" has been deleted!', color=TerminalColor.GREEN)
+        deleted = Habit.delete_many(session=session, habit_ids=habit_ids, habit_names=habit_names, periodicity=periodicity)
+        if len(targets) == 1 and deleted == 1:
+            colored_print(message=f'Habit \"{targets[0].name}\" has been deleted!', color=TerminalColor.GREEN)
+        else:
+            colored_print(message=f'{deleted} Habit(s) have been deleted!', color=TerminalColor.GREEN)
 
 
 @habit.command(name='modify')
-@click.option('-i', '--id', 'habit_id', required=True, prompt=True, help='ID of the Habit that should be modified', type=int)
+@click.option('-i', '--id', 'habit_id', required=True, prompt=True, help='ID of the Habit that should be modified', type=int, shell_complete=complete_habit_ids)
 @click.option('-n', '--name', 'habit_name', required=False, help='Updated Name for the Habit', type=click.UNPROCESSED, default=None, callback=validate_habit_name)
 @click.option('-p', '--period', 'periodicity', required=False, help='Updated Periodicity for the Habit (d/daily w/weekly)', type=click.UNPROCESSED, default=None, callback=validate_periodicity)
 @click.pass_context
@@ -83,6 +109,8 @@ def habit_modify(ctx: Context, habit_id: int, habit_name: Optional[str], periodi
 
     NOTE: Changing the Periodicity might end your current Streak!
     """
+    from classes.orm.habit import Habit
+
     with ctx.obj['session_maker']() as session:  # type: Session
         target_habit = Habit.get(session=session, habit_id=habit_id)
         if target_habit is None:
@@ -100,6 +128,10 @@ def habit_modify(ctx: Context, habit_id: int, habit_name: Optional[str], periodi
             colored_print(message='No fields to change have been passed! Cancelling!', color=TerminalColor.YELLOW)
             return
 
+        if habit_name is not None and habit_name != target_habit.name and Habit.exists(session=session, habit_name=habit_name):
+            colored_print(message=f'ERROR: Habit "{habit_name}" already exists!', color=TerminalColor.RED)
+            return
+
         if target_habit.update(session=session, new_name=habit_name, new_periodicity=periodicity):
             colored_print(message='Habit has been updated!', color=TerminalColor.GREEN)
         else:
@@ -107,32 +139,95 @@ def habit_modify(ctx: Context, habit_id: int, habit_name: Optional[str], periodi
 
 
 @habit.command(name='complete')
-@click.option('-i', '--id', 'habit_id', type=int, default=None, help='ID of the Habit that should be searched for. Takes precedence over --name.')
-@click.option('-n', '--name', 'habit_name', required=False, help='Name of the Habit to help with identification', type=str)
+@click.option('-i', '--id', 'habit_id', type=int, default=None, help='ID of the Habit that should be searched for. Takes precedence over --name.', shell_complete=complete_habit_ids)
+@click.option('-n', '--name', 'habit_name', required=False, help='Name of the Habit to help with identification', type=str, shell_complete=complete_habit_names)
+@click.option('-f', '--from-file', 'input_file', default=None, help='Complete all Habits listed in the given file (one ID / Name or JSON object per line).', type=click.File('r'))
+@click.option('--stdin', 'from_stdin', default=False, is_flag=True, help='Complete all Habits listed on stdin (one ID / Name or JSON object per line).', type=bool)
 @click.pass_context
-def habit_complete(ctx: Context, habit_id: Optional[int], habit_name: Optional[str]) -> None:
+def habit_complete(ctx: Context, habit_id: Optional[int], habit_name: Optional[str], input_file: Optional[TextIO], from_stdin: bool) -> None:
     """\b
     Completes a habit via either its ID or name.
     If both are given, the ID takes precedence.
+
+    Multiple Habits can be completed at once via --from-file or --stdin.
+    Each line contains either an ID, a Name or a JSON object like {"id": 1} / {"name": "Habit"}.
     """
+    from classes.habit_repository import HabitRepository
+
+    if input_file is not None or from_stdin:
+        habit_complete_bulk(ctx=ctx, lines=input_file if input_file is not None else click.get_text_stream('stdin'))
+        return
+
     if habit_id is None and not habit_name_condition(input_string=habit_name):
         habit_name = click.prompt(text='Name', type=click.UNPROCESSED, value_proc=validate_habit_name)
 
     with ctx.obj['session_maker']() as session:  # type: Session
-        target_habit = Habit.get(session=session, habit_id=habit_id, habit_name=habit_name)
+        repository = HabitRepository(session=session)
+        target_habit = repository.get(habit_id=habit_id, habit_name=habit_name)
         if target_habit is None:
             colored_print(message=f'No Habit with {"ID" if habit_id is not None else "Name"} {habit_id or habit_name} exists!', color=TerminalColor.YELLOW)
             return
 
-        habit_entry, streak_broken = target_habit.complete(session)
-        if habit_entry is None:
+        result = repository.complete(habit=target_habit)
+        if result is None:
             colored_print(message=f'You have already completed this Habit {"today" if target_habit.periodicity is Periodicity.Daily else "this week"}!', color=TerminalColor.YELLOW)
             return
 
+        streak, streak_broken = result
         if streak_broken:
             colored_print(message=f'Your streak for Habit \"{target_habit.name}\" has been broken!', color=TerminalColor.YELLOW)
 
-        colored_print(message=f'You have completed Habit \"{target_habit.name}\"! (Streak: {target_habit.streak})', color=TerminalColor.GREEN)
+        colored_print(message=f'You have completed Habit \"{target_habit.name}\"! (Streak: {streak})', color=TerminalColor.GREEN)
+
+
+def habit_complete_bulk(ctx: Context, lines: Iterable[str]) -> None:
+    """
+    Completes all Habits identified by the given lines within a single transaction and prints a result per line.
+
+    :param ctx: Click Context
+    :param lines: Lines containing either an ID, a Name or a JSON object with an "id" / "name" key.
+    """
+    from tabulate import tabulate
+    from classes.orm.habit import Habit
+
+    targets = parse_completion_targets(lines=lines)
+    if len(targets) == 0:
+        colored_print(message='No Habits to complete have been passed!', color=TerminalColor.YELLOW)
+        return
+
+    with ctx.obj['session_maker']() as session:  # type: Session
+        habits = Habit.get_many(session=session,
+                                habit_ids=[target_id for _, target_id, _ in targets if target_id is not None],
+                                habit_names=[target_name for _, target_id, target_name in targets if target_id is None])
+        habits_by_id = {target_habit.habit_id: target_habit for target_habit in habits}
+        habits_by_name = {target_habit.name: target_habit for target_habit in habits}
+
+        results = Habit.complete_many(session=session, habits=habits)
+        if any(result is not None for result in results.values()):
+            # Completing commits and thereby expires all Habits, reload them at once instead of lazily per printed row
+            Habit.get_many(session=session, habit_ids=habits_by_id)
+
+        data = []
+        reported_ids = set()
+        for target, target_id, target_name in targets:
+            target_habit = habits_by_id.get(target_id) if target_id is not None else habits_by_name.get(target_name)
+            if target_habit is None:
+                data.append([target, None, 'Not found', None])
+                continue
+
+            # Habits listed multiple times are only completed once
+            result = results[target_habit.habit_id] if target_habit.habit_id not in reported_ids else None
+            reported_ids.add(target_habit.habit_id)
+
+            if result is None:
+                status = 'Already completed'
+            elif result[1]:
+                status = 'Completed (Streak broken)'
+            else:
+                status = 'Completed'
+            data.append([target, target_habit.name, status, target_habit.streak])
+
+    print(tabulate(tabular_data=data, headers=['Input', 'Habit', 'Result', 'Current Streak']))
 
 
 # region Helpers
@@ -150,4 +245,42 @@ def habit_name_condition(input_string: str) -> bool:
     return input_string is not None and not input_string.isspace() and len(input_string) != 0
 
 
+def parse_completion_targets(lines: Iterable[str]) -> List[Tuple[str, Optional[int], Optional[str]]]:
+    """
+    Parses the Habits that should be completed in bulk.
+    Plain lines consisting of digits are treated as IDs, every other plain line as a Name.
+    Names consisting of digits can be passed as JSON object, e.g. {"name": "42"}.
+
+    :param lines: Lines containing either an ID, a Name or a JSON object with an "id" / "name" key.
+
+    :returns List[Tuple[str, Optional[int], Optional[str]]]: Original input, ID and Name per non-empty line.
+    :raises click.BadParameter: Line could not be parsed
+    """
+    targets = []
+    for line_number, line in enumerate(lines, start=1):
+        line = line.strip()
+        if len(line) == 0:
+            continue
+
+        if line.startswith('{'):
+            try:
+                target = json.loads(line)
+            except json.JSONDecodeError:
+                raise click.BadParameter(message=f'Line {line_number} is not valid JSON!')
+
+            # bool is a subclass of int, {"id": true} would complete the Habit with ID 1
+            if isinstance(target.get('id'), int) and not isinstance(target.get('id'), bool):
+                targets.append((line, target['id'], None))
+            elif isinstance(target.get('name'), str) and habit_name_condition(input_string=target['name']):
+                targets.append((line, None, target['name']))
+            else:
+                raise click.BadParameter(message=f'Line {line_number} needs to contain either an "id" or a "name"!')
+        elif line.isdigit():
+            targets.append((line, int(line), None))
+        else:
+            targets.append((line, None, line))
+
+    return targets
+
+
 # endregion
@@ -0,0 +1,29 @@
+import click
+from click import Context
+
+from classes.helpers.terminal_options import TerminalColor
+from helpers.cli_helper import colored_print
+from helpers.remote import DEFAULT_SERVER_PORT, SERVER_HOST
+
+
+@click.command(name='serve')
+@click.option('-p', '--port', default=DEFAULT_SERVER_PORT, help='Port the server listens on. 0 picks a free port.', type=click.IntRange(min=0, max=65535))
+@click.pass_context
+def serve(ctx: Context, port: int) -> None:
+    """\b
+    Runs a local server for the habit and analytics commands.
+    Commands run with tracker.py --remote are forwarded to it and skip the startup of the application and database.
+    The server only listens on 127.0.0.1 and only runs commands of clients that send its token,
+    which is written to a file only the current user can read (~/.tracker/server-<port>.token, see TRACKER_TOKEN_DIR).
+    """
+    from classes.tracker_server import TrackerServer
+
+    # Commands run by the server share the session maker and thereby the engine of this invocation
+    with TrackerServer(port=port, command=ctx.find_root().command, obj=ctx.obj, prog_name=ctx.find_root().info_name) as server:
+        server.warm_up()
+        colored_print(message=f'Serving habit and analytics commands on {SERVER_HOST}:{server.port}, stop with Ctrl+C.', color=TerminalColor.GREEN)
+
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            colored_print(message=f'Server stopped after {server.command_count} command(s).', color=TerminalColor.YELLOW)
@@ -0,0 +1,198 @@
+import csv
+import json
+from datetime import datetime, date
+from typing import Optional, Iterator, Dict, List, Tuple, TextIO, TYPE_CHECKING
+
+import click
+from click import Context
+
+from classes.helpers.terminal_options import TerminalColor
+from classes.periodicity import Periodicity
+from helpers.cli_helper import colored_print
+
+# SQLAlchemy and the ORM classes are imported within the commands, so that e.g. --help does not need to load them
+if TYPE_CHECKING:
+    from sqlalchemy.orm import Session
+
+TRANSFER_FORMATS = ['jsonl', 'csv']
+TRANSFER_FIELDS = ['type', 'id', 'habit_id', 'name', 'periodicity', 'creation_date', 'completion_date', 'month', 'completion_count', 'completed_days']
+TRANSFER_CHUNK_SIZE = 10000
+
+
+@click.command(name='export')
+@click.option('-f', '--format', 'format_', default='jsonl', help='Format of the exported data.', type=click.Choice(TRANSFER_FORMATS, case_sensitive=False))
+@click.option('-o', '--output', 'output_file', default='-', help='File the data should be written to. Defaults to stdout.', type=click.File('w', encoding='utf-8'))
+@click.option('-c', '--chunk-size', default=TRANSFER_CHUNK_SIZE, help='Number of rows fetched per round-trip.', type=click.IntRange(min=1))
+@click.pass_context
+def export(ctx: Context, format_: str, output_file: TextIO, chunk_size: int) -> None:
+    """\b
+    Exports all Habits and their completion history.
+    Habits are written first, followed by all completions and the monthly summaries of compacted completions.
+    """
+    with ctx.obj['session_maker']() as session:  # type: Session
+        write_records(records=read_records(session=session, chunk_size=chunk_size), format_=format_.lower(), output_file=output_file)
+
+
+@click.command(name='import')
+@click.argument('input_file', default='-', type=click.File('r', encoding='utf-8'))
+@click.option('-f', '--format', 'format_', default='jsonl', help='Format of the imported data.', type=click.Choice(TRANSFER_FORMATS, case_sensitive=False))
+@click.option('-c', '--chunk-size', default=TRANSFER_CHUNK_SIZE, help='Number of rows inserted per round-trip.', type=click.IntRange(min=1))
+@click.pass_context
+def import_(ctx: Context, input_file: TextIO, format_: str, chunk_size: int) -> None:
+    """\b
+    Imports Habits and their completion history from a file created by the export command.
+    Reads from stdin if no file is given.
+
+    Habits keep their IDs, the import is cancelled if any of them already exists.
+    Period keys, streaks and completion aggregates of all affected Habits are rebuilt from their history afterwards.
+    """
+    from sqlalchemy import insert
+    from sqlalchemy.exc import IntegrityError
+    from classes.orm.habit import Habit
+    from helpers.aggregates import rebuild_aggregates
+    from helpers.streaks import rebuild_streaks, rebuild_period_keys
+
+    habits: List[Dict] = []
+    entries: List[Tuple[int, int, str]] = []
+    summaries: List[Tuple[int, int, int, int, str]] = []
+    habit_ids = set()
+    habit_count = entry_count = 0
+
+    def flush() -> None:
+        # Habits are always inserted first, so that entries never reference a missing Habit
+        if len(habits) > 0:
+            session.execute(insert(Habit.__table__), habits)
+            habits.clear()
+        if len(entries) > 0:
+            # Entries make up most of the data, they are passed to the driver directly to skip per-row parameter processing
+            session.connection().exec_driver_sql('INSERT INTO habit_entry (id, habit_id, completion_date) VALUES (?, ?, ?)', entries)
+            entries.clear()
+        if len(summaries) > 0:
+            session.connection().exec_driver_sql('INSERT INTO habit_entry_summary (habit_id, month, completion_count, completed_days, last_completion) '
+                                                 'VALUES (?, ?, ?, ?, ?)', summaries)
+            summaries.clear()
+
+    with ctx.obj['session_maker']() as session:  # type: Session
+        try:
+            for record in parse_records(input_file=input_file, format_=format_.lower()):
+                if record['type'] == 'habit':
+                    habits.append({
+                        'id': int(record['id']),
+                        'name': record['name'],
+                        'periodicity': Periodicity.from_str(record['periodicity']),
+                        'streak': 0,
+                        'highest_streak': 0,
+                        'creation_date': datetime.fromisoformat(record['creation_date']),
+                    })
+                    habit_ids.add(habits[-1]['id'])
+                    habit_count += 1
+                elif record['type'] == 'entry':
+                    # Dates are stored in the same format the SQLAlchemy DateTime type uses
+                    entries.append((int(record['id']), int(record['habit_id']), datetime.fromisoformat(record['completion_date']).isoformat(sep=' ', timespec='microseconds')))
+                    habit_ids.add(entries[-1][1])
+                    entry_count += 1
+                elif record['type'] == 'summary':
+                    summaries.append((int(record['habit_id']), date.fromisoformat(record['month']).toordinal(), int(record['completion_count']),
+                                      int(record['completed_days']), datetime.fromisoformat(record['completion_date']).isoformat(sep=' ', timespec='microseconds')))
+                    habit_ids.add(summaries[-1][0])
+                    entry_count += summaries[-1][2]
+                else:
+                    raise ValueError(f'Unknown record type "{record["type"]}"!')
+
+                if len(habits) + len(entries) + len(summaries) >= chunk_size:
+                    flush()
+            flush()
+
+            rebuild_period_keys(session=session, habit_ids=habit_ids)
+            rebuild_streaks(session=session, habit_ids=habit_ids)
+            rebuild_aggregates(session=session, habit_ids=habit_ids)
+            session.commit()
+        except (KeyError, TypeError, ValueError, NotImplementedError) as error:
+            session.rollback()
+            colored_print(message=f'ERROR: Invalid import data! ({error!r})', color=TerminalColor.RED)
+            return
+        except IntegrityError as error:
+            session.rollback()
+            colored_print(message=f'ERROR: Import conflicts with existing data! ({error.orig})', color=TerminalColor.RED)
+            return
+
+    colored_print(message=f'Imported {habit_count} Habit(s) and {entry_count} completion(s)!', color=TerminalColor.GREEN)
+
+
+# region Helpers
+
+def read_records(session: 'Session', chunk_size: int) -> Iterator[Dict[str, Optional[str | int]]]:
+    """
+    Streams all Habits followed by all HabitEntries and HabitEntrySummaries as flat records. HabitEntries without a completion date are skipped.
+    Rows are fetched in chunks, so the dataset is never loaded into memory at once.
+
+    :param session: The SQLAlchemy session object.
+    :param chunk_size: Number of rows fetched per round-trip.
+
+    :returns Iterator[Dict[str, Optional[str | int]]]: Records containing the TRANSFER_FIELDS.
+    """
+    from sqlalchemy import select
+    from classes.orm.habit import Habit
+    from classes.orm.habit_entry import HabitEntry
+    from classes.orm.habit_entry_summary import HabitEntrySummary
+
+    habit_statement = (select(Habit.habit_id, Habit.name, Habit.periodicity, Habit.creation_date)
+                       .order_by(Habit.habit_id)
+                       .execution_options(yield_per=chunk_size))
+    for habit_id, name, periodicity, creation_date in session.execute(habit_statement):
+        yield {'type': 'habit', 'id': habit_id, 'name': name, 'periodicity': periodicity.name, 'creation_date': creation_date.isoformat(sep=' ')}
+
+    # The completion date is nullable, entries without one do not belong to any period and are not exported
+    entry_statement = (select(HabitEntry.habit_entry_id, HabitEntry.habit_id, HabitEntry.completion_date)
+                       .where(HabitEntry.completion_date.is_not(None))
+                       .order_by(HabitEntry.habit_entry_id)
+                       .execution_options(yield_per=chunk_size))
+    for habit_entry_id, habit_id, completion_date in session.execute(entry_statement):
+        yield {'type': 'entry', 'id': habit_entry_id, 'habit_id': habit_id, 'completion_date': completion_date.isoformat(sep=' ')}
+
+    summary_statement = (select(HabitEntrySummary.habit_id, HabitEntrySummary.month, HabitEntrySummary.completion_count,
+                                HabitEntrySummary.completed_days, HabitEntrySummary.last_completion)
+                         .order_by(HabitEntrySummary.habit_id, HabitEntrySummary.month)
+                         .execution_options(yield_per=chunk_size))
+    for habit_id, month, completion_count, completed_days, last_completion in session.execute(summary_statement):
+        yield {'type': 'summary', 'habit_id': habit_id, 'month': date.fromordinal(month).isoformat(), 'completion_count': completion_count,
+               'completed_days': completed_days, 'completion_date': last_completion.isoformat(sep=' ')}
+
+
+def write_records(records: Iterator[Dict], format_: str, output_file: TextIO) -> None:
+    """
+    Writes the given records to a file, one record per line.
+
+    :param records: Records containing the TRANSFER_FIELDS.
+    :param format_: Output Format. One of TRANSFER_FORMATS.
+    :param output_file: File the records should be written to.
+    """
+    if format_ == 'csv':
+        writer = csv.DictWriter(output_file, fieldnames=TRANSFER_FIELDS, lineterminator='\n')
+        writer.writeheader()
+        writer.writerows(records)
+    else:
+        for record in records:
+            output_file.write(json.dumps(record))
+            output_file.write('\n')
+
+
+def parse_records(input_file: TextIO, format_: str) -> Iterator[Dict[str, str]]:
+    """
+    Parses the records of the given file line by line.
+
+    :param input_file: File created by the export command.
+    :param format_: Input Format. One of TRANSFER_FORMATS.
+
+    :returns Iterator[Dict[str, str]]: Parsed records
+    :raises ValueError: Line could not be parsed
+    """
+    if format_ == 'csv':
+        yield from csv.DictReader(input_file)
+        return
+
+    for line in input_file:
+        if len(line.strip()) > 0:
+            yield json.loads(line)
+
+# endregion
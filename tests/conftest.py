@@ -0,0 +1,41 @@
+from contextlib import contextmanager
+from typing import Callable, ContextManager, Iterator, List
+
+import pytest
+from sqlalchemy import event, Engine
+
+
+@contextmanager
+def count_queries(expected: int) -> Iterator[List[str]]:
+    """
+    Asserts that the enclosed block issues exactly the given number of SQL statements, on any engine.
+    Every cursor execution counts once, an executemany with multiple parameter sets is a single round-trip.
+
+    :param expected: Number of statements the block has to issue.
+
+    :returns List[str]: Statements issued so far, complete once the block has ended
+    """
+    statements: List[str] = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany) -> None:
+        statements.append(' '.join(statement.split()))
+
+    event.listen(Engine, 'before_cursor_execute', before_cursor_execute)
+    try:
+        yield statements
+    finally:
+        event.remove(Engine, 'before_cursor_execute', before_cursor_execute)
+
+    issued = '\n'.join(f'  {index}. {statement}' for index, statement in enumerate(statements, start=1))
+    assert len(statements) == expected, f'Expected {expected} statement(s), but {len(statements)} were issued:\n{issued}'
+
+
+@pytest.fixture
+def assert_queries() -> Callable[[int], ContextManager[List[str]]]:
+    """
+    Returns a context manager asserting the exact number of SQL statements issued by the enclosed block.
+    Guards against additional round-trips and N+1 query patterns, e.g. lazy loads per listed Habit.
+
+    Usage: with assert_queries(2): ...
+    """
+    return count_queries
@@ -0,0 +1,94 @@
+from datetime import datetime, timedelta
+
+import pytest
+from click.testing import CliRunner
+from sqlalchemy import create_engine, update
+from sqlalchemy.orm import sessionmaker, Session
+
+from classes.orm.base import Base
+from classes.orm.habit import Habit
+from classes.orm.habit_entry import HabitEntry
+from classes.periodicity import Periodicity
+from helpers.aggregates import rebuild_aggregates, aggregate_mismatches_statement
+from modules.analytics import analytics
+
+
+@pytest.fixture
+def session() -> Session:
+    """
+    Returns a session bound to a new in-memory database.
+    """
+    engine = create_engine('sqlite:///:memory:')
+    Base.metadata.create_all(bind=engine)
+    with sessionmaker(bind=engine)() as session:
+        yield session
+
+
+def test_complete_updates_aggregates(session: Session) -> None:
+    """
+    Tests that completing Habits updates their completion aggregates.
+    """
+    daily_habit = Habit.create(session=session, habit_name='Daily', periodicity=Periodicity.Daily)
+    weekly_habit = Habit.create(session=session, habit_name='Weekly', periodicity=Periodicity.Weekly)
+    assert (daily_habit.total_completions, daily_habit.last_completion) == (0, None)
+
+    new_entry, _ = daily_habit.complete(session=session)
+    assert (daily_habit.total_completions, daily_habit.last_completion) == (1, new_entry.completion_date)
+
+    # Completing again within the same period changes nothing
+    assert daily_habit.complete(session=session) is None
+    assert daily_habit.total_completions == 1
+
+    results = Habit.complete_many(session=session, habits=[daily_habit, weekly_habit])
+    assert results[daily_habit.habit_id] is None
+    assert (weekly_habit.total_completions, weekly_habit.last_completion) == (1, results[weekly_habit.habit_id][0].completion_date)
+
+    assert session.execute(aggregate_mismatches_statement()).all() == []
+
+
+def test_rebuild_aggregates(session: Session) -> None:
+    """
+    Tests rebuilding the aggregates of all and of specific Habits.
+    """
+    last_completion = datetime(2024, 1, 3, 12)
+    target_habit = Habit.create(session=session, habit_name='Rebuild', periodicity=Periodicity.Daily)
+    other_habit = Habit.create(session=session, habit_name='Other', periodicity=Periodicity.Daily)
+    session.add_all([HabitEntry(habit_id=target_habit.habit_id, completion_date=last_completion - timedelta(days=day)) for day in range(3)])
+    session.commit()
+
+    mismatches = session.execute(aggregate_mismatches_statement()).all()
+    assert mismatches == [(target_habit.habit_id, 'Rebuild', 0, 3, None, last_completion)]
+
+    rebuild_aggregates(session=session, habit_ids=[other_habit.habit_id])
+    assert len(session.execute(aggregate_mismatches_statement()).all()) == 1
+
+    rebuild_aggregates(session=session)
+    session.commit()
+    assert session.execute(aggregate_mismatches_statement()).all() == []
+
+    session.refresh(target_habit)
+    assert (target_habit.total_completions, target_habit.last_completion) == (3, last_completion)
+
+
+def test_check_command(session: Session) -> None:
+    """
+    Tests the analytics check command.
+    """
+    target_habit = Habit.create(session=session, habit_name='Check', periodicity=Periodicity.Daily)
+    target_habit.complete(session=session)
+    session_maker = sessionmaker(bind=session.get_bind())
+
+    result = CliRunner().invoke(cli=analytics, args=['check'], obj={'session_maker': session_maker})
+    assert 'All completion aggregates are consistent!' in result.output
+
+    session.execute(update(Habit).values(total_completions=5))
+    session.commit()
+
+    result = CliRunner().invoke(cli=analytics, args=['check'], obj={'session_maker': session_maker})
+    assert 'Found 1 inconsistent Habit(s)!' in result.output
+
+    result = CliRunner().invoke(cli=analytics, args=['check', '--fix'], obj={'session_maker': session_maker})
+    assert 'Aggregates of 1 Habit(s) have been recomputed!' in result.output
+
+    result = CliRunner().invoke(cli=analytics, args=['check'], obj={'session_maker': session_maker})
+    assert 'All completion aggregates are consistent!' in result.output
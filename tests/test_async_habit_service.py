@@ -0,0 +1,187 @@
+import asyncio
+import time
+from pathlib import Path
+from typing import List
+
+import pytest
+from sqlalchemy import event, func, select
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.ext.asyncio import async_sessionmaker
+
+from classes.async_habit_service import AsyncHabitService, create_async_session_maker
+from classes.orm.habit import Habit
+from classes.orm.habit_entry import HabitEntry
+from classes.periodicity import Periodicity
+from helpers.database import retry_on_busy_async
+
+CONCURRENT_HABITS = 40
+CONCURRENT_SHARED_COMPLETIONS = 10
+
+
+async def create_session_maker(tmp_path: Path) -> async_sessionmaker:
+    """
+    Returns a factory for AsyncSessions bound to a new database in a temporary directory.
+    """
+    return await create_async_session_maker(url=f'sqlite+aiosqlite:///{tmp_path / "habits.sqlite"}', busy_backoff=0.01)
+
+
+async def heartbeat(lags: List[float], stop: asyncio.Event) -> None:
+    """
+    Records how late every wake-up of a 1 ms sleep happens. Long lags mean that the event loop was blocked.
+
+    :param lags: Receives the lag of every wake-up in seconds.
+    :param stop: Ends the heartbeat once set.
+    """
+    while not stop.is_set():
+        start = time.perf_counter()
+        await asyncio.sleep(0.001)
+        lags.append(time.perf_counter() - start - 0.001)
+
+
+def test_operations(tmp_path: Path) -> None:
+    """
+    Tests that the async operations behave like their synchronous counterparts and return fully loaded Habits.
+    """
+    async def run() -> None:
+        session_maker = await create_session_maker(tmp_path=tmp_path)
+        async with session_maker() as session:
+            service = AsyncHabitService(session=session)
+
+            new_habit = await service.create(habit_name='Async Habit', periodicity=Periodicity.Daily)
+            assert (new_habit.habit_id, new_habit.streak, new_habit.last_completion) == (1, 0, None)
+
+            new_entry, streak_broken = await service.complete(habit=new_habit)
+            assert new_entry.habit_id == new_habit.habit_id and not streak_broken
+            # Updated in SQL, reloaded by the service
+            assert (new_habit.streak, new_habit.highest_streak, new_habit.total_completions) == (1, 1, 1)
+            assert await service.complete(habit=new_habit) is None
+
+            assert await service.update(habit=new_habit, new_name='Renamed Habit') is True
+            assert (await service.get(habit_name='Renamed Habit')) is new_habit
+            assert [row.name for row in await service.list()] == ['Renamed Habit']
+            assert (await service.longest_streak(periodicity=Periodicity.Daily)) is new_habit
+            assert await service.longest_streak(periodicity=Periodicity.Weekly) is None
+            assert [streak[-1] for streak in await service.streaks()] == [1]
+
+            await service.delete(habit=new_habit)
+            assert await service.get_many(habit_ids=[1]) == []
+            assert await session.scalar(select(func.count()).select_from(HabitEntry)) == 0
+
+            await service.create(habit_name='Weekly Habit', periodicity=Periodicity.Weekly)
+            assert await service.delete_many(periodicity=Periodicity.Weekly) == 1
+
+        await session_maker.kw['bind'].dispose()
+
+    asyncio.run(run())
+
+
+def test_batch(tmp_path: Path) -> None:
+    """
+    Tests that a batch commits all operations at once and rolls all of them back on an exception.
+    """
+    async def run() -> None:
+        session_maker = await create_session_maker(tmp_path=tmp_path)
+        async with session_maker() as session:
+            service = AsyncHabitService(session=session)
+            commits = []
+            event.listen(session.sync_session, 'after_commit', lambda committed_session: commits.append(committed_session))
+
+            async with service.batch():
+                habits = [await service.create(habit_name=f'Batch Habit {index}', periodicity=Periodicity.Weekly) for index in range(20)]
+                await service.complete_many(habits=habits)
+            assert len(commits) == 1
+            assert all(target_habit.streak == 1 for target_habit in habits)
+
+            with pytest.raises(RuntimeError):
+                async with service.batch():
+                    await service.create(habit_name='Rolled Back Habit', periodicity=Periodicity.Daily)
+                    raise RuntimeError('Abort')
+
+            assert len(await service.list()) == 20
+
+        await session_maker.kw['bind'].dispose()
+
+    asyncio.run(run())
+
+
+def test_concurrent_completions(tmp_path: Path) -> None:
+    """
+    Tests many coroutines completing Habits at once, each with its own session.
+    Every Habit is completed exactly once, even if multiple coroutines complete the same Habit, and the event loop keeps running meanwhile.
+    """
+    async def complete(session_maker: async_sessionmaker, habit_name: str) -> bool:
+        async with session_maker() as session:
+            service = AsyncHabitService(session=session)
+            return await service.complete(habit=await service.get(habit_name=habit_name)) is not None
+
+    async def run() -> None:
+        session_maker = await create_session_maker(tmp_path=tmp_path)
+        async with session_maker() as session:
+            async with AsyncHabitService(session=session).batch() as service:
+                for index in range(CONCURRENT_HABITS):
+                    await service.create(habit_name=f'Concurrent Habit {index}', periodicity=Periodicity.Daily)
+                await service.create(habit_name='Shared Habit', periodicity=Periodicity.Daily)
+
+        lags: List[float] = []
+        stop = asyncio.Event()
+        heartbeat_task = asyncio.create_task(heartbeat(lags=lags, stop=stop))
+
+        habit_names = [f'Concurrent Habit {index}' for index in range(CONCURRENT_HABITS)] + ['Shared Habit'] * CONCURRENT_SHARED_COMPLETIONS
+        results = await asyncio.gather(*[complete(session_maker=session_maker, habit_name=habit_name) for habit_name in habit_names])
+
+        stop.set()
+        await heartbeat_task
+
+        assert all(results[:CONCURRENT_HABITS])
+        assert sum(results[CONCURRENT_HABITS:]) == 1
+
+        async with session_maker() as session:
+            assert await session.scalar(select(func.count()).select_from(HabitEntry)) == CONCURRENT_HABITS + 1
+            assert set(await session.scalars(select(Habit.streak))) == {1}
+
+        # The heartbeat kept running while the completions were in progress
+        assert len(lags) > 0
+        assert max(lags) < 0.5
+
+        await session_maker.kw['bind'].dispose()
+
+    asyncio.run(run())
+
+
+def test_retry_on_busy_async(tmp_path: Path) -> None:
+    """
+    Tests that locked write operations are retried and that the backoff does not block the event loop.
+    """
+    async def run() -> None:
+        session_maker = await create_session_maker(tmp_path=tmp_path)
+        attempts = []
+
+        def operation(session) -> str:
+            # Retries are left to retry_on_busy_async
+            assert session.info['busy_retries'] == 0
+            attempts.append(session)
+            if len(attempts) < 3:
+                raise OperationalError(statement='BEGIN IMMEDIATE', params=None, orig=Exception('database is locked'))
+            return 'done'
+
+        lags: List[float] = []
+        stop = asyncio.Event()
+        heartbeat_task = asyncio.create_task(heartbeat(lags=lags, stop=stop))
+
+        async with session_maker() as session:
+            assert await retry_on_busy_async(session=session, operation=operation) == 'done'
+            assert session.sync_session.info['busy_retries'] == 5
+
+            attempts.clear()
+            session.sync_session.info['busy_retries'] = 1
+            with pytest.raises(OperationalError):
+                await retry_on_busy_async(session=session, operation=operation)
+            assert len(attempts) == 2
+
+        stop.set()
+        await heartbeat_task
+        assert len(lags) > 0
+
+        await session_maker.kw['bind'].dispose()
+
+    asyncio.run(run())
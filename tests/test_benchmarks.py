@@ -0,0 +1,71 @@
+from datetime import date
+
+import pytest
+from sqlalchemy import create_engine, select
+from sqlalchemy.orm import sessionmaker, Session
+
+from benchmarks.dataset import DatasetSize, generate_dataset
+from benchmarks.suite import parse_sizes, compare_results
+from classes.orm.base import Base
+from classes.orm.habit import Habit
+from classes.orm.habit_entry import HabitEntry
+from helpers.aggregates import aggregate_mismatches_statement
+from helpers.streaks import rebuild_streaks
+
+END_DATE = date(2024, 6, 30)
+
+
+def create_session() -> Session:
+    """
+    Returns a session bound to a new in-memory database.
+    """
+    engine = create_engine('sqlite:///:memory:')
+    Base.metadata.create_all(bind=engine)
+    return sessionmaker(bind=engine)()
+
+
+def test_generate_dataset() -> None:
+    """
+    Tests that the generated data is deterministic and its streaks and aggregates match the generated history.
+    """
+    histories = []
+    for _ in range(2):
+        with create_session() as session:
+            habit_count, entry_count = generate_dataset(session=session, size=DatasetSize(habits=50, days=120), seed=7, end_date=END_DATE)
+            assert habit_count == 50
+            assert session.scalar(select(HabitEntry.completion_date).order_by(HabitEntry.completion_date.desc()).limit(1)).date() <= END_DATE
+            assert session.execute(aggregate_mismatches_statement()).all() == []
+
+            histories.append(session.execute(select(HabitEntry.habit_id, HabitEntry.completion_date, HabitEntry.period_key).order_by(HabitEntry.habit_entry_id)).all())
+            assert len(histories[-1]) == entry_count
+
+            # Gaps break streaks, so not every Habit can still be on its longest streak
+            streaks = session.execute(select(Habit.habit_id, Habit.streak, Habit.highest_streak).order_by(Habit.habit_id)).all()
+            assert any(streak < highest_streak for _, streak, highest_streak in streaks)
+
+            rebuild_streaks(session=session)
+            assert session.execute(select(Habit.habit_id, Habit.streak, Habit.highest_streak).order_by(Habit.habit_id)).all() == streaks
+
+    assert histories[0] == histories[1]
+
+
+def test_parse_sizes() -> None:
+    """
+    Tests parsing the dataset sizes of the suite.
+    """
+    assert parse_sizes(value='100x90, 1000x365') == [DatasetSize(habits=100, days=90), DatasetSize(habits=1000, days=365)]
+
+    for value in ['100', '100x', 'x90', '0x90', '100x-1']:
+        with pytest.raises(ValueError):
+            parse_sizes(value=value)
+
+
+def test_compare_results() -> None:
+    """
+    Tests that the comparison flags cases that got slower than the threshold allows.
+    """
+    baseline = {'100x90': {'stable': {'median_ms': 10.0}, 'slower': {'median_ms': 10.0}, 'faster': {'median_ms': 10.0}, 'removed': {'median_ms': 1.0}}}
+    current = {'100x90': {'stable': {'median_ms': 11.9}, 'slower': {'median_ms': 12.1}, 'faster': {'median_ms': 7.9}, 'added': {'median_ms': 1.0}}}
+
+    verdicts = {name: verdict for _, name, _, _, verdict in compare_results(baseline=baseline, current=current, threshold=0.2)}
+    assert verdicts == {'stable': 'ok', 'slower': 'REGRESSION', 'faster': 'faster', 'removed': 'missing', 'added': 'new'}
@@ -0,0 +1,62 @@
+import json
+from datetime import datetime
+from unittest.mock import patch
+
+import pytest
+
+from classes.periodicity import Periodicity
+from helpers.cli_helper import list_habits
+
+ROWS = [
+    (1, 'Test Habit 1', 2, 3, Periodicity.Daily, 5, datetime(2025, 1, 1, 12)),
+    (2, 'Test Habit 2', 0, 0, Periodicity.Weekly, 0, None),
+]
+EXTRA_HEADERS = ['Total Completions', 'Most Recent Completion']
+
+
+@pytest.mark.parametrize('format_', ['json', 'jsonl'])
+def test_list_json(capsys: pytest.CaptureFixture, format_: str) -> None:
+    """
+    Tests that Habits are written as JSON array / JSON lines with snake case keys.
+    """
+    list_habits(habits=iter(ROWS), extra_headers=EXTRA_HEADERS, format_=format_)
+    output = capsys.readouterr().out
+
+    records = json.loads(output) if format_ == 'json' else [json.loads(line) for line in output.splitlines()]
+    assert records == [
+        {'id': 1, 'name': 'Test Habit 1', 'current_streak': 2, 'longest_streak': 3, 'periodicity': 'Daily', 'total_completions': 5, 'most_recent_completion': '2025-01-01 12:00:00'},
+        {'id': 2, 'name': 'Test Habit 2', 'current_streak': 0, 'longest_streak': 0, 'periodicity': 'Weekly', 'total_completions': 0, 'most_recent_completion': None},
+    ]
+
+
+def test_list_csv(capsys: pytest.CaptureFixture) -> None:
+    """
+    Tests that Habits are written as CSV with a header line.
+    """
+    list_habits(habits=iter(ROWS[:1]), format_='csv')
+
+    assert capsys.readouterr().out.splitlines() == ['id,name,current_streak,longest_streak,periodicity', '1,Test Habit 1,2,3,Daily']
+
+
+def test_list_table_chunks(capsys: pytest.CaptureFixture) -> None:
+    """
+    Tests that tables are rendered in chunks, each repeating the headers.
+    """
+    with patch('helpers.cli_helper.LIST_CHUNK_SIZE', 1):
+        list_habits(habits=iter(ROWS), format_='table')
+
+    output = capsys.readouterr().out
+    assert output.count('Current Streak') == 2
+    assert 'Test Habit 1' in output and 'Test Habit 2' in output
+
+
+@pytest.mark.parametrize('format_, expected', [('table', 'No Habits found.'), ('json', '[\n]'), ('jsonl', ''), ('csv', 'id,name,current_streak,longest_streak,periodicity')])
+def test_list_empty(capsys: pytest.CaptureFixture, format_: str, expected: str) -> None:
+    """
+    Tests that listing no Habits does not fail.
+    """
+    list_habits(habits=iter([]), format_=format_)
+    output = capsys.readouterr().out
+
+    assert expected in output
+    assert len(output) > 0 or format_ == 'jsonl'
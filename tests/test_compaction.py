@@ -0,0 +1,213 @@
+import random
+from datetime import datetime, date, timedelta
+from pathlib import Path
+from typing import Dict, Tuple, List
+
+import pytest
+from click.testing import CliRunner
+from sqlalchemy import select, func
+from sqlalchemy.orm import sessionmaker, Session
+
+from classes.habit_timeline import HabitTimeline
+from classes.orm.base import Base
+from classes.orm.habit import Habit
+from classes.orm.habit_entry import HabitEntry
+from classes.orm.habit_entry_summary import HabitEntrySummary
+from classes.periodicity import Periodicity
+from helpers.aggregates import rebuild_aggregates, aggregate_mismatches_statement
+from helpers.compaction import compaction_boundary, compact_history, load_summary_days, MIN_COMPACTION_AGE, COMPACTION_BATCH_SIZE, ORPHAN_BATCH_SIZE
+from helpers.completion_matrix import load_completion_matrix, completion_statistics, rate_window_start
+from helpers.database import create_database_engine
+from helpers.streaks import rebuild_streaks, streak_runs_statement
+from modules import compaction
+from modules.transfer import export, import_
+
+BEFORE = date(2025, 1, 1)
+
+
+@pytest.fixture
+def session_maker(tmp_path: Path) -> sessionmaker:
+    """
+    Returns a sessionmaker bound to a new database file with a random completion history in 2024 and today.
+    Habit 1 was completed twice on 2024-03-10, Habit 3 only has completions before 2025.
+    """
+    engine = create_database_engine(url=f'sqlite:///{tmp_path / "habits.sqlite"}')
+    Base.metadata.create_all(bind=engine)
+    session_maker = sessionmaker(bind=engine)
+
+    rng = random.Random(7)
+    with session_maker() as session:
+        for index, periodicity in enumerate([Periodicity.Daily, Periodicity.Weekly, Periodicity.Daily, Periodicity.Weekly]):
+            habit = Habit.create(session=session, habit_name=f'Habit {index + 1}', periodicity=periodicity)
+            habit.creation_date = datetime(2023, 12, 1, 8)
+            completions = [datetime(2024, 1, 1, 9) + timedelta(days=day, minutes=rng.randrange(600)) for day in range(366) if rng.random() < 0.6]
+            if index != 2:
+                completions.append(datetime.now())
+            session.add_all([HabitEntry(habit_id=habit.habit_id, completion_date=completion) for completion in completions])
+        session.add(HabitEntry(habit_id=1, completion_date=datetime(2024, 3, 10, 23)))
+        session.commit()
+
+        rebuild_streaks(session=session)
+        rebuild_aggregates(session=session)
+        session.commit()
+
+    return session_maker
+
+
+def snapshot(session: Session) -> Dict[str, object]:
+    """
+    Collects the results of all readers of the completion history.
+
+    :param session: The SQLAlchemy session object.
+
+    :returns Dict[str, object]: Result per reader
+    """
+    habits, counts = load_completion_matrix(session=session, since=date(2023, 12, 1), until=date.today())
+    since = rate_window_start(until=date(2024, 12, 31), last=40)
+    rate_habits, rate_counts = load_completion_matrix(session=session, since=since, until=date(2024, 12, 31))
+    timelines = HabitTimeline.load(session=session)
+
+    return {
+        'streaks': session.execute(select(Habit.habit_id, Habit.streak, Habit.highest_streak, Habit.total_completions, Habit.last_completion)).all(),
+        'runs': session.execute(streak_runs_statement()).all(),
+        'filtered_runs': session.execute(streak_runs_statement(since=date(2024, 2, 15), until=date(2024, 11, 20), periodicity=Periodicity.Daily)).all(),
+        'matrix': (habits, counts.tolist()),
+        'statistics': [values.tolist() for values in completion_statistics(habits=rate_habits, counts=rate_counts, since=since, last=40)],
+        'timelines': {habit_id: timeline.periods.tolist() for habit_id, timeline in timelines.items()},
+    }
+
+
+def rebuilt(session: Session) -> Tuple[List, List]:
+    """
+    Rebuilds the streaks and aggregates of all Habits from their history and returns them along with all aggregate mismatches.
+
+    :param session: The SQLAlchemy session object.
+
+    :returns List: ID, streak, highest streak, total and last completion per Habit
+    :returns List: Aggregate mismatches
+    """
+    rebuild_streaks(session=session)
+    rebuild_aggregates(session=session)
+    session.commit()
+    return (session.execute(select(Habit.habit_id, Habit.streak, Habit.highest_streak, Habit.total_completions, Habit.last_completion)).all(),
+            session.execute(aggregate_mismatches_statement()).all())
+
+
+def test_compaction_boundary() -> None:
+    """
+    Tests that only whole months are compacted.
+    """
+    assert compaction_boundary(today=date(2025, 3, 15), older_than=31) == date(2025, 2, 1)
+    assert compaction_boundary(today=date(2025, 3, 15), older_than=365) == date(2024, 3, 1)
+
+
+def test_compact_history(session_maker: sessionmaker) -> None:
+    """
+    Tests that streaks, analytics and aggregates are identical before and after compacting, also when rebuilt from the history.
+    """
+    with session_maker() as session:
+        entry_count = session.scalar(select(func.count()).select_from(HabitEntry))
+        expected = snapshot(session=session)
+        expected_rebuilt = rebuilt(session=session)
+
+        compacted, summarized = compact_history(session=session, before=BEFORE, batch_size=3)
+        # Every Habit has 12 months of history, the month with two completions on the same day is kept
+        assert summarized == 4 * 12 - 1
+        assert session.scalar(select(func.count()).select_from(HabitEntry)) == entry_count - compacted
+        assert session.scalar(select(func.count()).select_from(HabitEntry).where(HabitEntry.completion_date < datetime(2024, 3, 1))) == 0
+        assert session.scalar(select(func.count()).select_from(HabitEntry).where(HabitEntry.habit_id == 1, HabitEntry.completion_date < datetime(2024, 4, 1))) > 0
+
+        assert snapshot(session=session) == expected
+        assert rebuilt(session=session) == expected_rebuilt
+        assert expected_rebuilt[1] == []
+
+        # Compacting again does not find anything, Habits whose completions were all compacted can still be completed
+        assert compact_history(session=session, before=BEFORE) == (0, 0)
+        assert session.get(Habit, 3).complete(session=session) is not None
+
+
+def test_load_summary_days(session_maker: sessionmaker) -> None:
+    """
+    Tests that summaries are expanded to their completed days and filtered by range and that only whole months are compacted.
+    """
+    with session_maker() as session:
+        session.add(HabitEntrySummary(habit_id=3, month=date(2023, 1, 1).toordinal(), completion_count=3, completed_days=0b1000000000000000000000000000101,
+                                      last_completion=datetime(2023, 1, 31, 8)))
+        session.commit()
+
+        days = load_summary_days(session=session, habit_ids=[3])[3]
+        assert [date.fromordinal(day) for day in days] == [date(2023, 1, 1), date(2023, 1, 3), date(2023, 1, 31)]
+        days = load_summary_days(session=session, since=date(2023, 1, 2), until=date(2023, 1, 30))[3]
+        assert [date.fromordinal(day) for day in days] == [date(2023, 1, 3)]
+        assert load_summary_days(session=session, until=date(2022, 12, 31)) == {}
+
+        with pytest.raises(ValueError):
+            compact_history(session=session, before=date(2025, 1, 2))
+
+
+def test_transfer_summaries(session_maker: sessionmaker, tmp_path: Path) -> None:
+    """
+    Tests that summaries are exported and imported along with the remaining completions.
+    """
+    with session_maker() as session:
+        compact_history(session=session, before=BEFORE)
+        expected = snapshot(session=session)
+        total_completions = session.scalar(select(func.sum(Habit.total_completions)))
+
+    runner = CliRunner()
+    exported = runner.invoke(cli=export, args=['-f', 'csv'], obj={'session_maker': session_maker})
+
+    engine = create_database_engine(url=f'sqlite:///{tmp_path / "target.sqlite"}')
+    Base.metadata.create_all(bind=engine)
+    target_session_maker = sessionmaker(bind=engine)
+    result = runner.invoke(cli=import_, args=['-f', 'csv'], obj={'session_maker': target_session_maker}, input=exported.output)
+    assert f'Imported 4 Habit(s) and {total_completions} completion(s)!' in result.output
+
+    with target_session_maker() as session:
+        assert snapshot(session=session) == expected
+
+
+def test_compact_command(session_maker: sessionmaker) -> None:
+    """
+    Tests the compact command, including the vacuum of the database file.
+    """
+    assert (compaction.MIN_COMPACTION_AGE, compaction.COMPACTION_BATCH_SIZE, compaction.ORPHAN_BATCH_SIZE) == (MIN_COMPACTION_AGE, COMPACTION_BATCH_SIZE, ORPHAN_BATCH_SIZE)
+
+    runner = CliRunner()
+    result = runner.invoke(cli=compaction.compact, args=['--older-than', '10'], obj={'session_maker': session_maker})
+    assert result.exit_code != 0
+
+    older_than = (date.today() - BEFORE).days
+    result = runner.invoke(cli=compaction.compact, args=['--older-than', str(older_than)], obj={'session_maker': session_maker})
+    assert 'into 47 monthly summaries!' in result.output
+
+    result = runner.invoke(cli=compaction.compact, args=['--older-than', str(older_than), '--no-vacuum'], obj={'session_maker': session_maker})
+    assert f'No completions before {BEFORE} could be compacted.' in result.output
+
+
+def test_gc_command(session_maker: sessionmaker) -> None:
+    """
+    Tests that the gc command deletes the entries and summaries of Habits deleted without foreign keys in batches.
+    """
+    with session_maker() as session:
+        compact_history(session=session, before=BEFORE)
+        # Deleting without foreign keys skips the ON DELETE CASCADE
+        session.connection().exec_driver_sql('PRAGMA foreign_keys = OFF')
+        session.connection().exec_driver_sql('DELETE FROM habit WHERE id IN (2, 3)')
+        session.commit()
+        session.connection().exec_driver_sql('PRAGMA foreign_keys = ON')
+
+        orphaned = select(func.count()).select_from(HabitEntry).where(HabitEntry.habit_id.in_([2, 3]))
+        orphan_count = session.scalar(orphaned)
+        assert orphan_count > 0
+
+    runner = CliRunner()
+    result = runner.invoke(cli=compaction.gc, args=['--batch-size', '3'], obj={'session_maker': session_maker})
+    assert f'Deleted {orphan_count} orphaned completion(s) and 24 summaries of 2 deleted Habit(s)!' in result.output
+
+    with session_maker() as session:
+        assert session.scalar(orphaned) == 0
+        assert session.scalars(select(HabitEntrySummary.habit_id).distinct().order_by(HabitEntrySummary.habit_id)).all() == [1, 4]
+
+    result = runner.invoke(cli=compaction.gc, obj={'session_maker': session_maker})
+    assert 'No orphaned completions found!' in result.output
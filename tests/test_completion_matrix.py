@@ -0,0 +1,144 @@
+import json
+from datetime import datetime, date, timedelta
+from typing import List
+
+import numpy as np
+import pytest
+from click.testing import CliRunner
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker, Session
+
+from classes.orm.base import Base
+from classes.orm.habit import Habit
+from classes.orm.habit_entry import HabitEntry
+from classes.periodicity import Periodicity
+from helpers.completion_matrix import load_completion_matrix, fold_periods, completion_statistics, rate_window_start
+from modules.analytics import analytics
+
+UNTIL = date(2025, 1, 15)
+
+
+@pytest.fixture
+def session() -> Session:
+    """
+    Returns a session bound to a new in-memory database with a daily and a weekly Habit.
+    """
+    engine = create_engine('sqlite:///:memory:')
+    Base.metadata.create_all(bind=engine)
+    with sessionmaker(bind=engine)() as session:
+        # Daily: created 2025-01-06, completed on 6 of the last 10 days, twice on 2025-01-14
+        create_history(session=session, name='Daily', periodicity=Periodicity.Daily, creation_date=datetime(2025, 1, 6, 8),
+                       completions=[datetime(2025, 1, day, 12) for day in [6, 7, 8, 11, 14, 14, 15]])
+        # Weekly: created in December, completed in 3 of the last 6 weeks (Monday 2024-12-09 to Sunday 2025-01-19)
+        create_history(session=session, name='Weekly', periodicity=Periodicity.Weekly, creation_date=datetime(2024, 11, 1, 8),
+                       completions=[datetime(2024, 12, 1, 9), datetime(2024, 12, 10, 9), datetime(2024, 12, 11, 9), datetime(2025, 1, 4, 9), datetime(2025, 1, 13, 9)])
+        yield session
+
+
+def create_history(session: Session, name: str, periodicity: Periodicity, creation_date: datetime, completions: List[datetime]) -> None:
+    """
+    Creates a Habit with the given creation date and completion history.
+
+    :param session: The SQLAlchemy session object.
+    :param name: The Name of the Habit.
+    :param periodicity: The Periodicity of the Habit.
+    :param creation_date: The Creation Date of the Habit.
+    :param completions: Completion dates of the Habit.
+    """
+    new_habit = Habit.create(session=session, habit_name=name, periodicity=periodicity)
+    new_habit.creation_date = creation_date
+    session.add_all([HabitEntry(habit_id=new_habit.habit_id, completion_date=completion) for completion in completions])
+    session.commit()
+
+
+def test_load_completion_matrix(session: Session) -> None:
+    """
+    Tests that completions are counted per Habit and day within the range and that filters are applied.
+    """
+    habits, counts = load_completion_matrix(session=session, since=date(2025, 1, 11), until=UNTIL)
+    assert [habit.name for habit in habits] == ['Daily', 'Weekly']
+    assert counts.tolist() == [[1, 0, 0, 2, 1], [0, 0, 1, 0, 0]]
+
+    habits, counts = load_completion_matrix(session=session, since=date(2025, 1, 11), until=UNTIL, periodicity=Periodicity.Weekly)
+    assert [habit.name for habit in habits] == ['Weekly'] and counts.shape == (1, 5)
+
+    habits, counts = load_completion_matrix(session=session, since=date(2025, 1, 11), until=UNTIL, habit_name='Unknown')
+    assert habits == [] and counts.shape == (0, 5)
+
+
+def test_fold_periods() -> None:
+    """
+    Tests that days are summed up per ISO week, including incomplete weeks at both ends.
+    """
+    counts = np.array([[1, 0, 1, 1, 0, 0, 0, 0, 0, 2]])
+    # 2025-01-04 is a Saturday
+    weekly, first_period = fold_periods(counts=counts, since=date(2025, 1, 4), periodicity=Periodicity.Weekly)
+    assert weekly.tolist() == [[1, 2, 2]]
+    assert Periodicity.Weekly.period_start(period_index=first_period) == date(2024, 12, 30)
+
+    assert fold_periods(counts=counts, since=date(2025, 1, 4), periodicity=Periodicity.Daily)[0] is counts
+
+
+def test_completion_statistics(session: Session) -> None:
+    """
+    Tests rates over the last periods of each Habit, only counting periods since its creation, and the weekday distribution.
+    """
+    since = rate_window_start(until=UNTIL, last=6)
+    assert since == date(2024, 12, 9)
+
+    habits, counts = load_completion_matrix(session=session, since=since, until=UNTIL)
+    completed, periods, weekdays = completion_statistics(habits=habits, counts=counts, since=since, last=6)
+
+    # Daily: 2025-01-10 to 2025-01-15, created before. Weekly: all 6 weeks, the completion on 2024-12-01 is outside.
+    assert completed.tolist() == [3, 3]
+    assert periods.tolist() == [6, 6]
+    assert weekdays.tolist() == [[0, 2, 1, 0, 0, 1, 0], [1, 1, 1, 0, 0, 1, 0]]
+
+    since = rate_window_start(until=UNTIL, last=14)
+    habits, counts = load_completion_matrix(session=session, since=since, until=UNTIL)
+    completed, periods, _ = completion_statistics(habits=habits, counts=counts, since=since, last=14)
+    # Daily: created on 2025-01-06, i.e. 10 periods. Weekly: created in the week of 2024-10-28, i.e. 12 of the 14 weeks.
+    assert completed.tolist() == [6, 4]
+    assert periods.tolist() == [10, 12]
+
+
+def test_rate_command(session: Session) -> None:
+    """
+    Tests the analytics rate command in table and JSON format.
+    """
+    session_maker = sessionmaker(bind=session.get_bind())
+
+    result = CliRunner().invoke(cli=analytics, args=['rate', '--last', '6', '--until', '2025-01-15', '--sort', 'rate', '--format', 'json'], obj={'session_maker': session_maker})
+    records = json.loads(result.output)
+    assert [(record['name'], record['completed'], record['periods'], record['rate'], record['tue']) for record in records] == [
+        ('Daily', 3, 6, 0.5, 2), ('Weekly', 3, 6, 0.5, 1)]
+
+    result = CliRunner().invoke(cli=analytics, args=['rate', '-l', '14', '--until', '2025-01-15', '-s', 'Rate'], obj={'session_maker': session_maker})
+    assert result.exit_code == 0
+    assert [line.split()[1] for line in result.output.splitlines()[2:]] == ['Daily', 'Weekly']
+    assert '60.0%' in result.output and '33.3%' in result.output
+
+    result = CliRunner().invoke(cli=analytics, args=['rate', '-n', 'Unknown'], obj={'session_maker': session_maker})
+    assert 'No Matching Habit found.' in result.output
+
+
+def test_heatmap_command(session: Session) -> None:
+    """
+    Tests the analytics heatmap command in table and JSON format.
+    """
+    session_maker = sessionmaker(bind=session.get_bind())
+
+    result = CliRunner().invoke(cli=analytics, args=['heatmap', '--days', '7', '--until', '2025-01-15'], obj={'session_maker': session_maker})
+    assert result.exit_code == 0
+    lines = result.output.splitlines()
+    assert lines[0] == '2025-01-09 - 2025-01-15'
+    assert lines[1].split()[-1] == 'TFSSMTW'
+    assert lines[3].split()[-1] == '··■··■■'
+    assert lines[4].split()[-1] == '····■··'
+
+    result = CliRunner().invoke(cli=analytics, args=['heatmap', '-d', '3', '--until', '2025-01-15', '-i', '1', '--format', 'jsonl'], obj={'session_maker': session_maker})
+    assert json.loads(result.output) == {'id': 1, 'name': 'Daily', 'periodicity': 'Daily', 'since': '2025-01-13', 'until': '2025-01-15', 'completions': [0, 2, 1]}
+
+    result = CliRunner().invoke(cli=analytics, args=['heatmap', '-p', 'weekly', '-d', '3', '--until', str(UNTIL + timedelta(days=30)), '--format', 'json'],
+                                obj={'session_maker': session_maker})
+    assert [record['completions'] for record in json.loads(result.output)] == [[0, 0, 0]]
@@ -0,0 +1,73 @@
+import multiprocessing
+import random
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import List
+
+from sqlalchemy import select, func
+from sqlalchemy.orm import sessionmaker
+
+from classes.helpers.lazy_session_maker import LazySessionMaker
+from classes.orm.habit import Habit
+from classes.orm.habit_entry import HabitEntry
+from classes.periodicity import Periodicity
+
+HABIT_COUNT = 250
+PROCESS_COUNT = 8
+
+
+def complete_habits(url: str, habit_ids: List[int], seed: int) -> int:
+    """
+    Completes all given Habits one by one in random order, as separate invocations of "habit complete" would.
+
+    :param url: SQLAlchemy URL of the database.
+    :param habit_ids: IDs of the Habits to complete.
+    :param seed: Seed for the order of the completions.
+
+    :returns int: Number of successful completions
+    """
+    session_maker = LazySessionMaker(url=url, profile='durable', busy_retries=20, busy_backoff=0.01)
+    habit_ids = list(habit_ids)
+    random.Random(seed).shuffle(habit_ids)
+
+    completed = 0
+    for habit_id in habit_ids:
+        with session_maker() as session:
+            target_habit = Habit.get(session=session, habit_id=habit_id)
+            if target_habit.complete(session=session) is not None:
+                completed += 1
+
+    return completed
+
+
+def test_concurrent_completions(tmp_path: Path) -> None:
+    """
+    Tests that completing the same Habits from multiple processes at once completes every Habit exactly once
+    and keeps streaks and aggregates consistent with the entries.
+    """
+    url = f'sqlite:///{tmp_path / "habits.sqlite"}'
+    session_maker: sessionmaker = LazySessionMaker(url=url, profile='durable').session_maker
+
+    # Every Habit has been completed yesterday, so a correct completion continues the streak to 2
+    yesterday = datetime.now() - timedelta(days=1)
+    with session_maker() as session:
+        habits = [Habit(name=f'Habit {index}', periodicity=Periodicity.Daily) for index in range(HABIT_COUNT)]
+        session.add_all(habits)
+        session.flush()
+        for target_habit in habits:
+            session.add(HabitEntry(habit_id=target_habit.habit_id, completion_date=yesterday, period_key=Periodicity.Daily.period_index(value=yesterday.date())))
+            target_habit.streak = target_habit.highest_streak = target_habit.total_completions = 1
+            target_habit.last_completion = yesterday
+        session.commit()
+        habit_ids = [target_habit.habit_id for target_habit in habits]
+
+    # Spawned processes do not inherit any connections of this one
+    with multiprocessing.get_context('spawn').Pool(processes=PROCESS_COUNT) as pool:
+        completed = pool.starmap(complete_habits, [(url, habit_ids, seed) for seed in range(PROCESS_COUNT)])
+
+    assert sum(completed) == HABIT_COUNT
+
+    with session_maker() as session:
+        assert session.scalar(select(func.count()).select_from(HabitEntry)) == 2 * HABIT_COUNT
+        counters = session.execute(select(Habit.streak, Habit.highest_streak, Habit.total_completions, func.count()).group_by(Habit.streak, Habit.highest_streak, Habit.total_completions)).all()
+        assert counters == [(2, 2, 2, HABIT_COUNT)]
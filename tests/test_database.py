@@ -0,0 +1,131 @@
+import sqlite3
+from pathlib import Path
+
+import pytest
+from sqlalchemy import Engine
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import Session
+
+from classes.orm.habit import Habit
+from classes.orm.habit_entry import HabitEntry
+from classes.orm.migrations import migrate
+from classes.periodicity import Periodicity
+from helpers.database import create_database_engine, load_database_config, begin_immediate, retry_on_busy, PRAGMA_PROFILES, ENV_DATABASE_PROFILE, ENV_DATABASE_PATH, ENV_BUSY_RETRIES, ENV_BUSY_BACKOFF
+
+
+def get_pragma(engine: Engine, name: str) -> str | int:
+    """
+    Returns the current value of the given pragma on a new connection.
+
+    :param engine: Engine to be checked.
+    :param name: Name of the pragma.
+    """
+    with engine.connect() as connection:
+        return connection.exec_driver_sql(f'PRAGMA {name}').scalar()
+
+
+# region Profiles
+
+
+@pytest.mark.parametrize('profile', PRAGMA_PROFILES.keys())
+def test_profile_pragmas(tmp_path: Path, profile: str) -> None:
+    """
+    Tests that every profile enables foreign keys and applies its busy timeout.
+    """
+    engine = create_database_engine(url=f'sqlite:///{tmp_path / "habits.sqlite"}', profile=profile)
+
+    assert get_pragma(engine=engine, name='foreign_keys') == 1
+    assert get_pragma(engine=engine, name='busy_timeout') == PRAGMA_PROFILES[profile]['busy_timeout']
+
+
+def test_fast_profile(tmp_path: Path) -> None:
+    """
+    Tests that the fast profile switches the database to WAL mode with reduced synchronization.
+    """
+    engine = create_database_engine(url=f'sqlite:///{tmp_path / "habits.sqlite"}', profile='fast')
+
+    assert get_pragma(engine=engine, name='journal_mode') == 'wal'
+    assert get_pragma(engine=engine, name='synchronous') == 1  # NORMAL
+
+
+def test_unknown_profile() -> None:
+    """
+    Tests that unknown profiles are rejected.
+    """
+    with pytest.raises(ValueError):
+        create_database_engine(url='sqlite:///:memory:', profile='unknown')
+
+
+def test_delete_cascade(tmp_path: Path) -> None:
+    """
+    Tests that deleting a Habit also deletes its entries, which requires foreign keys to be enabled.
+    """
+    engine = create_database_engine(url=f'sqlite:///{tmp_path / "habits.sqlite"}')
+    migrate(engine=engine)
+
+    with Session(bind=engine) as session:
+        new_habit = Habit.create(session=session, habit_name='Test Habit', periodicity=Periodicity.Daily)
+        new_habit.complete(session=session)
+        new_habit.delete(session=session)
+
+        assert session.query(HabitEntry).count() == 0
+
+
+def test_retry_on_busy(tmp_path: Path) -> None:
+    """
+    Tests that write transactions are retried while another connection holds the write lock.
+    """
+    engine = create_database_engine(url=f'sqlite:///{tmp_path / "habits.sqlite"}')
+    migrate(engine=engine)
+    attempts = []
+
+    with Session(bind=engine, info={'busy_retries': 2, 'busy_backoff': 0}) as session, engine.connect() as blocking_connection:
+        def operation() -> int:
+            attempts.append(len(attempts))
+            # Simulates another process that only releases its lock after the first attempt failed
+            if len(attempts) == 1:
+                raise OperationalError(statement='BEGIN IMMEDIATE', params=None, orig=sqlite3.OperationalError('database is locked'))
+            begin_immediate(session=session)
+            return len(attempts)
+
+        assert retry_on_busy(session=session, operation=operation) == 2
+        session.rollback()
+
+        # Errors are raised once all retries have been used up, busy_timeout is lowered to avoid waiting for the lock
+        session.connection().exec_driver_sql('PRAGMA busy_timeout = 0')
+        blocking_connection.exec_driver_sql('BEGIN IMMEDIATE')
+        with pytest.raises(OperationalError, match='database is locked'):
+            retry_on_busy(session=session, operation=lambda: begin_immediate(session=session))
+        blocking_connection.rollback()
+
+
+# endregion
+
+# region Config
+
+
+def test_config_defaults(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    """
+    Tests the configuration if neither a config file nor environment variables exist.
+    """
+    for variable in (ENV_DATABASE_PROFILE, ENV_DATABASE_PATH, ENV_BUSY_RETRIES, ENV_BUSY_BACKOFF):
+        monkeypatch.delenv(variable, raising=False)
+
+    assert load_database_config(config_path=str(tmp_path / 'tracker.ini')) == {'path': 'habits.sqlite', 'profile': 'durable', 'busy_retries': 5, 'busy_backoff': 0.05}
+
+
+def test_config_file_and_environment(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    """
+    Tests that the config file is read and environment variables take precedence over it.
+    """
+    config_path = tmp_path / 'tracker.ini'
+    config_path.write_text('[database]\npath = other.sqlite\nprofile = fast\nbusy_retries = 2\n')
+    monkeypatch.delenv(ENV_DATABASE_PATH, raising=False)
+    monkeypatch.delenv(ENV_BUSY_RETRIES, raising=False)
+    monkeypatch.setenv(ENV_DATABASE_PROFILE, 'readonly-analytics')
+    monkeypatch.setenv(ENV_BUSY_BACKOFF, '0.5')
+
+    assert load_database_config(config_path=str(config_path)) == {'path': 'other.sqlite', 'profile': 'readonly-analytics', 'busy_retries': 2, 'busy_backoff': 0.5}
+
+
+# endregion
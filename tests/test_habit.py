@@ -1,9 +1,15 @@
 from datetime import datetime
+from typing import Callable, ContextManager, Iterator
 from unittest.mock import MagicMock
 
 import pytest
+from sqlalchemy import create_engine, select, func
+from sqlalchemy.orm import sessionmaker, Session
 
+from classes.orm.base import Base
 from classes.orm.habit import Habit
+from classes.orm.habit_entry import HabitEntry
+from classes.orm.habit_entry_summary import HabitEntrySummary
 from classes.periodicity import Periodicity
 
 
@@ -76,3 +82,79 @@ def test_update_no_data(habit: Habit) -> None:
 
 
 # endregion
+
+# region Queries
+
+
+@pytest.fixture
+def session() -> Iterator[Session]:
+    """
+    Returns a session bound to a new in-memory database.
+    """
+    engine = create_engine('sqlite:///:memory:')
+    Base.metadata.create_all(bind=engine)
+    with sessionmaker(bind=engine)() as session:
+        yield session
+
+
+def test_create_and_get_queries(session: Session, assert_queries: Callable[[int], ContextManager]) -> None:
+    """
+    Tests that creating and retrieving Habits issues a constant number of statements.
+    """
+    with assert_queries(1):
+        Habit.create(session=session, habit_name='Query Habit', periodicity=Periodicity.Daily)
+
+    with assert_queries(1):
+        assert Habit.get(session=session, habit_name='Query Habit') is not None
+
+    for index in range(5):
+        Habit.create(session=session, habit_name=f'Query Habit {index}', periodicity=Periodicity.Weekly)
+
+    with assert_queries(1):
+        assert len(Habit.get_many(session=session, habit_ids=range(1, 7))) == 6
+
+
+@pytest.mark.parametrize('habit_count', [1, 5])
+def test_complete_many_queries(session: Session, assert_queries: Callable[[int], ContextManager], habit_count: int) -> None:
+    """
+    Tests that completing Habits issues the same number of statements regardless of how many Habits are completed.
+    """
+    habits = [Habit.create(session=session, habit_name=f'Query Habit {index}', periodicity=Periodicity.Daily) for index in range(habit_count)]
+    session.commit()
+    habits = Habit.get_many(session=session, habit_ids=[habit.habit_id for habit in habits])
+
+    with assert_queries(3) as statements:
+        results = Habit.complete_many(session=session, habits=habits)
+
+    assert all(result is not None for result in results.values())
+    assert statements[0] == 'BEGIN IMMEDIATE'
+
+
+def test_delete_many_queries(session: Session, assert_queries: Callable[[int], ContextManager]) -> None:
+    """
+    Tests that Habits are deleted with their history through one statement per table, also without foreign keys enabled.
+    """
+    habits = [Habit.create(session=session, habit_name=f'Query Habit {index}', periodicity=Periodicity.Daily if index < 3 else Periodicity.Weekly)
+              for index in range(5)]
+    Habit.complete_many(session=session, habits=habits)
+    session.add(HabitEntrySummary(habit_id=1, month=1, completion_count=1, completed_days=1, last_completion=datetime(1, 1, 1)))
+    session.commit()
+    Habit.get_many(session=session, habit_ids=[1, 2, 3, 4, 5])
+
+    with assert_queries(4) as statements:
+        assert Habit.delete_many(session=session, habit_ids=[1, 4], habit_names=['Query Habit 1'], periodicity=Periodicity.Daily) == 2
+    assert statements[0] == 'BEGIN IMMEDIATE'
+
+    # Deleted Habits are removed from the session, but keep their loaded attributes
+    assert habits[0] not in session and habits[0].name == 'Query Habit 0'
+    assert session.scalars(select(HabitEntry.habit_id).order_by(HabitEntry.habit_id)).all() == [3, 4, 5]
+    assert session.scalar(select(func.count()).select_from(HabitEntrySummary)) == 0
+
+    habits[2].delete(session=session)
+    assert Habit.delete_many(session=session) == 0
+    assert session.scalars(select(Habit.habit_id)).all() == [4, 5]
+    assert Habit.delete_many(session=session, periodicity=Periodicity.Weekly) == 2
+    assert session.scalar(select(func.count()).select_from(HabitEntry)) == 0
+
+
+# endregion
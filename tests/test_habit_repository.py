@@ -0,0 +1,78 @@
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy.orm import sessionmaker, Session
+
+from classes.habit_repository import HabitRepository
+from classes.orm.base import Base
+from classes.orm.habit import Habit
+from classes.orm.habit_entry import HabitEntry
+from classes.periodicity import Periodicity
+from helpers.database import create_database_engine
+
+
+@pytest.fixture
+def session() -> Session:
+    """
+    Returns a session bound to a new in-memory database.
+    """
+    engine = create_database_engine(url='sqlite:///:memory:')
+    Base.metadata.create_all(bind=engine)
+    with sessionmaker(bind=engine)() as session:
+        yield session
+
+
+def test_create(session: Session) -> None:
+    """
+    Tests that Habits are created once and duplicate names are rejected without an error.
+    """
+    repository = HabitRepository(session=session)
+
+    habit_id = repository.create(habit_name='Repository Habit', periodicity=Periodicity.Weekly)
+    assert habit_id is not None
+    assert repository.create(habit_name='Repository Habit', periodicity=Periodicity.Daily) is None
+    session.commit()
+
+    target_habit = session.get(Habit, habit_id)
+    assert (target_habit.name, target_habit.periodicity, target_habit.streak, target_habit.total_completions) == ('Repository Habit', Periodicity.Weekly, 0, 0)
+    assert target_habit.creation_date is not None
+
+
+def test_list_and_get(session: Session) -> None:
+    """
+    Tests that Habits are listed and retrieved as plain rows.
+    """
+    repository = HabitRepository(session=session)
+    first_id = repository.create(habit_name='First', periodicity=Periodicity.Daily)
+    second_id = repository.create(habit_name='Second', periodicity=Periodicity.Weekly)
+
+    assert [tuple(row) for row in repository.list()] == [(first_id, 'First', 0, 0, Periodicity.Daily), (second_id, 'Second', 0, 0, Periodicity.Weekly)]
+    assert repository.get(habit_id=second_id).name == 'Second'
+    assert repository.get(habit_name='First').id == first_id
+    assert repository.get(habit_name='Missing') is None
+    assert repository.get() is None
+
+
+def test_complete(session: Session) -> None:
+    """
+    Tests completing a Habit, completing it again in the same period and breaking its streak.
+    """
+    repository = HabitRepository(session=session)
+    habit_id = repository.create(habit_name='Complete', periodicity=Periodicity.Daily)
+    session.commit()
+
+    assert repository.complete(habit=repository.get(habit_id=habit_id)) == (1, False)
+    assert repository.complete(habit=repository.get(habit_id=habit_id)) is None
+
+    # Move the completion back by two days, so that the next completion breaks the streak
+    target_habit = session.get(Habit, habit_id)
+    two_days_ago = datetime.now() - timedelta(days=2)
+    target_entry = session.query(HabitEntry).one()
+    target_entry.completion_date = target_habit.last_completion = two_days_ago
+    target_entry.period_key = Periodicity.Daily.period_index(value=two_days_ago.date())
+    session.commit()
+
+    assert repository.complete(habit=repository.get(habit_id=habit_id)) == (1, True)
+
+    session.refresh(target_habit)
+    assert (target_habit.streak, target_habit.highest_streak, target_habit.total_completions) == (1, 1, 2)
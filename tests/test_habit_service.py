@@ -0,0 +1,97 @@
+import pytest
+from sqlalchemy import event, func, select
+from sqlalchemy.orm import sessionmaker, Session
+
+from classes.habit_service import HabitService
+from classes.orm.base import Base
+from classes.orm.habit import Habit
+from classes.orm.habit_entry import HabitEntry
+from classes.periodicity import Periodicity
+from helpers.database import create_database_engine
+
+
+@pytest.fixture
+def session() -> Session:
+    """
+    Returns a session bound to a new in-memory database.
+    """
+    engine = create_database_engine(url='sqlite:///:memory:')
+    Base.metadata.create_all(bind=engine)
+    with sessionmaker(bind=engine)() as session:
+        yield session
+
+
+def count_commits(session: Session) -> list:
+    """
+    Records every commit of the given session.
+
+    :param session: The SQLAlchemy session object.
+
+    :returns list: List that receives one entry per commit
+    """
+    commits = []
+    event.listen(session, 'after_commit', lambda committed_session: commits.append(committed_session))
+    return commits
+
+
+def test_operations_commit_outside_batch(session: Session) -> None:
+    """
+    Tests that operations outside a batch commit on their own, like the CLI commands.
+    """
+    service = HabitService(session=session)
+    commits = count_commits(session=session)
+
+    target_habit = service.create(habit_name='Single', periodicity=Periodicity.Daily)
+    service.complete(habit=target_habit)
+
+    assert len(commits) == 2
+
+
+def test_batch_commits_once(session: Session) -> None:
+    """
+    Tests that thousands of mixed operations within a batch result in a single commit.
+    """
+    service = HabitService(session=session)
+    commits = count_commits(session=session)
+
+    with service.batch():
+        habits = [service.create(habit_name=f'Batch Habit {index}', periodicity=Periodicity.Daily) for index in range(1000)]
+        for target_habit in habits[:500]:
+            service.complete(habit=target_habit)
+        service.complete_many(habits=habits[500:])
+        # Nested batches are part of the outer one
+        with service.batch():
+            for target_habit in habits[:100]:
+                service.update(habit=target_habit, new_periodicity=Periodicity.Weekly)
+            for target_habit in habits[900:]:
+                service.delete(habit=target_habit)
+
+        assert len(commits) == 0
+
+    assert len(commits) == 1
+    assert session.scalar(select(func.count()).select_from(Habit)) == 900
+    assert session.scalar(select(func.count()).select_from(HabitEntry)) == 900
+    assert service.get(habit_name='Batch Habit 0').periodicity is Periodicity.Weekly
+
+
+def test_batch_rollback(session: Session) -> None:
+    """
+    Tests that an exception within a batch rolls back all of its operations.
+    """
+    service = HabitService(session=session)
+    service.create(habit_name='Existing', periodicity=Periodicity.Daily)
+
+    with pytest.raises(RuntimeError):
+        with service.batch():
+            service.complete(habit=service.get(habit_name='Existing'))
+            service.create(habit_name='Rolled Back', periodicity=Periodicity.Weekly)
+            raise RuntimeError()
+
+    assert service.get_many(habit_names=['Existing', 'Rolled Back'])[0].total_completions == 0
+    assert len(service.get_many(habit_names=['Existing', 'Rolled Back'])) == 1
+    assert session.scalar(select(func.count()).select_from(HabitEntry)) == 0
+
+    # Operations after the batch commit on their own again
+    commits = count_commits(session=session)
+    service.create(habit_name='After', periodicity=Periodicity.Daily)
+    assert len(commits) == 1
@@ -0,0 +1,110 @@
+import random
+from datetime import datetime, date, timedelta
+from typing import List
+
+import numpy as np
+import pytest
+from sqlalchemy import create_engine, select
+from sqlalchemy.orm import sessionmaker, Session
+
+from classes.habit_timeline import HabitTimeline
+from classes.orm.base import Base
+from classes.orm.habit import Habit
+from classes.orm.habit_entry import HabitEntry
+from classes.periodicity import Periodicity
+from helpers.streaks import rebuild_streaks
+
+
+@pytest.fixture
+def session() -> Session:
+    """
+    Returns a session bound to a new in-memory database.
+    """
+    engine = create_engine('sqlite:///:memory:')
+    Base.metadata.create_all(bind=engine)
+    with sessionmaker(bind=engine)() as session:
+        yield session
+
+
+def create_history(session: Session, name: str, periodicity: Periodicity, completions: List[datetime]) -> None:
+    """
+    Creates a Habit with the given completion history.
+
+    :param session: The SQLAlchemy session object.
+    :param name: The Name of the Habit.
+    :param periodicity: The Periodicity of the Habit.
+    :param completions: Completion dates of the Habit.
+    """
+    new_habit = Habit.create(session=session, habit_name=name, periodicity=periodicity)
+    session.add_all([HabitEntry(habit_id=new_habit.habit_id, completion_date=completion) for completion in completions])
+    session.commit()
+
+
+def test_daily_timeline(session: Session) -> None:
+    """
+    Tests the queries of a daily timeline with gaps and multiple completions on the same day.
+    """
+    start = datetime(2024, 1, 1, 12)
+    days = [0, 1, 1, 2, 3, 5, 6, 10]
+    create_history(session=session, name='Daily', periodicity=Periodicity.Daily, completions=[start + timedelta(days=day) for day in days])
+
+    timeline = HabitTimeline.load(session=session)[1]
+    assert len(timeline) == 7
+    assert timeline.periods.dtype == np.int32
+    assert (timeline.streak, timeline.highest_streak) == (1, 4)
+
+    first_periods, lengths = timeline.runs()
+    assert [Periodicity.Daily.period_start(period_index=period) for period in first_periods] == [date(2024, 1, 1), date(2024, 1, 6), date(2024, 1, 11)]
+    assert lengths.tolist() == [4, 2, 1]
+
+    first_missed, missed = timeline.gaps()
+    assert [Periodicity.Daily.period_start(period_index=period) for period in first_missed] == [date(2024, 1, 5), date(2024, 1, 8)]
+    assert missed.tolist() == [1, 3]
+
+    assert timeline.completed(value=date(2024, 1, 4)) and not timeline.completed(value=date(2024, 1, 5))
+    assert not timeline.completed(value=date(2023, 12, 31)) and not timeline.completed(value=date(2024, 1, 12))
+
+    assert timeline.completion_mask(since=date(2023, 12, 31), until=date(2024, 1, 5)).tolist() == [False, True, True, True, True, False]
+    assert timeline.completion_rate(since=date(2024, 1, 1), until=date(2024, 1, 10)) == 0.6
+    assert timeline.completion_rate(since=date(2024, 2, 1), until=date(2024, 2, 1)) == 0.0
+    with pytest.raises(ValueError):
+        timeline.completion_rate(since=date(2024, 1, 2), until=date(2024, 1, 1))
+
+
+def test_weekly_timeline(session: Session) -> None:
+    """
+    Tests that weekly timelines count weeks, also across year boundaries.
+    """
+    completions = [datetime(2023, 12, 25, 9), datetime(2023, 12, 31, 9), datetime(2024, 1, 1, 9), datetime(2024, 1, 15, 9)]
+    create_history(session=session, name='Weekly', periodicity=Periodicity.Weekly, completions=completions)
+
+    timeline = HabitTimeline.load(session=session)[1]
+    assert (len(timeline), timeline.streak, timeline.highest_streak) == (3, 1, 2)
+    assert timeline.completed(value=date(2023, 12, 27)) and not timeline.completed(value=date(2024, 1, 10))
+    assert timeline.completion_mask(since=date(2023, 12, 31), until=date(2024, 1, 21)).tolist() == [True, True, False, True]
+
+
+def test_load(session: Session) -> None:
+    """
+    Tests that bulk loading matches the streaks rebuilt from the database and that timelines share one array.
+    """
+    rng = random.Random(3)
+    start = datetime(2024, 1, 1, 12)
+    for index in range(30):
+        periodicity = Periodicity.Weekly if index % 3 == 0 else Periodicity.Daily
+        completions = [start + timedelta(days=day) for day in range(200) if rng.random() < 0.7]
+        create_history(session=session, name=f'Habit {index}', periodicity=periodicity, completions=completions)
+    Habit.create(session=session, habit_name='Never Completed', periodicity=Periodicity.Daily)
+
+    rebuild_streaks(session=session)
+    timelines = HabitTimeline.load(session=session)
+    assert list(timelines) == list(range(1, 32))
+    for habit_id, streak, highest_streak in session.execute(select(Habit.habit_id, Habit.streak, Habit.highest_streak)):
+        assert (timelines[habit_id].streak, timelines[habit_id].highest_streak) == (streak, highest_streak)
+
+    assert len(timelines[31]) == 0 and timelines[31].runs()[1].tolist() == [] and timelines[31].gaps()[1].tolist() == []
+    assert timelines[1].periods.base is timelines[30].periods.base
+
+    selected = HabitTimeline.load(session=session, habit_ids=[2, 31, 99])
+    assert list(selected) == [2, 31]
+    assert np.array_equal(selected[2].periods, timelines[2].periods)
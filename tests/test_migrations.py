@@ -0,0 +1,107 @@
+from datetime import date
+from pathlib import Path
+
+import pytest
+from click.testing import CliRunner
+from sqlalchemy import create_engine, event, inspect, Engine
+
+from classes.orm.base import Base
+from classes.orm.migrations import migrate, get_schema_version, migration_001_create_tables, SCHEMA_VERSION
+from helpers.database import create_database_engine, ENV_DATABASE_PATH, ENV_DATABASE_PROFILE
+from tracker import cli
+
+
+@pytest.fixture
+def engine(tmp_path: Path) -> Engine:
+    """
+    Returns an Engine bound to an empty SQLite database file.
+    """
+    return create_engine(f'sqlite:///{tmp_path / "habits.sqlite"}')
+
+
+def test_migrate_new_database(engine: Engine) -> None:
+    """
+    Tests that migrating a new database creates the schema described by the ORM models.
+    """
+    assert migrate(engine=engine) is True
+
+    with engine.connect() as connection:
+        assert get_schema_version(connection=connection) == SCHEMA_VERSION
+
+    inspector = inspect(engine)
+    for table in Base.metadata.sorted_tables:
+        assert {column['name'] for column in inspector.get_columns(table.name)} == {column.name for column in table.columns}
+        assert {index['name'] for index in inspector.get_indexes(table.name)} == {index.name for index in table.indexes}
+
+
+def test_migrate_legacy_database(engine: Engine) -> None:
+    """
+    Tests that databases created before versioning are upgraded in place without losing data.
+    """
+    with engine.connect() as connection:
+        migration_001_create_tables(connection=connection)
+        connection.exec_driver_sql("INSERT INTO habit (id, name, periodicity, streak, highest_streak) VALUES (1, 'Test Habit', 'Daily', 1, 1), (2, 'Test Habit', 'Weekly', 0, 0)")
+        connection.exec_driver_sql("INSERT INTO habit_entry (habit_id, completion_date) VALUES (1, '2025-01-01 08:00:00'), (1, '2025-01-01 20:00:00'), (1, '2025-01-02 08:00:00')")
+        connection.commit()
+
+    assert migrate(engine=engine) is True
+
+    with engine.connect() as connection:
+        assert get_schema_version(connection=connection) == SCHEMA_VERSION
+        assert connection.exec_driver_sql('SELECT id, name FROM habit ORDER BY id').all() == [(1, 'Test Habit'), (2, 'Test Habit (2)')]
+        assert connection.exec_driver_sql('SELECT count(*) FROM habit_entry').scalar() == 3
+        assert connection.exec_driver_sql('SELECT id, total_completions, last_completion IS NOT NULL FROM habit ORDER BY id').all() == [(1, 3, 1), (2, 0, 0)]
+        # Only the first entry of each period is keyed
+        assert connection.exec_driver_sql('SELECT period_key FROM habit_entry ORDER BY id').scalars().all() == [date(2025, 1, 1).toordinal(), None, date(2025, 1, 2).toordinal()]
+
+    index_names = {index['name'] for index in inspect(engine).get_indexes('habit')}
+    assert 'unique_habit_name' in index_names
+
+
+def test_migrate_conflicting_duplicates(engine: Engine) -> None:
+    """
+    Tests that duplicate names are renamed to names that are not taken yet, so that the unique name index can be created.
+    """
+    with engine.connect() as connection:
+        migration_001_create_tables(connection=connection)
+        connection.exec_driver_sql("INSERT INTO habit (id, name, periodicity, streak, highest_streak) VALUES "
+                                   "(1, 'Dup', 'Daily', 0, 0), (2, 'Dup', 'Daily', 0, 0), (3, 'Dup (2)', 'Daily', 0, 0), (4, 'Dup (2, 2)', 'Weekly', 0, 0), "
+                                   "(5, 'Dup (2)', 'Weekly', 0, 0)")
+        connection.commit()
+
+    assert migrate(engine=engine) is True
+
+    with engine.connect() as connection:
+        assert connection.exec_driver_sql('SELECT id, name FROM habit ORDER BY id').all() == [
+            (1, 'Dup'), (2, 'Dup (2, 3)'), (3, 'Dup (2)'), (4, 'Dup (2, 2)'), (5, 'Dup (2) (5)')]
+
+
+def test_migrate_current_database(engine: Engine) -> None:
+    """
+    Tests that no DDL is executed if the schema is already up-to-date.
+    """
+    migrate(engine=engine)
+
+    statements = []
+    event.listen(engine, 'before_cursor_execute', lambda conn, cursor, statement, *args: statements.append(statement))
+
+    assert migrate(engine=engine) is False
+    assert statements == ['PRAGMA user_version']
+
+
+def test_migrate_read_only(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    """
+    Tests that outdated databases are reported instead of migrated with the read-only profile, and can be read once migrated.
+    """
+    url = f'sqlite:///{tmp_path / "habits.sqlite"}'
+    with pytest.raises(ValueError, match='can not be migrated by a read-only connection'):
+        migrate(engine=create_database_engine(url=url, profile='readonly-analytics'))
+
+    monkeypatch.setenv(ENV_DATABASE_PATH, str(tmp_path / 'habits.sqlite'))
+    monkeypatch.setenv(ENV_DATABASE_PROFILE, 'readonly-analytics')
+    result = CliRunner().invoke(cli=cli, args=['analytics', 'list'])
+    assert result.exit_code == 2
+    assert 'The database schema is outdated (version 0 of' in result.output
+
+    assert migrate(engine=create_database_engine(url=url)) is True
+    assert CliRunner().invoke(cli=cli, args=['analytics', 'list']).exit_code == 0
@@ -1,3 +1,6 @@
+import json
+from datetime import datetime
+from typing import List, Callable, ContextManager
 from unittest.mock import patch
 
 import pytest
@@ -82,7 +85,7 @@ def test_list_periodicity(runner: CliRunner) -> None:
     with patch('modules.analytics.list_habits') as mock_list_habits:
         runner.invoke(cli=analytics, args=['list', '-p', 'daily'], obj={'session_maker': session_maker})
 
-    assert len(mock_list_habits.call_args.kwargs['habits']) == 2
+    assert len(list(mock_list_habits.call_args.kwargs['habits'])) == 2
 
 
 def test_list_sort_order(runner: CliRunner) -> None:
@@ -108,72 +111,179 @@ def test_list_periodicity_and_sort_order(runner: CliRunner) -> None:
     with patch('modules.analytics.list_habits') as mock_list_habits:
         runner.invoke(cli=analytics, args=['list', '-p', 'daily', '-s', 'HighestStreak', '--desc'], obj={'session_maker': session_maker})
 
-    assert len(mock_list_habits.call_args.kwargs['habits']) == 2
+    assert len(list(mock_list_habits.call_args.kwargs['habits'])) == 2
     assert mock_list_habits.call_args.kwargs['habits'][0][0].habit_id == 3
     assert mock_list_habits.call_args.kwargs['habits'][1][0].habit_id == 1
 
+
+def test_list_limit() -> None:
+    """
+    Test the analytics list command with the --limit flag.
+    """
+    runner = CliRunner(mix_stderr=False)
+    result = runner.invoke(cli=analytics, args=['list', '-s', 'HighestStreak', '--limit', '2', '--format', 'jsonl'], obj={'session_maker': session_maker})
+
+    assert [json.loads(line)['id'] for line in result.stdout.splitlines()] == [2, 3]
+    assert '--after ' in result.stderr
+
+    result = runner.invoke(cli=analytics, args=['list', '--limit', '3'], obj={'session_maker': session_maker})
+    assert '--after' not in result.stderr
+
+
+@pytest.mark.parametrize('sort_order', ['ID', 'Name', 'Streak', 'HighestStreak', 'Periodicity', 'CreationDate', 'TotalCompletions', 'MostRecentCompletion'])
+@pytest.mark.parametrize('extra_args', [[], ['--asc'], ['-p', 'weekly']])
+def test_list_pagination(sort_order: str, extra_args: List[str]) -> None:
+    """
+    Test that paging through the analytics list with --limit and --after returns every Habit exactly once, in the same order as a single listing.
+    Sort values repeat and include NULLs, so that pages end within runs of equal values.
+
+    :param sort_order: Sort Order to be paged through.
+    :param extra_args: Further arguments passed to every call.
+    """
+    engine_ = create_engine('sqlite:///:memory:')
+    Base.metadata.create_all(bind=engine_)
+    session_maker_ = sessionmaker(bind=engine_)
+
+    with session_maker_() as session:
+        for index in range(12):
+            new_habit = Habit.create(session=session, habit_name=f'Paging Habit {index % 5} {index}', periodicity=Periodicity.Weekly if index % 3 == 0 else Periodicity.Daily)
+            new_habit.streak = index % 3
+            new_habit.highest_streak = index % 4
+            new_habit.creation_date = datetime(2024, 1, 1 + index % 2)
+            new_habit.total_completions = index % 2
+            new_habit.last_completion = None if index % 4 == 0 else datetime(2024, 2, 1 + index % 3)
+        session.commit()
+
+    runner = CliRunner(mix_stderr=False)
+    args = ['list', '-s', sort_order, '--format', 'jsonl', *extra_args]
+
+    result = runner.invoke(cli=analytics, args=args, obj={'session_maker': session_maker_})
+    expected_ids = [json.loads(line)['id'] for line in result.stdout.splitlines()]
+    assert len(expected_ids) == (4 if '-p' in extra_args else 12)
+
+    paged_ids = []
+    cursor_args = []
+    while True:
+        result = runner.invoke(cli=analytics, args=[*args, '--limit', '2', *cursor_args], obj={'session_maker': session_maker_})
+        assert result.exit_code == 0
+        paged_ids.extend(json.loads(line)['id'] for line in result.stdout.splitlines())
+
+        if '--after' not in result.stderr:
+            break
+        cursor_args = ['--after', result.stderr.split('--after ')[1].split('\033')[0].strip()]
+
+    assert paged_ids == expected_ids
+
+    # Without a limit, everything after the cursor is listed
+    result = runner.invoke(cli=analytics, args=[*args, '--limit', '3'], obj={'session_maker': session_maker_})
+    cursor = result.stderr.split('--after ')[1].split('\033')[0].strip()
+    result = runner.invoke(cli=analytics, args=[*args, '--after', cursor], obj={'session_maker': session_maker_})
+    assert [json.loads(line)['id'] for line in result.stdout.splitlines()] == expected_ids[3:]
+
+
+def test_list_invalid_cursor(runner: CliRunner) -> None:
+    """
+    Test that the analytics list command rejects malformed cursors and cursors of another sort order.
+
+    :param runner: The CLI Runner object.
+    """
+    result = runner.invoke(cli=analytics, args=['list', '--after', 'invalid'], obj={'session_maker': session_maker})
+    assert result.exit_code == 2
+    assert 'Malformed cursor!' in result.output
+
+    result = CliRunner(mix_stderr=False).invoke(cli=analytics, args=['list', '-s', 'Streak', '--limit', '1'], obj={'session_maker': session_maker})
+    cursor = result.stderr.split('--after ')[1].split('\033')[0].strip()
+
+    result = runner.invoke(cli=analytics, args=['list', '-s', 'Streak', '--asc', '--after', cursor], obj={'session_maker': session_maker})
+    assert result.exit_code == 2
+    assert 'Cursor was created for a different sort order (Streak descending)!' in result.output
+
+
+@pytest.mark.parametrize('args', [[], ['-s', 'MostRecentCompletion'], ['-p', 'daily', '-s', 'Name', '--asc'], ['-s', 'Streak', '--limit', '1']])
+def test_list_query_count(assert_queries: Callable[[int], ContextManager], args: List[str]) -> None:
+    """
+    Test that the analytics list command fetches and renders all Habits with a single statement.
+
+    :param assert_queries: Factory for the query count guard.
+    :param args: Further arguments of the command.
+    """
+    runner = CliRunner(mix_stderr=False)
+    with assert_queries(1):
+        result = runner.invoke(cli=analytics, args=['list', *args], obj={'session_maker': session_maker})
+    assert result.exit_code == 0
+
+    # Invalid cursors are rejected before the database is queried
+    with assert_queries(0):
+        runner.invoke(cli=analytics, args=['list', '--after', 'invalid'], obj={'session_maker': session_maker})
+
 # endregion
 
 # region Streak
 
 
-def test_longest_streak_habit_id(runner: CliRunner) -> None:
+def test_longest_streak_habit_id(runner: CliRunner, assert_queries: Callable[[int], ContextManager]) -> None:
     """
     Test the analytics streak command with the -i flag.
 
     :param runner: The CLI Runner object.
     """
-    result = runner.invoke(cli=analytics, args=['streak', '-i', '1'], obj={'session_maker': session_maker})
+    with assert_queries(1):
+        result = runner.invoke(cli=analytics, args=['streak', '-i', '1'], obj={'session_maker': session_maker})
     assert f'The Habit Test Habit 1 has a longest streak of 5!' in result.output
 
 
-def test_longest_streak_habit_name(runner: CliRunner) -> None:
+def test_longest_streak_habit_name(runner: CliRunner, assert_queries: Callable[[int], ContextManager]) -> None:
     """
     Test the analytics streak command with the -n flag.
 
     :param runner: The CLI Runner object.
     """
-    result = runner.invoke(cli=analytics, args=['streak', '-n', 'Test Habit 2'], obj={'session_maker': session_maker})
+    with assert_queries(1):
+        result = runner.invoke(cli=analytics, args=['streak', '-n', 'Test Habit 2'], obj={'session_maker': session_maker})
     assert f'The Habit Test Habit 2 has a longest streak of 8!' in result.output
 
 
-def test_longest_streak(runner: CliRunner) -> None:
+def test_longest_streak(runner: CliRunner, assert_queries: Callable[[int], ContextManager]) -> None:
     """
     Test the analytics streak command without any flags.
 
     :param runner: The CLI Runner object.
     """
-    result = runner.invoke(cli=analytics, args=['streak'], obj={'session_maker': session_maker})
+    with assert_queries(1):
+        result = runner.invoke(cli=analytics, args=['streak'], obj={'session_maker': session_maker})
     assert f'The Habit with the longest streak is: Test Habit 2 with a streak of 8!' in result.output
 
 
-def test_longest_streak_active(runner: CliRunner) -> None:
+def test_longest_streak_active(runner: CliRunner, assert_queries: Callable[[int], ContextManager]) -> None:
     """
     Test the analytics streak command with the -a flag.
 
     :param runner: The CLI Runner object.
     """
-    result = runner.invoke(cli=analytics, args=['streak', '-a'], obj={'session_maker': session_maker})
+    with assert_queries(1):
+        result = runner.invoke(cli=analytics, args=['streak', '-a'], obj={'session_maker': session_maker})
     assert f'The Habit with the longest active streak is: Test Habit 3 with a streak of 5!' in result.output
 
 
-def test_longest_streak_active_specific(runner: CliRunner) -> None:
+def test_longest_streak_active_specific(runner: CliRunner, assert_queries: Callable[[int], ContextManager]) -> None:
     """
     Test the analytics streak command with the -a flag and the -i flag.
 
     :param runner: The CLI Runner object.
     """
-    result = runner.invoke(cli=analytics, args=['streak', '-i', '3', '-a'], obj={'session_maker': session_maker})
+    with assert_queries(1):
+        result = runner.invoke(cli=analytics, args=['streak', '-i', '3', '-a'], obj={'session_maker': session_maker})
     assert f'The Habit Test Habit 3 has an active streak of 5!' in result.output
 
 
-def test_longest_streak_no_habit(runner: CliRunner) -> None:
+def test_longest_streak_no_habit(runner: CliRunner, assert_queries: Callable[[int], ContextManager]) -> None:
     """
     Test the analytics streak command with the -i flag and a non-existing Habit ID.
 
     :param runner: The CLI Runner object.
     """
-    result = runner.invoke(cli=analytics, args=['streak', '-i', '9999'], obj={'session_maker': session_maker})
+    with assert_queries(1):
+        result = runner.invoke(cli=analytics, args=['streak', '-i', '9999'], obj={'session_maker': session_maker})
     assert 'No Matching Habit found.' in result.output
 
 
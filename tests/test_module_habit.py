@@ -1,13 +1,18 @@
+import json
+from typing import Callable, ContextManager
+
+import click
 import pytest
 from click.testing import CliRunner
-from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker
 
 from classes.orm.base import Base
-from modules.habit import habit
+from classes.orm.habit import Habit  # noqa - Registers the tables, modules.habit only imports the ORM classes on demand
+from helpers.database import create_database_engine
+from modules.habit import habit, parse_completion_targets
 
 # Set up the SQLAlchemy session
-engine = create_engine('sqlite:///:memory:')
+engine = create_database_engine(url='sqlite:///:memory:')
 session_maker = sessionmaker(bind=engine, autocommit=False, autoflush=False)
 
 # Initialize your database tables
@@ -22,33 +27,105 @@ def runner() -> CliRunner:
     return CliRunner()
 
 
-def test_create(runner: CliRunner) -> None:
+def test_create(runner: CliRunner, assert_queries: Callable[[int], ContextManager]) -> None:
     """
     Test the habit create command.
     """
-    result = runner.invoke(cli=habit, args=['create'], obj={'session_maker': session_maker}, input='Test Habit\nd\n')
+    with assert_queries(1):
+        result = runner.invoke(cli=habit, args=['create'], obj={'session_maker': session_maker}, input='Test Habit\nd\n')
     assert 'Habit "Test Habit" has been created with a Daily Periodicity!' in result.output
 
 
-def test_complete(runner: CliRunner) -> None:
+def test_complete(runner: CliRunner, assert_queries: Callable[[int], ContextManager]) -> None:
     """
     Test the habit complete command.
     """
-    result = runner.invoke(cli=habit, args=['complete'], obj={'session_maker': session_maker}, input='Test Habit')
+    with assert_queries(4):
+        result = runner.invoke(cli=habit, args=['complete'], obj={'session_maker': session_maker}, input='Test Habit')
     assert 'You have completed Habit "Test Habit"! (Streak: 1)' in result.output
 
 
-def test_modify(runner: CliRunner) -> None:
+def test_modify(runner: CliRunner, assert_queries: Callable[[int], ContextManager]) -> None:
     """
     Test the habit modify command.
     """
-    result = runner.invoke(cli=habit, args=['modify'], obj={'session_maker': session_maker}, input='1\nY\nChanged Habit\nN')
+    with assert_queries(3):
+        result = runner.invoke(cli=habit, args=['modify'], obj={'session_maker': session_maker}, input='1\nY\nChanged Habit\nN')
     assert 'Habit has been updated!' in result.output
 
 
-def test_delete(runner: CliRunner) -> None:
+def test_delete(runner: CliRunner, assert_queries: Callable[[int], ContextManager]) -> None:
     """
     Test the habit delete command.
     """
-    result = runner.invoke(cli=habit, args=['delete'], obj={'session_maker': session_maker}, input='Changed Habit\nY')
+    with assert_queries(5):
+        result = runner.invoke(cli=habit, args=['delete'], obj={'session_maker': session_maker}, input='Changed Habit\nY')
     assert 'Habit "Changed Habit" has been deleted!' in result.output
+
+
+def test_complete_bulk(runner: CliRunner, assert_queries: Callable[[int], ContextManager]) -> None:
+    """
+    Test the habit complete command with the --stdin flag.
+    """
+    with assert_queries(1):
+        runner.invoke(cli=habit, args=['create', '-n', 'Bulk Habit 1', '-p', 'd'], obj={'session_maker': session_maker})
+    with assert_queries(1):
+        runner.invoke(cli=habit, args=['create', '-n', 'Bulk Habit 2', '-p', 'w'], obj={'session_maker': session_maker})
+
+    with assert_queries(5):
+        result = runner.invoke(cli=habit, args=['complete', '--stdin'], obj={'session_maker': session_maker}, input='Bulk Habit 1\n{"name": "Bulk Habit 2"}\nBulk Habit 1\nMissing Habit\n')
+    lines = result.output.splitlines()[2:]
+
+    assert 'Bulk Habit 1' in lines[0] and 'Completed' in lines[0]
+    assert 'Bulk Habit 2' in lines[1] and 'Completed' in lines[1]
+    assert 'Already completed' in lines[2]
+    assert 'Not found' in lines[3]
+
+
+def test_parse_completion_targets() -> None:
+    """
+    Tests that lines are parsed as IDs or Names and that JSON lines without a valid "id" or "name" are rejected.
+    """
+    assert parse_completion_targets(lines=['12\n', '\n', 'Read\n', '{"id": 3}', '{"name": "Run"}']) == [
+        ('12', 12, None), ('Read', None, 'Read'), ('{"id": 3}', 3, None), ('{"name": "Run"}', None, 'Run')]
+
+    for line in ['{"id": true}', '{"id": "3"}', '{"name": " "}', '{}']:
+        with pytest.raises(click.BadParameter, match='Line 1 needs to contain either an "id" or a "name"!'):
+            parse_completion_targets(lines=[line])
+    with pytest.raises(click.BadParameter, match='Line 1 is not valid JSON!'):
+        parse_completion_targets(lines=['{"id": '])
+
+
+def test_list_jsonl(runner: CliRunner, assert_queries: Callable[[int], ContextManager]) -> None:
+    """
+    Test the habit command with the --format jsonl option.
+    """
+    with assert_queries(1):
+        result = runner.invoke(cli=habit, args=['--format', 'jsonl'], obj={'session_maker': session_maker})
+    records = [json.loads(line) for line in result.output.splitlines()]
+
+    assert [record['name'] for record in records] == ['Bulk Habit 1', 'Bulk Habit 2']
+    assert records[1]['periodicity'] == 'Weekly'
+
+
+def test_delete_many(runner: CliRunner, assert_queries: Callable[[int], ContextManager]) -> None:
+    """
+    Test the habit delete command with multiple Names and a Periodicity filter.
+    """
+    for name, periodicity in [('Delete Habit 1', 'd'), ('Delete Habit 2', 'w'), ('Delete Habit 3', 'w')]:
+        runner.invoke(cli=habit, args=['create', '-n', name, '-p', periodicity], obj={'session_maker': session_maker})
+
+    result = runner.invoke(cli=habit, args=['delete', '-n', 'Delete Habit 1', '-n', 'Missing Habit', '-y'], obj={'session_maker': session_maker})
+    assert 'No Habit with Name Missing Habit exists!' in result.output
+    assert 'Habit "Delete Habit 1" has been deleted!' in result.output
+
+    result = runner.invoke(cli=habit, args=['delete', '-p', 'w'], obj={'session_maker': session_maker}, input='n\n')
+    assert 'Are you sure you want to delete 3 Habits ("Bulk Habit 2", "Delete Habit 2", "Delete Habit 3")?' in result.output
+    assert result.exit_code == 1
+
+    with assert_queries(5):
+        result = runner.invoke(cli=habit, args=['delete', '-p', 'w', '-y'], obj={'session_maker': session_maker})
+    assert '3 Habit(s) have been deleted!' in result.output
+
+    result = runner.invoke(cli=habit, args=['delete', '-p', 'w', '-i', '1'], obj={'session_maker': session_maker})
+    assert 'No Weekly Habit with ID 1 exists!' in result.output
@@ -0,0 +1,111 @@
+from datetime import datetime, timedelta
+
+import pytest
+from click.testing import CliRunner
+from sqlalchemy.orm import sessionmaker
+
+from classes.orm.base import Base
+from classes.orm.habit import Habit
+from classes.orm.habit_entry import HabitEntry
+from classes.periodicity import Periodicity
+from helpers.database import create_database_engine
+from modules.transfer import export, import_
+
+
+def create_session_maker() -> sessionmaker:
+    """
+    Returns a sessionmaker bound to a new in-memory database.
+    """
+    engine = create_database_engine(url='sqlite:///:memory:')
+    Base.metadata.create_all(bind=engine)
+    return sessionmaker(bind=engine, autocommit=False, autoflush=False)
+
+
+@pytest.fixture
+def runner() -> CliRunner:
+    """
+    Returns a CLI Runner object.
+    """
+    return CliRunner()
+
+
+@pytest.fixture
+def source_session_maker() -> sessionmaker:
+    """
+    Returns a sessionmaker of a database containing two Habits with completion history.
+    Habit 1 has a daily history of 3 days, a gap and 2 more days. Habit 2 has no completions.
+    """
+    session_maker = create_session_maker()
+    today = datetime.now()
+
+    with session_maker() as session:
+        Habit.create(session=session, habit_name='Test Habit 1', periodicity=Periodicity.Daily)
+        Habit.create(session=session, habit_name='Test Habit 2', periodicity=Periodicity.Weekly)
+        session.add_all([HabitEntry(habit_id=1, completion_date=today - timedelta(days=days)) for days in (6, 5, 4, 1, 0)])
+        session.commit()
+
+    return session_maker
+
+
+@pytest.mark.parametrize('format_', ['jsonl', 'csv'])
+def test_round_trip(runner: CliRunner, source_session_maker: sessionmaker, format_: str) -> None:
+    """
+    Tests that exported data can be imported into an empty database and that streaks are rebuilt.
+    """
+    exported = runner.invoke(cli=export, args=['-f', format_], obj={'session_maker': source_session_maker})
+    assert exported.exit_code == 0
+
+    target_session_maker = create_session_maker()
+    result = runner.invoke(cli=import_, args=['-f', format_, '-c', '2'], obj={'session_maker': target_session_maker}, input=exported.output)
+    assert 'Imported 2 Habit(s) and 5 completion(s)!' in result.output
+
+    with target_session_maker() as session:
+        habits = session.query(Habit).order_by(Habit.habit_id).all()
+        assert [(habit.name, habit.periodicity, habit.streak, habit.highest_streak) for habit in habits] == [
+            ('Test Habit 1', Periodicity.Daily, 2, 3),
+            ('Test Habit 2', Periodicity.Weekly, 0, 0),
+        ]
+        assert session.query(HabitEntry).count() == 5
+
+        # Completing after the import is rejected, today's completion has been keyed by the import
+        assert habits[0].complete(session=session) is None
+
+
+def test_export_without_completion_date(runner: CliRunner, source_session_maker: sessionmaker) -> None:
+    """
+    Tests that entries without a completion date are skipped by the export.
+    """
+    with source_session_maker() as session:
+        session.connection().exec_driver_sql('INSERT INTO habit_entry (habit_id, completion_date) VALUES (1, NULL)')
+        session.commit()
+
+    exported = runner.invoke(cli=export, obj={'session_maker': source_session_maker})
+    assert exported.exit_code == 0
+
+    target_session_maker = create_session_maker()
+    result = runner.invoke(cli=import_, obj={'session_maker': target_session_maker}, input=exported.output)
+    assert 'Imported 2 Habit(s) and 5 completion(s)!' in result.output
+
+
+def test_import_conflict(runner: CliRunner, source_session_maker: sessionmaker) -> None:
+    """
+    Tests that importing Habits that already exist is rolled back completely.
+    """
+    exported = runner.invoke(cli=export, obj={'session_maker': source_session_maker})
+    result = runner.invoke(cli=import_, obj={'session_maker': source_session_maker}, input=exported.output)
+
+    assert 'ERROR: Import conflicts with existing data!' in result.output
+    with source_session_maker() as session:
+        assert session.query(HabitEntry).count() == 5
+
+
+def test_import_invalid(runner: CliRunner) -> None:
+    """
+    Tests that invalid records cancel the import.
+    """
+    session_maker = create_session_maker()
+    result = runner.invoke(cli=import_, obj={'session_maker': session_maker}, input='{"type": "habit", "id": 1}\n')
+
+    assert 'ERROR: Invalid import data!' in result.output
+    with session_maker() as session:
+        assert session.query(Habit).count() == 0
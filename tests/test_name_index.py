@@ -0,0 +1,106 @@
+import os
+from pathlib import Path
+
+import pytest
+from click.shell_completion import ShellComplete
+from sqlalchemy.orm import sessionmaker
+
+from classes.helpers.name_index import NameIndex, NAME_INDEX_SUFFIX
+from classes.orm.base import Base
+from classes.orm.habit import Habit
+from classes.periodicity import Periodicity
+from helpers.database import create_database_engine, ENV_DATABASE_PATH
+from tracker import cli, COMPLETE_VAR
+
+
+@pytest.fixture
+def database_path(tmp_path: Path) -> str:
+    """
+    Returns the path of a new database file with four Habits.
+    """
+    path = str(tmp_path / 'habits.sqlite')
+    engine = create_database_engine(url=f'sqlite:///{path}')
+    Base.metadata.create_all(bind=engine)
+    with sessionmaker(bind=engine)() as session:
+        for name in ['Drink Water', 'drum practice', 'Read', 'Straße fegen']:
+            Habit.create(session=session, habit_name=name, periodicity=Periodicity.Daily)
+    engine.dispose()
+    return path
+
+
+def completions(args: list, incomplete: str) -> list:
+    """
+    Returns the values completed by the shell completion of tracker.py.
+
+    :param args: Arguments typed before the completed one.
+    :param incomplete: Value typed so far.
+
+    :returns list: Completed values
+    """
+    return [item.value for item in ShellComplete(cli=cli, ctx_args={}, prog_name='tracker.py', complete_var=COMPLETE_VAR).get_completions(args=args, incomplete=incomplete)]
+
+
+def test_complete(database_path: str) -> None:
+    """
+    Tests that Names are matched by prefix ignoring case and IDs by prefix, both up to the limit.
+    """
+    index = NameIndex.load(database_path=database_path)
+
+    assert index.complete_names(prefix='dr', limit=10) == ['Drink Water', 'drum practice']
+    assert index.complete_names(prefix='DRU', limit=10) == ['drum practice']
+    assert index.complete_names(prefix='dr', limit=1) == ['Drink Water']
+    assert index.complete_names(prefix='STRASSE', limit=10) == ['Straße fegen']
+    assert index.complete_names(prefix='Read\t', limit=10) == []
+    assert len(index.complete_names(prefix='', limit=10)) == 4
+
+    assert index.complete_ids(prefix='', limit=10) == [('1', 'Drink Water'), ('2', 'drum practice'), ('3', 'Read'), ('4', 'Straße fegen')]
+    assert index.complete_ids(prefix='3', limit=10) == [('3', 'Read')]
+
+
+@pytest.mark.parametrize('profile', ['durable', 'fast'])
+def test_cache(database_path: str, monkeypatch: pytest.MonkeyPatch, profile: str) -> None:
+    """
+    Tests that the cached index is served without reading the database until the database or its WAL file changes.
+    """
+    engine = create_database_engine(url=f'sqlite:///{database_path}', profile=profile)
+    with sessionmaker(bind=engine)() as session:
+        Habit.create(session=session, habit_name='Reading List', periodicity=Periodicity.Weekly)
+
+    NameIndex.load(database_path=database_path)
+    assert os.path.exists(database_path + NAME_INDEX_SUFFIX)
+
+    def build(*args, **kwargs) -> NameIndex:
+        raise AssertionError('Cached index was rebuilt!')
+
+    with monkeypatch.context() as patched:
+        patched.setattr(NameIndex, 'build', build)
+        assert NameIndex.load(database_path=database_path).complete_names(prefix='read', limit=10) == ['Read', 'Reading List']
+
+    # Written right after the index was built, usually within the same tick of the file system clock
+    with sessionmaker(bind=engine)() as session:
+        session.get(Habit, 5).update(session=session, new_name='Reading Challenge')
+    engine.dispose()
+
+    assert NameIndex.load(database_path=database_path).complete_names(prefix='read', limit=10) == ['Read', 'Reading Challenge']
+
+
+def test_missing_database(tmp_path: Path) -> None:
+    """
+    Tests that missing databases and databases without schema are not completed, and that no index is cached for them.
+    """
+    assert NameIndex.load(database_path=str(tmp_path / 'missing.sqlite')).complete_names(prefix='', limit=10) == []
+    assert not (tmp_path / 'missing.sqlite').exists()
+
+    (tmp_path / 'empty.sqlite').touch()
+    assert NameIndex.load(database_path=str(tmp_path / 'empty.sqlite')).complete_ids(prefix='', limit=10) == []
+
+
+def test_shell_completion(database_path: str, monkeypatch: pytest.MonkeyPatch) -> None:
+    """
+    Tests the completion of --name and --id through click, including options that can be passed multiple times.
+    """
+    monkeypatch.setenv(ENV_DATABASE_PATH, database_path)
+
+    assert completions(args=['habit', 'complete', '--name'], incomplete='d') == ['Drink Water', 'drum practice']
+    assert completions(args=['analytics', 'streak', '-i'], incomplete='') == ['1', '2', '3', '4']
+    assert completions(args=['habit', 'delete', '-n', 'Read', '-n'], incomplete='st') == ['Straße fegen']
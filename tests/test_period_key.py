@@ -0,0 +1,78 @@
+from datetime import datetime
+
+import pytest
+from sqlalchemy import select
+from sqlalchemy.orm import sessionmaker
+
+from classes.orm.base import Base
+from classes.orm.habit import Habit
+from classes.orm.habit_entry import HabitEntry
+from classes.periodicity import Periodicity
+from helpers.database import create_database_engine
+from helpers.streaks import rebuild_streaks
+
+
+@pytest.fixture
+def session_maker() -> sessionmaker:
+    """
+    Returns a sessionmaker bound to a new in-memory database.
+    """
+    engine = create_database_engine(url='sqlite:///:memory:')
+    Base.metadata.create_all(bind=engine)
+    return sessionmaker(bind=engine)
+
+
+def test_complete_sets_period_key(session_maker: sessionmaker) -> None:
+    """
+    Tests that completions are keyed with the period index of their Habit.
+    """
+    with session_maker() as session:
+        target_habit = Habit.create(session=session, habit_name='Weekly', periodicity=Periodicity.Weekly)
+        new_entry, _ = target_habit.complete(session=session)
+
+        assert new_entry.period_key == Periodicity.Weekly.period_index(value=new_entry.completion_date.date())
+
+
+def test_complete_concurrent(session_maker: sessionmaker) -> None:
+    """
+    Tests that a Habit loaded by two sessions before either completed it is only completed once.
+    """
+    with session_maker() as session:
+        Habit.create(session=session, habit_name='Concurrent', periodicity=Periodicity.Daily)
+
+    with session_maker() as first_session, session_maker() as second_session:
+        first_habit = Habit.get(session=first_session, habit_name='Concurrent')
+        second_habit = Habit.get(session=second_session, habit_name='Concurrent')
+
+        assert first_habit.complete(session=first_session) is not None
+        assert second_habit.complete(session=second_session) is None
+        assert Habit.complete_many(session=second_session, habits=[second_habit]) == {second_habit.habit_id: None}
+
+    with session_maker() as session:
+        target_habit = Habit.get(session=session, habit_name='Concurrent')
+        assert (target_habit.streak, target_habit.total_completions) == (1, 1)
+
+
+def test_update_periodicity_rebuilds_period_keys(session_maker: sessionmaker) -> None:
+    """
+    Tests that changing the Periodicity re-keys the completion history, keeping only the first entry of each week keyed, and recomputes the streaks.
+    """
+    completions = [datetime(2025, 1, 6), datetime(2025, 1, 7), datetime(2025, 1, 13)]
+
+    with session_maker() as session:
+        target_habit = Habit.create(session=session, habit_name='Switch', periodicity=Periodicity.Daily)
+        session.add_all([HabitEntry(habit_id=target_habit.habit_id, completion_date=completion) for completion in completions])
+        rebuild_streaks(session=session, habit_ids=[target_habit.habit_id])
+        session.commit()
+        # Daily: 2025-01-06 and 2025-01-07, then 2025-01-13 alone
+        assert (target_habit.streak, target_habit.highest_streak) == (1, 2)
+
+        target_habit.update(session=session, new_periodicity=Periodicity.Weekly)
+
+        period_keys = session.scalars(select(HabitEntry.period_key).order_by(HabitEntry.habit_entry_id)).all()
+        assert period_keys == [Periodicity.Weekly.period_index(value=completions[0].date()), None, Periodicity.Weekly.period_index(value=completions[2].date())]
+        # Weekly: two consecutive weeks
+        assert (target_habit.streak, target_habit.highest_streak) == (2, 2)
+
+    with session_maker() as session:
+        assert session.execute(select(Habit.streak, Habit.highest_streak)).one() == (2, 2)
@@ -0,0 +1,81 @@
+import json
+from pathlib import Path
+
+import pytest
+from click.testing import CliRunner
+
+from helpers.database import ENV_DATABASE_PATH
+from tracker import cli
+
+
+@pytest.fixture
+def runner(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> CliRunner:
+    """
+    Returns a CLI Runner object using a new database in a temporary directory.
+    """
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setenv(ENV_DATABASE_PATH, str(tmp_path / 'habits.sqlite'))
+    monkeypatch.delenv('TRACKER_PROFILE_JSON', raising=False)
+    return CliRunner(mix_stderr=False)
+
+
+def test_profile_summary(runner: CliRunner) -> None:
+    """
+    Tests that --profile prints phases and SQL statistics to stderr without changing the output of the command.
+
+    :param runner: The CLI Runner object.
+    """
+    for index in range(3):
+        runner.invoke(cli=cli, args=['habit', 'create', '-n', f'Profiled Habit {index}', '-p', 'daily'])
+
+    result = runner.invoke(cli=cli, args=['--profile', 'habit', '--format', 'jsonl'])
+    assert result.exit_code == 0
+    assert len(result.stdout.splitlines()) == 3
+
+    assert 'Phases: startup' in result.stderr
+    assert 'render' in result.stderr
+    assert 'Queries:' in result.stderr
+    assert 'SELECT habit.id' in result.stderr
+
+    result = runner.invoke(cli=cli, args=['habit', '--format', 'jsonl'])
+    assert result.stderr == ''
+
+
+def test_profile_json(runner: CliRunner, tmp_path: Path) -> None:
+    """
+    Tests that --profile-json appends one JSON line with all metrics per invocation.
+
+    :param runner: The CLI Runner object.
+    :param tmp_path: Temporary directory.
+    """
+    json_path = tmp_path / 'profile.jsonl'
+    runner.invoke(cli=cli, args=['--profile-json', str(json_path), 'habit', 'create', '-n', 'Profiled Habit', '-p', 'daily'])
+    runner.invoke(cli=cli, args=['habit', 'create', '-n', 'Second Habit', '-p', 'weekly'], env={'TRACKER_PROFILE_JSON': str(json_path)})
+    runner.invoke(cli=cli, args=['--profile-json', str(json_path), 'habit'])
+
+    first, second, listing = [json.loads(line) for line in json_path.read_text().splitlines()]
+    assert {'startup', 'engine', 'schema', 'command', 'total'} <= set(first['phases'])
+    assert first['queries']['count'] == sum(statement['count'] for statement in first['queries']['statements'])
+    assert any(statement['statement'].startswith('INSERT INTO habit ') for statement in first['queries']['statements'])
+    assert second['queries']['count'] > 0
+
+    # Rows returned by the listing are counted while they are fetched
+    select_statement = next(statement for statement in listing['queries']['statements'] if statement['statement'].startswith('SELECT habit.id'))
+    assert select_statement['rows'] == 2
+
+
+def test_profile_pstats(runner: CliRunner, tmp_path: Path) -> None:
+    """
+    Tests that --profile-pstats writes the cProfile statistics of the command.
+
+    :param runner: The CLI Runner object.
+    :param tmp_path: Temporary directory.
+    """
+    import pstats
+
+    pstats_path = tmp_path / 'profile.pstats'
+    result = runner.invoke(cli=cli, args=['--profile-pstats', str(pstats_path), 'analytics', 'list'])
+    assert result.exit_code == 0
+    assert 'functions by cumulative time' in result.stderr
+
+    assert pstats.Stats(str(pstats_path)).total_calls > 0
@@ -0,0 +1,200 @@
+from typing import List, Tuple, Any, Iterator
+from contextlib import contextmanager
+
+import pytest
+from click.testing import CliRunner
+from sqlalchemy import create_engine, event, Engine
+from sqlalchemy.orm import sessionmaker
+
+from classes.orm.base import Base
+from classes.orm.habit import Habit
+from classes.periodicity import Periodicity
+from modules.analytics import analytics
+
+# Set up the SQLAlchemy session
+engine = create_engine('sqlite:///:memory:')
+session_maker = sessionmaker(bind=engine, autocommit=False, autoflush=False)
+
+# Initialize your database tables
+Base.metadata.create_all(bind=engine)
+
+
+@pytest.fixture(scope='module', autouse=True)
+def create_test_habits() -> None:
+    """
+    Creates three test Habits for related tests, the first two with a completion each.
+    """
+    with session_maker() as session:
+        Habit.create(session=session, habit_name='Plan Habit 1', periodicity=Periodicity.Daily).complete(session=session)
+        Habit.create(session=session, habit_name='Plan Habit 2', periodicity=Periodicity.Weekly).complete(session=session)
+        Habit.create(session=session, habit_name='Plan Habit 0', periodicity=Periodicity.Daily)
+
+
+@contextmanager
+def capture_queries(target_engine: Engine) -> Iterator[List[Tuple[str, Any]]]:
+    """
+    Captures all SELECT and UPDATE statements (and their parameters) executed on the given engine.
+
+    :param target_engine: Engine whose statements should be captured.
+    """
+    queries: List[Tuple[str, Any]] = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany) -> None:
+        if statement.lstrip().upper().startswith(('SELECT', 'UPDATE')) and not executemany:
+            queries.append((statement, parameters))
+
+    event.listen(target_engine, 'before_cursor_execute', before_cursor_execute)
+    try:
+        yield queries
+    finally:
+        event.remove(target_engine, 'before_cursor_execute', before_cursor_execute)
+
+
+def get_query_plan(statement: str, parameters: Any) -> List[str]:
+    """
+    Runs EXPLAIN QUERY PLAN for the given statement.
+
+    :param statement: SQL Statement to be explained.
+    :param parameters: Parameters of the Statement.
+
+    :returns List[str]: Details of all plan steps
+    """
+    with engine.connect() as connection:
+        return [row[-1] for row in connection.exec_driver_sql(f'EXPLAIN QUERY PLAN {statement}', parameters)]
+
+
+def get_table_scans(statement: str, parameters: Any, tables: Tuple[str, ...]) -> List[str]:
+    """
+    Returns all steps of the query plan of the given statement that fall back to a full table scan.
+
+    :param statement: SQL Statement to be explained.
+    :param parameters: Parameters of the Statement.
+    :param tables: Names of the tables that must not be scanned.
+
+    :returns List[str]: Plan steps scanning one of the given tables without an index.
+    """
+    scans = []
+    for detail in get_query_plan(statement=statement, parameters=parameters):
+        words = detail.split()
+        if len(words) >= 2 and words[0] == 'SCAN' and words[1] in tables and 'USING' not in words:
+            scans.append(detail)
+    return scans
+
+
+def assert_no_table_scans(queries: List[Tuple[str, Any]], tables: Tuple[str, ...] = ('habit', 'habit_entry')) -> None:
+    """
+    Asserts that none of the given queries fall back to a full table scan.
+
+    :param queries: Captured Queries
+    :param tables: Names of the tables that must not be scanned.
+    """
+    assert len(queries) > 0
+    for statement, parameters in queries:
+        scans = get_table_scans(statement=statement, parameters=parameters, tables=tables)
+        assert scans == [], f'Query falls back to a table scan ({scans}):\n{statement}'
+
+
+# region Habit
+
+
+def test_get_by_id() -> None:
+    """
+    Tests that retrieving a Habit by its ID uses the primary key.
+    """
+    with session_maker() as session, capture_queries(target_engine=engine) as queries:
+        assert Habit.get(session=session, habit_id=1) is not None
+
+    assert_no_table_scans(queries=queries)
+
+
+def test_get_by_name() -> None:
+    """
+    Tests that retrieving a Habit by its Name uses the unique name index.
+    """
+    with session_maker() as session, capture_queries(target_engine=engine) as queries:
+        assert Habit.get(session=session, habit_name='Plan Habit 2') is not None
+
+    assert_no_table_scans(queries=queries)
+
+
+def test_exists() -> None:
+    """
+    Tests that checking for an existing Habit Name uses the unique name index.
+    """
+    with session_maker() as session, capture_queries(target_engine=engine) as queries:
+        assert Habit.exists(session=session, habit_name='Plan Habit 1')
+
+    assert_no_table_scans(queries=queries)
+
+
+def test_complete() -> None:
+    """
+    Tests that updating the streak of a completed Habit looks up the previous period through the period index.
+    """
+    with session_maker() as session:
+        target_habit = Habit.create(session=session, habit_name='Plan Habit 3', periodicity=Periodicity.Daily)
+        with capture_queries(target_engine=engine) as queries:
+            target_habit.complete(session=session)
+
+    assert_no_table_scans(queries=queries)
+
+
+def test_complete_many() -> None:
+    """
+    Tests that resolving and completing multiple Habits uses the name and completion indexes.
+    """
+    with session_maker() as session, capture_queries(target_engine=engine) as queries:
+        habits = Habit.get_many(session=session, habit_ids=[1], habit_names=['Plan Habit 2'])
+        Habit.complete_many(session=session, habits=habits)
+
+    assert_no_table_scans(queries=queries)
+
+
+# endregion
+
+# region Analytics
+
+
+def test_analytics_list() -> None:
+    """
+    Tests that the analytics list command does not scan the entry table.
+    Listing all Habits requires a scan of the Habit table itself.
+    """
+    with capture_queries(target_engine=engine) as queries:
+        CliRunner().invoke(cli=analytics, args=['list'], obj={'session_maker': session_maker})
+
+    assert_no_table_scans(queries=queries, tables=('habit_entry',))
+
+
+@pytest.mark.parametrize('sort_order', ['TotalCompletions', 'MostRecentCompletion'])
+def test_analytics_list_sort_aggregates(sort_order: str) -> None:
+    """
+    Tests that sorting by the completion aggregates walks their index instead of sorting all Habits.
+    """
+    with capture_queries(target_engine=engine) as queries:
+        CliRunner().invoke(cli=analytics, args=['list', '-s', sort_order], obj={'session_maker': session_maker})
+
+    assert_no_table_scans(queries=queries)
+
+
+@pytest.mark.parametrize('sort_order', ['ID', 'Name', 'Streak', 'HighestStreak', 'Periodicity', 'CreationDate', 'TotalCompletions', 'MostRecentCompletion'])
+@pytest.mark.parametrize('extra_args', [[], ['--asc'], ['-p', 'daily']])
+def test_analytics_list_pages(sort_order: str, extra_args: List[str]) -> None:
+    """
+    Tests that a page after a cursor is read in order from an index of the sort target, without scanning or sorting the Habit table.
+    """
+    runner = CliRunner(mix_stderr=False)
+    args = ['list', '-s', sort_order, '--limit', '1', *extra_args]
+    result = runner.invoke(cli=analytics, args=args, obj={'session_maker': session_maker})
+    cursor = result.stderr.split('--after ')[1].split('\033')[0].strip()
+
+    with capture_queries(target_engine=engine) as queries:
+        result = runner.invoke(cli=analytics, args=[*args, '--after', cursor], obj={'session_maker': session_maker})
+    assert result.exit_code == 0
+
+    assert_no_table_scans(queries=queries)
+    for statement, parameters in queries:
+        assert not any('TEMP B-TREE' in detail for detail in get_query_plan(statement=statement, parameters=parameters)), f'Query sorts the Habits:\n{statement}'
+
+
+# endregion
@@ -0,0 +1,238 @@
+import io
+import json
+import os
+import stat
+import threading
+from http.client import HTTPConnection
+from pathlib import Path
+from typing import Iterator, Dict, Optional
+
+import pytest
+from click.testing import CliRunner
+
+from classes.helpers.lazy_session_maker import LazySessionMaker
+from classes.tracker_server import TrackerServer
+from helpers.database import ENV_DATABASE_PATH
+from helpers.remote import SERVER_HOST, ENV_TOKEN_DIRECTORY, send_command, forward_command, token_path
+from tracker import cli
+
+
+@pytest.fixture
+def server(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> Iterator[TrackerServer]:
+    """
+    Returns a running server on a free port, serving a new database in a temporary directory. Its token is written to the same directory.
+    """
+    monkeypatch.setenv(ENV_TOKEN_DIRECTORY, str(tmp_path / 'tokens'))
+    session_maker = LazySessionMaker(url=f'sqlite:///{tmp_path / "habits.sqlite"}', profile='durable')
+    with TrackerServer(port=0, command=cli, obj={'session_maker': session_maker}) as server:
+        server.warm_up()
+        thread = threading.Thread(target=server.serve_forever)
+        thread.start()
+        yield server
+
+        server.shutdown()
+        thread.join()
+    session_maker.engine.dispose()
+
+
+@pytest.fixture
+def runner(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> CliRunner:
+    """
+    Returns a CLI Runner object. Its local database differs from the one of the server.
+    """
+    monkeypatch.setenv(ENV_DATABASE_PATH, str(tmp_path / 'local.sqlite'))
+    return CliRunner(mix_stderr=False)
+
+
+def test_run_command(server: TrackerServer) -> None:
+    """
+    Tests running commands on the server, including prompts answered by the input and commands that are not served.
+
+    :param server: The running server.
+    """
+    result = server.run_command(args=['habit', 'create', '-n', 'Served Habit', '-p', 'daily'])
+    assert result['exit_code'] == 0
+    assert 'has been created' in result['stdout']
+
+    result = server.run_command(args=['habit', 'complete', '-n', 'Served Habit'])
+    assert result['exit_code'] == 0
+
+    result = server.run_command(args=['analytics', 'list', '--format', 'jsonl'])
+    assert [(record['name'], record['current_streak']) for record in map(json.loads, result['stdout'].splitlines())] == [('Served Habit', 1)]
+
+    # Without input, the confirmation prompt aborts the command
+    result = server.run_command(args=['habit', 'delete', '-n', 'Served Habit'])
+    assert result['exit_code'] == 1
+    assert 'Aborted!' in result['stderr']
+
+    result = server.run_command(args=['habit', 'delete', '-n', 'Served Habit'], input_='y\n')
+    assert result['exit_code'] == 0
+    assert 'has been deleted' in result['stdout']
+
+    result = server.run_command(args=['analytics', 'list', '-s', 'Unknown'])
+    assert result['exit_code'] == 2
+    assert "Invalid value for '-s'" in result['stderr']
+
+    for args in [[], ['export'], ['serve'], ['--remote', 'habit']]:
+        assert server.run_command(args=args)['exit_code'] == 2
+
+
+def test_remote(server: TrackerServer, runner: CliRunner) -> None:
+    """
+    Tests that --remote forwards commands, their output, exit code and input to the server.
+
+    :param server: The running server.
+    :param runner: The CLI Runner object.
+    """
+    remote_args = ['--remote', '--remote-address', str(server.port)]
+
+    result = runner.invoke(cli=cli, args=[*remote_args, 'habit', 'create', '-n', 'Remote Habit', '-p', 'weekly'])
+    assert result.exit_code == 0
+    assert 'Remote Habit' in result.stdout
+
+    # The Habit only exists in the database of the server
+    assert runner.invoke(cli=cli, args=['habit', '--format', 'jsonl']).stdout == ''
+    result = runner.invoke(cli=cli, args=[*remote_args, 'habit', '--format', 'jsonl'])
+    assert [json.loads(line)['name'] for line in result.stdout.splitlines()] == ['Remote Habit']
+
+    result = runner.invoke(cli=cli, args=[*remote_args, 'analytics', 'list', '--after', 'invalid'])
+    assert result.exit_code == 2
+    assert 'Malformed cursor!' in result.stderr
+
+
+def test_remote_input(server: TrackerServer, capsys: pytest.CaptureFixture, monkeypatch: pytest.MonkeyPatch) -> None:
+    """
+    Tests that input piped into the client answers the prompts of the forwarded command.
+    The CLI Runner can not be used, as it replaces the prompt functions of the server within the same process as well.
+
+    :param server: The running server.
+    :param capsys: Captures the output of the client.
+    :param monkeypatch: Replaces the stdin of the client.
+    """
+    server.run_command(args=['habit', 'create', '-n', 'Remote Habit', '-p', 'daily'])
+
+    monkeypatch.setattr('sys.stdin', io.StringIO('y\n'))
+    assert forward_command(address=str(server.port), args=['habit', 'delete', '-n', 'Remote Habit']) == 0
+    assert 'has been deleted' in capsys.readouterr().out
+
+    assert forward_command(address=str(server.port), args=['habit', 'delete', '-n', 'Remote Habit']) == 0
+    assert 'No Habit with Name Remote Habit exists!' in capsys.readouterr().out
+
+
+def test_remote_errors(server: TrackerServer, runner: CliRunner) -> None:
+    """
+    Tests the errors of --remote: Commands that can not be forwarded, invalid addresses and unreachable servers.
+
+    :param server: The running server.
+    :param runner: The CLI Runner object.
+    """
+    result = runner.invoke(cli=cli, args=['--remote', '--remote-address', str(server.port), 'export'])
+    assert result.exit_code == 2
+    assert 'Only the habit and analytics commands can be run with --remote!' in result.stderr
+
+    result = runner.invoke(cli=cli, args=['--remote', '--remote-address', str(server.port), '--profile', 'habit'])
+    assert result.exit_code == 2
+
+    result = runner.invoke(cli=cli, args=['--remote', '--remote-address', 'localhost:port', 'habit'])
+    assert result.exit_code == 2
+    assert 'Invalid server address' in result.stderr
+
+    # The server is shut down, its port is free
+    server.shutdown()
+    server.server_close()
+    result = runner.invoke(cli=cli, args=['--remote', '--remote-address', str(server.port), 'habit'])
+    assert result.exit_code == 1
+    assert 'Could not reach the server' in result.stderr
+
+
+def post_command(server: TrackerServer, body: str, headers: Optional[Dict[str, str]] = None) -> int:
+    """
+    Sends a command request to the server, by default with the headers of a valid request.
+
+    :param server: The running server.
+    :param body: Body of the request.
+    :param headers: Headers replacing the default ones. Headers set to an empty string are not sent.
+
+    :returns int: Status code of the response
+    """
+    headers = {'Content-Type': 'application/json', 'Authorization': f'Bearer {server.token}', **(headers or {})}
+    connection = HTTPConnection(host=SERVER_HOST, port=server.port)
+    connection.request(method='POST', url='/commands', body=body, headers={key: value for key, value in headers.items() if value != ''})
+    status = connection.getresponse().status
+    connection.close()
+    return status
+
+
+def test_malformed_requests(server: TrackerServer) -> None:
+    """
+    Tests that the server rejects malformed requests and unknown paths and reports its health.
+
+    :param server: The running server.
+    """
+    for body in ['invalid', '[]', '{"args": "habit"}', '{"args": ["habit"], "input": 1}']:
+        assert post_command(server=server, body=body) == 400
+
+    connection = HTTPConnection(host=SERVER_HOST, port=server.port)
+    connection.request(method='GET', url='/unknown')
+    assert connection.getresponse().status == 404
+    connection.close()
+
+    send_command(address=str(server.port), args=['habit'])
+    connection = HTTPConnection(host=SERVER_HOST, port=server.port)
+    connection.request(method='GET', url='/health')
+    assert json.loads(connection.getresponse().read()) == {'status': 'ok', 'commands': 1}
+    connection.close()
+
+
+def test_rejected_requests(server: TrackerServer) -> None:
+    """
+    Tests that commands are only run for requests with a local Host, no Origin, a JSON Content-Type and the token of the server,
+    so that web pages can neither send them cross-origin nor through DNS rebinding.
+
+    :param server: The running server.
+    """
+    server.run_command(args=['habit', 'create', '-n', 'Protected Habit', '-p', 'daily'])
+    body = json.dumps({'args': ['habit', 'delete', '-p', 'd', '-y']})
+
+    # Sent by browsers without a preflight
+    assert post_command(server=server, body=body, headers={'Content-Type': 'text/plain'}) == 415
+    assert post_command(server=server, body=body, headers={'Content-Type': ''}) == 415
+    assert post_command(server=server, body=body, headers={'Origin': 'http://evil.example'}) == 403
+    # DNS rebinding
+    assert post_command(server=server, body=body, headers={'Host': f'evil.example:{server.port}'}) == 403
+    assert post_command(server=server, body=body, headers={'Host': f'localhost:{server.port + 1}'}) == 403
+    assert post_command(server=server, body=body, headers={'Authorization': ''}) == 401
+    assert post_command(server=server, body=body, headers={'Authorization': 'Bearer invalid'}) == 401
+
+    connection = HTTPConnection(host=SERVER_HOST, port=server.port)
+    connection.request(method='GET', url='/health', headers={'Host': f'evil.example:{server.port}'})
+    assert connection.getresponse().status == 403
+    connection.close()
+
+    assert server.command_count == 0
+    assert 'Protected Habit' in server.run_command(args=['habit'])['stdout']
+
+    assert post_command(server=server, body=body, headers={'Host': f'localhost:{server.port}', 'Content-Type': 'application/json; charset=utf-8'}) == 200
+    assert 'Protected Habit' not in server.run_command(args=['habit'])['stdout']
+
+
+def test_token_file(server: TrackerServer, runner: CliRunner) -> None:
+    """
+    Tests that the token is only readable by the user, rejected by the server if it does not match and removed with the server.
+
+    :param server: The running server.
+    :param runner: The CLI Runner object.
+    """
+    path = token_path(port=server.port)
+    if os.name == 'posix':
+        assert stat.S_IMODE(os.stat(path).st_mode) == 0o600
+
+    with open(path, 'w') as file:
+        file.write('invalid')
+    result = runner.invoke(cli=cli, args=['--remote', '--remote-address', str(server.port), 'habit'])
+    assert result.exit_code == 2
+    assert 'Missing or invalid token' in result.stderr
+
+    server.shutdown()
+    server.server_close()
+    assert not os.path.exists(path)
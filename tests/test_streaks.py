@@ -0,0 +1,219 @@
+import random
+from datetime import datetime, timedelta, date
+from typing import List, Tuple
+
+import numpy as np
+import pytest
+from click.testing import CliRunner
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker, Session
+
+from classes.orm.base import Base
+from classes.orm.habit import Habit
+from classes.orm.habit_entry import HabitEntry
+from classes.periodicity import Periodicity
+from helpers.streaks import rebuild_streaks, compute_streaks, streak_runs_statement
+from modules.analytics import analytics
+from modules.habit import habit
+
+
+@pytest.fixture
+def session() -> Session:
+    """
+    Returns a session bound to a new in-memory database.
+    """
+    engine = create_engine('sqlite:///:memory:')
+    Base.metadata.create_all(bind=engine)
+    with sessionmaker(bind=engine)() as session:
+        yield session
+
+
+def create_history(session: Session, name: str, periodicity: Periodicity, completions: List[datetime]) -> Habit:
+    """
+    Creates a Habit with the given completion history.
+
+    :param session: The SQLAlchemy session object.
+    :param name: The Name of the Habit.
+    :param periodicity: The Periodicity of the Habit.
+    :param completions: Completion dates of the Habit.
+    """
+    new_habit = Habit.create(session=session, habit_name=name, periodicity=periodicity)
+    session.add_all([HabitEntry(habit_id=new_habit.habit_id, completion_date=completion) for completion in completions])
+    session.commit()
+    return new_habit
+
+
+def test_rebuild_daily(session: Session) -> None:
+    """
+    Tests rebuilding a daily history with a gap and multiple completions on the same day.
+    """
+    start = datetime(2024, 1, 1, 12)
+    days = [0, 1, 1, 2, 3, 5, 6]
+    target_habit = create_history(session=session, name='Daily', periodicity=Periodicity.Daily, completions=[start + timedelta(days=day) for day in days])
+
+    assert rebuild_streaks(session=session) == 1
+    session.refresh(target_habit)
+    assert (target_habit.streak, target_habit.highest_streak) == (2, 4)
+
+
+def test_rebuild_weekly_year_boundary(session: Session) -> None:
+    """
+    Tests that weekly streaks continue across year boundaries and from Mondays to the following week.
+    """
+    completions = [datetime(2024, 12, 16), datetime(2024, 12, 23), datetime(2024, 12, 30), datetime(2025, 1, 6), datetime(2025, 1, 26)]
+    target_habit = create_history(session=session, name='Weekly', periodicity=Periodicity.Weekly, completions=completions)
+
+    rebuild_streaks(session=session)
+    session.refresh(target_habit)
+    assert (target_habit.streak, target_habit.highest_streak) == (1, 4)
+
+
+def test_rebuild_subset(session: Session) -> None:
+    """
+    Tests that only the requested Habits are rebuilt and Habits without completions are reset.
+    """
+    first = create_history(session=session, name='First', periodicity=Periodicity.Daily, completions=[datetime(2024, 1, 1)])
+    second = create_history(session=session, name='Second', periodicity=Periodicity.Daily, completions=[])
+    first.streak = second.streak = second.highest_streak = 5
+    session.commit()
+
+    assert rebuild_streaks(session=session, habit_ids=[second.habit_id]) == 0
+    session.refresh(first)
+    session.refresh(second)
+    assert (first.streak, second.streak, second.highest_streak) == (5, 0, 0)
+
+
+def replay_streaks(periods: List[int]) -> Tuple[int, int]:
+    """
+    Reference implementation replaying completions one by one like Habit.complete.
+
+    :param periods: Sorted period indexes of all completions of a Habit.
+
+    :returns Tuple[int, int]: Current and highest streak
+    """
+    streak = highest_streak = 0
+    last_period = None
+    for period in periods:
+        if last_period is not None and period == last_period:
+            continue
+        streak = streak + 1 if last_period is not None and period - last_period == 1 else 1
+        highest_streak = max(highest_streak, streak)
+        last_period = period
+    return streak, highest_streak
+
+
+def test_compute_streaks_random() -> None:
+    """
+    Tests that the vectorized computation agrees with replaying completions one by one.
+    """
+    generator = random.Random(42)
+    habit_ids, periods, expected = [], [], {}
+    for habit_id in range(1, 201):
+        habit_periods = sorted(generator.randint(0, 60) for _ in range(generator.randint(1, 40)))
+        habit_ids.extend([habit_id] * len(habit_periods))
+        periods.extend(habit_periods)
+        expected[habit_id] = replay_streaks(periods=habit_periods)
+
+    result_ids, streaks, highest_streaks = compute_streaks(habit_ids=np.array(habit_ids), periods=np.array(periods))
+
+    assert {habit_id: (streak, highest) for habit_id, streak, highest in zip(result_ids.tolist(), streaks.tolist(), highest_streaks.tolist())} == expected
+
+
+def test_recompute_command(session: Session) -> None:
+    """
+    Tests the analytics recompute command.
+    """
+    today = datetime.now()
+    target_habit = create_history(session=session, name='Recompute', periodicity=Periodicity.Daily, completions=[today - timedelta(days=1), today])
+    session_maker = sessionmaker(bind=session.get_bind())
+
+    result = CliRunner().invoke(cli=analytics, args=['recompute'], obj={'session_maker': session_maker})
+    assert 'Either --id or --all has to be passed!' in result.output
+
+    result = CliRunner().invoke(cli=analytics, args=['recompute', '-i', str(target_habit.habit_id)], obj={'session_maker': session_maker})
+    assert 'Streaks have been recomputed! (1 Habit(s) with completions)' in result.output
+
+    session.refresh(target_habit)
+    assert (target_habit.streak, target_habit.highest_streak) == (2, 2)
+
+
+@pytest.mark.parametrize('args', [['recompute', '-i', '1'], ['check', '--fix']])
+def test_recompute_rebuilds_period_keys(session: Session, args: List[str]) -> None:
+    """
+    Tests that completing a Habit continues the streak recomputed from manually added entries, which have no period key.
+    """
+    today = datetime.now()
+    create_history(session=session, name='Manual', periodicity=Periodicity.Daily, completions=[today - timedelta(days=2), today - timedelta(days=1)])
+    session_maker = sessionmaker(bind=session.get_bind())
+
+    result = CliRunner().invoke(cli=analytics, args=args, obj={'session_maker': session_maker})
+    assert result.exit_code == 0
+
+    target_habit = session.get(Habit, 1)
+    session.refresh(target_habit)
+    assert target_habit.streak == 2
+
+    result = CliRunner().invoke(cli=habit, args=['complete', '-i', '1'], obj={'session_maker': session_maker})
+    assert 'has been broken' not in result.output
+
+    session.refresh(target_habit)
+    assert (target_habit.streak, target_habit.highest_streak) == (3, 3)
+
+
+def test_streak_runs(session: Session) -> None:
+    """
+    Tests that the SQL streak query finds all runs, including past ones, and respects the time range and minimum length.
+    """
+    start = datetime(2024, 12, 28, 12)
+    days = [0, 1, 2, 3, 4, 6, 7, 10]
+    target_habit = create_history(session=session, name='Daily', periodicity=Periodicity.Daily, completions=[start + timedelta(days=day) for day in days])
+    create_history(session=session, name='Weekly', periodicity=Periodicity.Weekly, completions=[datetime(2024, 12, 30), datetime(2025, 1, 5), datetime(2025, 1, 6)])
+
+    runs = session.execute(streak_runs_statement(habit_id=target_habit.habit_id)).all()
+    assert [(first_period, last_period, length) for _, _, _, first_period, last_period, length in runs] == [
+        (date(2024, 12, 28).toordinal(), date(2025, 1, 1).toordinal(), 5),
+        (date(2025, 1, 3).toordinal(), date(2025, 1, 4).toordinal(), 2),
+        (date(2025, 1, 7).toordinal(), date(2025, 1, 7).toordinal(), 1),
+    ]
+
+    runs = session.execute(streak_runs_statement(since=date(2025, 1, 1), min_length=2)).all()
+    assert [(name, length) for _, name, _, _, _, length in runs] == [('Daily', 2), ('Weekly', 2)]
+
+    runs = session.execute(streak_runs_statement(until=date(2024, 12, 29), periodicity=Periodicity.Daily)).all()
+    assert [length for *_, length in runs] == [2]
+
+
+def test_streaks_command(session: Session) -> None:
+    """
+    Tests the analytics streaks command.
+    """
+    create_history(session=session, name='Weekly', periodicity=Periodicity.Weekly, completions=[datetime(2024, 12, 30), datetime(2025, 1, 6)])
+    session_maker = sessionmaker(bind=session.get_bind())
+
+    result = CliRunner().invoke(cli=analytics, args=['streaks', '--since', '2024-01-01'], obj={'session_maker': session_maker})
+    assert '2024-12-30  2025-01-12         2' in result.output
+
+    result = CliRunner().invoke(cli=analytics, args=['streaks', '-m', '3'], obj={'session_maker': session_maker})
+    assert 'No Matching Streak found.' in result.output
+
+
+@pytest.mark.parametrize('value, previous', [
+    (date(2025, 1, 1), date(2024, 12, 31)),     # Year boundary
+    (date(2024, 3, 1), date(2024, 2, 29)),      # Leap day
+])
+def test_period_index_daily(value: date, previous: date) -> None:
+    """
+    Tests that consecutive days have consecutive period indexes.
+    """
+    assert Periodicity.Daily.period_index(value=value) - Periodicity.Daily.period_index(value=previous) == 1
+
+
+def test_period_index_weekly() -> None:
+    """
+    Tests that weekly periods follow ISO weeks (Monday - Sunday), also across year boundaries.
+    """
+    monday, sunday = date(2024, 12, 30), date(2025, 1, 5)
+
+    assert Periodicity.Weekly.period_index(value=monday) == Periodicity.Weekly.period_index(value=sunday)
+    assert Periodicity.Weekly.period_index(value=monday) - Periodicity.Weekly.period_index(value=monday - timedelta(days=1)) == 1
+    assert Periodicity.Weekly.period_index(value=sunday + timedelta(days=1)) - Periodicity.Weekly.period_index(value=sunday) == 1
@@ -1,18 +1,38 @@
+import time
+
+# Start of the startup phase of --profile, taken before anything else is imported
+STARTED_AT = time.perf_counter()
+
+import sys
+from typing import Optional
+
 import click
-from sqlalchemy.orm import sessionmaker
 
-from classes.orm.base import Base
-from classes.orm.habit import Habit  # noqa
-from classes.orm.habit_entry import HabitEntry  # noqa
+from classes.helpers.lazy_group import LazyGroup, SUBCOMMAND_ARGS_KEY
+from classes.helpers.lazy_session_maker import LazySessionMaker
+from helpers.database import load_database_config
+from helpers.remote import REMOTE_COMMANDS, DEFAULT_SERVER_ADDRESS, ENV_REMOTE_ADDRESS, forward_command
 
-from modules.analytics import analytics
-from modules.habit import habit
-from sqlalchemy import create_engine
+# Environment variable enabling the shell completion, e.g. _TRACKER_COMPLETE=bash_source
+COMPLETE_VAR = '_TRACKER_COMPLETE'
 
 
-@click.group()
+@click.group(cls=LazyGroup, lazy_subcommands={
+    'analytics': ('modules.analytics:analytics', 'Module related to Habit Analytics'),
+    'compact': ('modules.compaction:compact', 'Rolls old completions up into one summary per Habit and month.'),
+    'export': ('modules.transfer:export', 'Exports all Habits and their completion history.'),
+    'gc': ('modules.compaction:gc', 'Deletes orphaned completions, whose Habit no longer exists.'),
+    'habit': ('modules.habit:habit', 'Module related to Habit Management.'),
+    'import': ('modules.transfer:import_', 'Imports Habits and their completion history from a file created by the export command.'),
+    'serve': ('modules.server:serve', 'Runs a local server for the habit and analytics commands, see --remote.'),
+})
+@click.option('--profile', 'profile', default=False, is_flag=True, help='Print phase timings and SQL statistics of the command to stderr.', type=bool)
+@click.option('--profile-json', 'profile_json', default=None, envvar='TRACKER_PROFILE_JSON', help='Append the profile as a JSON line to the given file. Implies --profile.', type=click.Path(dir_okay=False))
+@click.option('--profile-pstats', 'profile_pstats', default=None, help='Write cProfile statistics of the command to the given file. Implies --profile.', type=click.Path(dir_okay=False))
+@click.option('--remote', 'remote', default=False, is_flag=True, help='Run the habit or analytics command on the server started by the serve command.', type=bool)
+@click.option('--remote-address', 'remote_address', default=DEFAULT_SERVER_ADDRESS, envvar=ENV_REMOTE_ADDRESS, show_default=True, help='Address of the server used by --remote as [HOST:]PORT.', type=str)
 @click.pass_context
-def cli(ctx):
+def cli(ctx, profile: bool, profile_json: Optional[str], profile_pstats: Optional[str], remote: bool, remote_address: str):
     """\b
     Application Base.
 
@@ -22,15 +42,63 @@ def cli(ctx):
     if ctx.invoked_subcommand is None:
         return
 
-    engine = create_engine("sqlite:///habits.sqlite")
-
     ctx.ensure_object(dict)
-    ctx.obj['session_maker'] = sessionmaker(bind=engine)
-    Base.metadata.create_all(bind=engine)
-    pass
+    if 'session_maker' in ctx.obj:
+        # Command is run by the server of the serve command, which shares its session maker with every command
+        return
+
+    if remote:
+        run_remote(ctx=ctx, address=remote_address, profiled=profile or profile_json is not None or profile_pstats is not None)
+
+    try:
+        config = load_database_config()
+    except ValueError as error:
+        raise click.UsageError(message=str(error), ctx=ctx)
+
+    profiler = None
+    if profile or profile_json is not None or profile_pstats is not None:
+        from classes.helpers.profiler import Profiler, PROFILER_KEY
+
+        profiler = Profiler(started_at=STARTED_AT, args=sys.argv[1:], json_path=profile_json, pstats_path=profile_pstats)
+        ctx.obj[PROFILER_KEY] = profiler
+        # Runs after the subcommand has finished, also if it failed
+        ctx.call_on_close(profiler.finish)
+
+    # The engine is only created once a command opens its first session
+    ctx.obj['session_maker'] = LazySessionMaker(url=f'sqlite:///{config["path"]}', profile=config['profile'],
+                                                busy_retries=config['busy_retries'], busy_backoff=config['busy_backoff'], profiler=profiler)
+
+    if profiler is not None:
+        profiler.start_command()
+
+
+# region Helpers
+
+def run_remote(ctx: click.Context, address: str, profiled: bool) -> None:
+    """
+    Runs the invoked subcommand on the server and exits with its exit code. The subcommand is not run locally.
+
+    :param ctx: Context of the application.
+    :param address: Address of the server as [HOST:]PORT.
+    :param profiled: Whether any of the --profile options were passed.
+    """
+    if profiled:
+        raise click.UsageError(message='The --profile options can not be combined with --remote!', ctx=ctx)
+    if ctx.invoked_subcommand not in REMOTE_COMMANDS:
+        raise click.UsageError(message=f'Only the {" and ".join(REMOTE_COMMANDS)} commands can be run with --remote!', ctx=ctx)
+
+    try:
+        exit_code = forward_command(address=address, args=ctx.meta[SUBCOMMAND_ARGS_KEY])
+    except ValueError as error:
+        raise click.UsageError(message=str(error), ctx=ctx)
+    except OSError as error:
+        raise click.ClickException(message=f'Could not reach the server at {address} ({error}), is it running? Start it with the serve command.')
+
+    ctx.exit(code=exit_code)
+
+# endregion
 
 
 if __name__ == '__main__':
-    cli.add_command(analytics)
-    cli.add_command(habit)
-    cli()
+    # Click derives the variable from the program name by default, "_TRACKER.PY_COMPLETE" cannot be set by most shells
+    cli(complete_var=COMPLETE_VAR)